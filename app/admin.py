@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import Product, Order, OrderDetail, Payment, Table, CustomUser, CustomerOTPSession
+from .models import Product, Order, OrderDetail, Payment, Table, CustomUser, CustomerOTPSession, DailySalesRollup, DailyProductSales, DailyPaymentSales, PaymentEvent, OutboundMessage
 
 class CustomUserAdmin(UserAdmin):
     model = CustomUser
@@ -29,3 +29,8 @@ admin.site.register(Payment)
 admin.site.register(Table)
 admin.site.register(CustomUser, CustomUserAdmin)
 admin.site.register(CustomerOTPSession)
+admin.site.register(DailySalesRollup)
+admin.site.register(DailyProductSales)
+admin.site.register(DailyPaymentSales)
+admin.site.register(PaymentEvent)
+admin.site.register(OutboundMessage)
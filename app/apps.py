@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class AppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .db import apply_sqlite_pragmas
+        connection_created.connect(apply_sqlite_pragmas)
+        from .metrics import install_query_counter
+        connection_created.connect(install_query_counter)
+        from .search import ensure_order_fts
+        post_migrate.connect(ensure_order_fts, sender=self)
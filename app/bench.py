@@ -0,0 +1,215 @@
+# app/bench.py
+# Benchmark alur kasir dan pelanggan QR lewat Django test Client.
+# Setiap skenario dijalankan `requests` kali oleh `concurrency` thread (masing-masing
+# dengan Client dan koneksi DB sendiri). Hasil: p50/p95/p99 latency, request/detik dan
+# rata-rata query per request (dari InstrumentationMiddleware, lihat app/metrics.py).
+# Dipakai oleh `python manage.py bench` dan test di app/tests.py.
+import json
+import queue
+import random
+import threading
+import time
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+from . import metrics
+from .models import Product, Table, Order
+from .orders import place_order
+
+# Skenario -> nama view yang diukur (kunci di metrics.store)
+SCENARIOS = [
+    'create_order',
+    'customer_order_checkout',
+    'order_list',
+    'kasir_dashboard',
+    'kasir_order_report',
+    'midtrans_webhook',
+]
+
+
+class BenchContext:
+    """Data bersama untuk semua skenario: user kasir, produk, meja dan order pending untuk webhook."""
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.kasir, _ = get_user_model().objects.get_or_create(username='kasir_bench', defaults={'role': 'kasir'})
+        self.product_ids = list(Product.objects.filter(stock__gt=1000).values_list('id', flat=True)[:50])
+        if not self.product_ids:
+            raise ValueError('Tidak ada produk dengan stok cukup; jalankan seed dulu.')
+        self.table_numbers = list(Table.objects.values_list('table_number', flat=True)[:50])
+        self.pending_orders = queue.Queue()
+
+    def cart(self):
+        with self.rng_lock:
+            ids = self.rng.sample(self.product_ids, self.rng.randint(1, min(4, len(self.product_ids))))
+            return [{'id': product_id, 'qty': self.rng.randint(1, 3)} for product_id in ids]
+
+    def prepare_webhooks(self, count):
+        # Order QR yang menunggu notifikasi Midtrans; satu order untuk setiap request webhook
+        for i in range(count):
+            order = place_order(self.cart(), hold=True, source='qr_scan', payment_method='midtrans',
+                                phone_number=f'0899{i:07d}', customer_name='Bench')
+            self.pending_orders.put(order.id)
+
+
+def _anonymous_client(ctx):
+    return Client()
+
+
+def _kasir_client(ctx):
+    client = Client()
+    client.force_login(ctx.kasir)
+    return client
+
+
+def _customer_client(ctx):
+    client = Client()
+    session = client.session
+    session.update({'is_customer_verified': True, 'customer_phone': '08991234567', 'customer_name': 'Bench'})
+    session.save()
+    return client
+
+
+def _create_order(client, ctx):
+    return client.post('/order/create/', json.dumps({'cart': ctx.cart(), 'customer_name': 'Bench'}),
+                       content_type='application/json')
+
+
+def _customer_order_checkout(client, ctx):
+    body = {'cart': ctx.cart(), 'payment_method': 'midtrans', 'takeaway': not ctx.table_numbers,
+            'meja_number': ctx.table_numbers[0] if ctx.table_numbers else ''}
+    return client.post('/customer/order/checkout/', json.dumps(body), content_type='application/json')
+
+
+def _order_list(client, ctx):
+    return client.get('/order-list/')
+
+
+def _kasir_dashboard(client, ctx):
+    return client.get('/')
+
+
+def _kasir_order_report(client, ctx):
+    return client.get('/kasir/order-report/', {'status': 'Completed', 'period': 'year', 'date': time.strftime('%Y')})
+
+
+def _midtrans_webhook(client, ctx):
+    try:
+        order_id = ctx.pending_orders.get_nowait()
+    except queue.Empty:
+        order_id = Order.objects.values_list('id', flat=True).last()
+    return client.post('/midtrans-webhook/', json.dumps({
+        'order_id': str(order_id), 'transaction_id': f'bench-{order_id}', 'transaction_status': 'settlement',
+    }), content_type='application/json')
+
+
+RUNNERS = {
+    'create_order': (_kasir_client, _create_order),
+    'customer_order_checkout': (_customer_client, _customer_order_checkout),
+    'order_list': (_kasir_client, _order_list),
+    'kasir_dashboard': (_kasir_client, _kasir_dashboard),
+    'kasir_order_report': (_kasir_client, _kasir_order_report),
+    'midtrans_webhook': (_anonymous_client, _midtrans_webhook),
+}
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(pct / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def run_scenario(name, ctx, requests=100, concurrency=4):
+    """
+    Jalankan satu skenario. concurrency=1 berjalan di thread pemanggil (dipakai di test,
+    supaya melihat data di transaksi test yang sama).
+    Return: dict statistik skenario.
+    """
+    make_client, call = RUNNERS[name]
+    if name == 'midtrans_webhook':
+        ctx.prepare_webhooks(requests)
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def worker(count, close_connection):
+        client = make_client(ctx)
+        local_latencies, local_errors = [], []
+        try:
+            for _ in range(count):
+                started = time.perf_counter()
+                response = call(client, ctx)
+                local_latencies.append(time.perf_counter() - started)
+                if response.status_code >= 400:
+                    local_errors.append(response.status_code)
+        finally:
+            if close_connection:
+                connection.close()
+        with lock:
+            latencies.extend(local_latencies)
+            errors.extend(local_errors)
+
+    metrics.store.clear()
+    started = time.perf_counter()
+    if concurrency <= 1:
+        worker(requests, close_connection=False)
+    else:
+        counts = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+        threads = [threading.Thread(target=worker, args=(count, True)) for count in counts if count]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    elapsed = time.perf_counter() - started
+    view_stats = metrics.store.snapshot().get(name, {})
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'p50_ms': round(percentile(latencies_ms, 50), 2),
+        'p95_ms': round(percentile(latencies_ms, 95), 2),
+        'p99_ms': round(percentile(latencies_ms, 99), 2),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'queries_per_request': view_stats.get('avg_queries', 0),
+    }
+
+
+def run(scenarios=None, requests=100, concurrency=4, seed=None):
+    ctx = BenchContext(seed)
+    return {name: run_scenario(name, ctx, requests, concurrency) for name in scenarios or SCENARIOS}
+
+
+def format_report(results):
+    lines = [f"{'skenario':<26}{'req':>6}{'err':>5}{'p50ms':>9}{'p95ms':>9}{'p99ms':>9}{'rps':>8}{'q/req':>7}"]
+    for name, r in results.items():
+        lines.append(
+            f"{name:<26}{r['requests']:>6}{r['errors']:>5}{r['p50_ms']:>9}{r['p95_ms']:>9}"
+            f"{r['p99_ms']:>9}{r['rps']:>8}{r['queries_per_request']:>7}"
+        )
+    return '\n'.join(lines)
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Bandingkan hasil dengan baseline (hasil run sebelumnya).
+    Regresi: p95 naik lebih dari tolerance, rps turun lebih dari tolerance,
+    atau query per request bertambah (lebih dari 0.5).
+    Return: list of dict {scenario, metric, baseline, current, regression}
+    """
+    rows = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        checks = [
+            ('p95_ms', current['p95_ms'] > base['p95_ms'] * (1 + tolerance)),
+            ('rps', current['rps'] < base['rps'] * (1 - tolerance)),
+            ('queries_per_request', current['queries_per_request'] > base['queries_per_request'] + 0.5),
+        ]
+        for metric, regression in checks:
+            rows.append({
+                'scenario': name, 'metric': metric, 'baseline': base[metric],
+                'current': current[metric], 'regression': regression,
+            })
+    return rows
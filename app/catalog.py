@@ -0,0 +1,167 @@
+# app/catalog.py
+# Cache menu (produk, kategori, meja) di cache framework Django.
+# Semua key memakai nomor versi; signal post_save/post_delete Product/Table
+# menaikkan versi sehingga key lama otomatis tidak terpakai lagi.
+# Versi disimpan di tabel CatalogVersion (bukan di cache yang bisa per proses), jadi
+# edit menu di satu worker langsung berlaku di semua worker. Dalam satu request versi
+# cukup dibaca sekali (lihat start_request/end_request di app/signals.py).
+import gzip
+import json
+import time
+import zlib
+from asgiref.local import Local
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from .models import CatalogVersion, Product, Table
+
+_request = Local()
+
+
+def start_request():
+    _request.active, _request.version = True, None
+
+
+def end_request():
+    _request.active, _request.version = False, None
+
+
+def _create_version():
+    # Pakai timestamp supaya tidak bentrok dengan key cache dari database lain (cache file bersama)
+    row, _ = CatalogVersion.objects.get_or_create(pk=1, defaults={'version': int(time.time() * 1000)})
+    return row.version
+
+
+def get_version():
+    version = getattr(_request, 'version', None)
+    if version is not None:
+        return version
+    version = CatalogVersion.objects.filter(pk=1).values_list('version', flat=True).first()
+    if version is None:
+        version = _create_version()
+    if getattr(_request, 'active', False):
+        _request.version = version
+    return version
+
+
+def bump_version(**kwargs):
+    # Paling kecil timestamp sekarang: kalau transaksi yang menaikkan versi di-rollback,
+    # nomor yang sempat terpakai (dan key cache-nya) tidak akan dipakai ulang
+    _request.version = None
+    now = int(time.time() * 1000)
+    if not CatalogVersion.objects.filter(pk=1).update(version=Greatest(F('version') + 1, Value(now))):
+        _create_version()
+
+
+def _cached(name, builder):
+    key = f'catalog:{get_version()}:{name}'
+    data = cache.get(key)
+    if data is None:
+        data = builder()
+        cache.set(key, data, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 60 * 60 * 24))
+    return data
+
+
+def serialize_product(product):
+    return {
+        'id': product.id,
+        'name': product.name,
+        'description': product.description,
+        'price': float(product.price),
+        'image': product.image.url if product.image else '',
+        'category': product.category,
+        'stock': product.stock,
+    }
+
+
+def _build_products():
+    return [serialize_product(p) for p in Product.objects.order_by('id')]
+
+
+def _build_categories():
+    return list(Product.objects.order_by('category').values_list('category', flat=True).distinct())
+
+
+def _build_tables():
+    return list(Table.objects.order_by('table_number').values('id', 'table_number'))
+
+
+def _build_prices():
+    return {
+        product_id: {'name': name, 'price': price}
+        for product_id, name, price in Product.objects.values_list('id', 'name', 'price')
+    }
+
+
+def get_prices():
+    """
+    Tabel harga {product_id: {'name': str, 'price': Decimal}} untuk versi katalog saat ini.
+    Harga disimpan sebagai Decimal (bukan float seperti serialize_product) karena dipakai
+    untuk menghitung total order (lihat app/pricing.py).
+    """
+    return _cached('prices', _build_prices)
+
+
+def get_products(with_stock=True):
+    """
+    Daftar produk (list of dict) dari cache.
+    with_stock: timpa field stock dengan nilai terbaru dari DB (1 query id+stock),
+    karena stok berubah lewat UPDATE F() yang tidak memicu signal.
+    """
+    products = _cached('products', _build_products)
+    if not with_stock:
+        return products
+    stocks = dict(Product.objects.values_list('id', 'stock'))
+    return [{**p, 'stock': stocks.get(p['id'], 0)} for p in products]
+
+
+def get_categories():
+    return _cached('categories', _build_categories)
+
+
+def get_tables():
+    return _cached('tables', _build_tables)
+
+
+def _menu_payload(products):
+    # Versi ringkas untuk pelanggan: stok cukup dikirim sebagai available (habis/tidak)
+    return {
+        'products': [
+            {
+                'id': p['id'],
+                'name': p['name'],
+                'price': p['price'],
+                'image': p['image'],
+                'description': p['description'],
+                'category': p['category'] or 'Lainnya',
+                'available': p['stock'] > 0,
+            }
+            for p in products
+        ],
+    }
+
+
+def menu_etag(products):
+    """
+    ETag kuat untuk /api/menu/: versi katalog + daftar produk yang habis.
+    Berubah hanya kalau menu diedit atau ada produk yang habis/terisi lagi,
+    bukan setiap kali stok berkurang.
+    """
+    sold_out = ','.join(str(p['id']) for p in products if p['stock'] <= 0)
+    return f"{get_version()}-{zlib.crc32(sold_out.encode()):08x}"
+
+
+def menu_json(products, etag, compressed=False):
+    """
+    Body JSON /api/menu/ (bytes), disimpan di cache per ETag supaya tidak
+    perlu di-encode/di-gzip ulang untuk setiap HP pelanggan.
+    """
+    key = f"catalog:menu:{etag}:{'gzip' if compressed else 'raw'}"
+    body = cache.get(key)
+    if body is None:
+        body = json.dumps(_menu_payload(products), separators=(',', ':')).encode()
+        if compressed:
+            body = gzip.compress(body)
+        cache.set(key, body, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 60 * 60 * 24))
+    return body
@@ -0,0 +1,21 @@
+# app/db.py
+# Setelan koneksi SQLite: PRAGMA dari settings.SQLITE_PRAGMAS dipasang setiap kali
+# Django membuka koneksi baru (signal connection_created, didaftarkan di apps.py).
+# Waktu tunggu lock diatur lewat DATABASES OPTIONS['timeout'] (sqlite3 memasangnya sebagai
+# busy_timeout); PRAGMA busy_timeout di sini akan menimpanya, jadi tidak dipakai.
+from django.conf import settings
+
+
+def pragma_statements(pragmas):
+    return [f'PRAGMA {name} = {value}' for name, value in pragmas.items()]
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for statement in pragma_statements(pragmas):
+            cursor.execute(statement)
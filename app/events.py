@@ -0,0 +1,98 @@
+# app/events.py
+# Hub broadcast in-process untuk layar kasir (Server-Sent Events).
+# View sync (create_order, pay_cash, ...) memanggil order_event(); event dikirim
+# setelah transaksi commit ke semua koneksi SSE yang terbuka di proses ini.
+# Stream hanya jalan di server ASGI (lihat pos_wk/asgi.py); di WSGI halaman memakai reload.
+import asyncio
+import json
+import threading
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+
+KEEPALIVE_SECONDS = 15
+
+
+class OrderEventHub:
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """Daftarkan koneksi baru. Harus dipanggil dari dalam event loop."""
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.queue_size))
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, event, data):
+        """Kirim event ke semua subscriber. Aman dipanggil dari thread mana saja."""
+        message = f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            loop, queue = subscriber
+            try:
+                loop.call_soon_threadsafe(self._put, queue, message)
+            except RuntimeError:
+                # Event loop koneksi ini sudah ditutup
+                self.unsubscribe(subscriber)
+
+    @staticmethod
+    def _put(queue, message):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Client terlalu lambat; event dibuang, client tetap bisa reload manual
+            pass
+
+    async def stream(self, keepalive=KEEPALIVE_SECONDS):
+        subscriber = self.subscribe()
+        queue = subscriber[1]
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    message = ": keepalive\n\n"
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
+
+
+hub = OrderEventHub()
+
+
+def streaming_supported(request):
+    """
+    True kalau request dilayani server ASGI. Di WSGI (runserver, gunicorn sync) Django harus
+    membaca seluruh stream async sebelum mengirimnya; stream tanpa akhir menahan satu worker
+    selamanya dan browser tidak pernah menerima event.
+    """
+    return isinstance(request, ASGIRequest)
+
+
+def serialize_order(order):
+    return {
+        'id': order.id,
+        'customer_name': order.customer_name or '-',
+        'table': order.table.table_number if order.table else None,
+        'total_price': float(order.total_price),
+        'kasir': order.kasir.username if order.kasir else '-',
+        'status': order.status,
+        'payment_status': order.payment_status,
+    }
+
+
+def order_event(event, order):
+    """
+    Jadwalkan event order_created / order_paid / order_completed / order_cancelled
+    untuk dikirim setelah transaksi yang sedang berjalan commit.
+    """
+    data = serialize_order(order)
+    transaction.on_commit(lambda: hub.publish(event, data))
@@ -0,0 +1,79 @@
+# app/exports.py
+# Export laporan order ke CSV secara streaming: baris dibaca per chunk dengan
+# .iterator() dan langsung ditulis ke response, tanpa menampung semua order di memori.
+import csv
+from django.utils import timezone
+from .models import OrderDetail
+
+CHUNK_SIZE = 2000
+# Teks yang diawali karakter ini dibaca Excel sebagai formula (CSV/formula injection)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+ORDER_HEADER = [
+    'Order ID', 'Tanggal', 'Pelanggan', 'No HP', 'Meja', 'Kasir', 'Sumber',
+    'Metode Bayar', 'Status', 'Status Bayar', 'Total', 'Catatan',
+]
+ITEM_HEADER = [
+    'Order ID', 'Tanggal', 'Pelanggan', 'Meja', 'Status', 'Produk', 'Kategori',
+    'Qty', 'Harga', 'Subtotal',
+]
+
+
+class Echo:
+    """File palsu untuk csv.writer: write() langsung mengembalikan barisnya."""
+
+    def write(self, value):
+        return value
+
+
+def _local(value):
+    return timezone.localtime(value).strftime('%Y-%m-%d %H:%M:%S') if value else ''
+
+
+def order_rows(orders):
+    """Satu baris per order. orders: queryset hasil reports.report_orders."""
+    yield ORDER_HEADER
+    rows = orders.order_by('-date_ordered').values_list(
+        'id', 'date_ordered', 'customer_name', 'phone_number', 'table__table_number',
+        'kasir__username', 'source', 'payment_method', 'status', 'payment_status',
+        'total_price', 'notes',
+    )
+    for (order_id, date_ordered, customer, phone, table, kasir, source, method,
+         status, payment_status, total, notes) in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield [
+            order_id, _local(date_ordered), customer or '', phone or '', table or 'Takeaway',
+            kasir or '', source, method, status, payment_status, total, notes or '',
+        ]
+
+
+def order_item_rows(orders):
+    """Satu baris per item (OrderDetail) dari order yang lolos filter."""
+    yield ITEM_HEADER
+    rows = OrderDetail.objects.filter(order__in=orders.values('id')).order_by(
+        '-order__date_ordered', 'order_id', 'id',
+    ).values_list(
+        'order_id', 'order__date_ordered', 'order__customer_name', 'order__table__table_number',
+        'order__status', 'product__name', 'product__category', 'quantity', 'price',
+    )
+    for (order_id, date_ordered, customer, table, status, product, category,
+         quantity, price) in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield [
+            order_id, _local(date_ordered), customer or '', table or 'Takeaway', status,
+            product, category, quantity, price, quantity * price,
+        ]
+
+
+def safe_cell(value):
+    """Awali teks yang bisa dieksekusi sebagai formula dengan ' (nama/catatan pelanggan diisi bebas)."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def stream_csv(rows):
+    """Ubah iterable baris jadi potongan teks CSV untuk StreamingHttpResponse."""
+    writer = csv.writer(Echo())
+    # BOM supaya Excel membaca UTF-8 dengan benar
+    yield '\ufeff'
+    for row in rows:
+        yield writer.writerow([safe_cell(value) for value in row])
@@ -0,0 +1,174 @@
+# app/loadgen.py
+# Data dummy dalam jumlah besar untuk benchmark dan reproduksi lambatnya production
+# (lihat app/bench.py dan `python manage.py seed_load`).
+# Semua insert memakai bulk_create per batch di dalam satu transaksi per batch;
+# rollup dibangun ulang sekali di akhir.
+import random
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from . import catalog, rollups
+from .models import Product, Table, Order, OrderDetail, Payment
+
+MENU = {
+    'makanan': ['Indomie Goreng', 'Indomie Kuah', 'Nasi Goreng', 'Mie Rebus', 'Roti Bakar', 'Pisang Goreng'],
+    'minuman': ['Kopi Hitam', 'Es Teh Manis', 'Wedang Jahe', 'Kopi Susu', 'Cappuccino', 'Es Jeruk'],
+    'snack': ['Kerupuk', 'Kacang Goreng', 'Singkong Goreng', 'Martabak Mini', 'Cilok', 'Tahu Crispy'],
+}
+PRICE_RANGE = {'makanan': (10, 30), 'minuman': (5, 20), 'snack': (3, 15)}  # ribuan rupiah
+
+# Bobot jumlah order per jam (waktu lokal) untuk warkop: ramai pagi, makan siang,
+# dan paling ramai malam; sepi dini hari
+HOUR_WEIGHTS = {
+    0: 4, 1: 2, 2: 1, 3: 0.5, 4: 0.5, 5: 1, 6: 3, 7: 6, 8: 6, 9: 4, 10: 3, 11: 4,
+    12: 7, 13: 6, 14: 3, 15: 3, 16: 4, 17: 5, 18: 6, 19: 9, 20: 10, 21: 9, 22: 7, 23: 5,
+}
+WEEKEND_FACTOR = 1.4  # Sabtu/Minggu lebih ramai
+QR_SHARE = 0.4  # porsi order lewat scan QR
+CANCELLED_SHARE = 0.03
+FIRST_NAMES = ['Budi', 'Siti', 'Agus', 'Dewi', 'Rudi', 'Ani', 'Joko', 'Rina', 'Eko', 'Sri', 'Andi', 'Putri']
+
+
+def seed_products(count, rng, stock=100000):
+    products = []
+    for i in range(count):
+        category = rng.choice(list(MENU))
+        low, high = PRICE_RANGE[category]
+        products.append(Product(
+            name=f'{rng.choice(MENU[category])} {i + 1}',
+            description='',
+            price=Decimal(rng.randint(low, high) * 1000),
+            category=category,
+            stock=stock,
+        ))
+    return Product.objects.bulk_create(products)
+
+
+def seed_tables(count):
+    existing = set(Table.objects.values_list('table_number', flat=True))
+    return Table.objects.bulk_create([
+        Table(table_number=str(n)) for n in range(1, count + 1) if str(n) not in existing
+    ])
+
+
+def seed_customers(count, rng):
+    """Pelanggan QR dikenali dari nomor HP (tidak ada akun); return list of (phone, name)."""
+    phones = rng.sample(range(10 ** 9, 10 ** 10), count)
+    return [(f'08{phone}', f'{rng.choice(FIRST_NAMES)} {i + 1}') for i, phone in enumerate(phones)]
+
+
+def order_times(count, days, rng, today=None):
+    """
+    Yield `count` waktu order (aware, urut naik) tersebar di `days` hari sebelum hari ini,
+    dengan pola jam sibuk HOUR_WEIGHTS dan akhir pekan lebih ramai.
+    Urut naik supaya id order ikut kronologis seperti data asli.
+    """
+    today = today or timezone.localdate()
+    dates = [today - timedelta(days=days - i) for i in range(days)]
+    weights = [WEEKEND_FACTOR if d.weekday() >= 5 else 1 for d in dates]
+    total = sum(weights)
+    per_day = [int(count * w / total) for w in weights]
+    for i in rng.sample(range(days), count - sum(per_day)):
+        per_day[i] += 1
+    hours, hour_weights = list(HOUR_WEIGHTS), list(HOUR_WEIGHTS.values())
+    tz = timezone.get_current_timezone()
+    for day, n in zip(dates, per_day):
+        stamps = sorted(
+            time(hour, rng.randrange(60), rng.randrange(60))
+            for hour in rng.choices(hours, weights=hour_weights, k=n)
+        )
+        for stamp in stamps:
+            yield timezone.make_aware(datetime.combine(day, stamp), tz)
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """auto_now_add menimpa tanggal saat insert; matikan sementara supaya tanggal historis tersimpan."""
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in saved:
+            field.auto_now_add = value
+
+
+def seed_orders(count, products, tables, kasir, rng, days=90, batch_size=5000, customers=None, progress=None):
+    """
+    Order 1-4 item (sebagian besar Completed/Paid, sebagian kecil Cancelled) tersebar di
+    `days` hari terakhir, lengkap dengan OrderDetail dan Payment.
+    customers: list of (phone, name) untuk order QR; default dibuat 500.
+    progress: callable(jumlah_dibuat) dipanggil setiap selesai satu batch.
+    Relasi diisi lewat *_id (bukan instance) supaya murah untuk jutaan baris.
+    Return: jumlah order yang dibuat.
+    """
+    customers = customers or seed_customers(500, rng)
+    times = order_times(count, days, rng)
+    fields = (Order._meta.get_field('date_ordered'), Payment._meta.get_field('payment_date'))
+    created = 0
+    while created < count:
+        size = min(batch_size, count - created)
+        orders, carts = [], []
+        for _ in range(size):
+            cart = {}
+            for product in rng.sample(products, rng.randint(1, min(4, len(products)))):
+                cart[product] = rng.randint(1, 3)
+            qr = rng.random() < QR_SHARE
+            cancelled = rng.random() < CANCELLED_SHARE
+            phone, name = rng.choice(customers) if qr else (None, f'Pelanggan {rng.randint(1, 5000)}')
+            orders.append(Order(
+                kasir_id=None if qr else kasir.id,
+                table_id=rng.choice(tables).id if tables and rng.random() < 0.7 else None,
+                total_price=sum(p.price * qty for p, qty in cart.items()),
+                status='Cancelled' if cancelled else 'Completed',
+                payment_status='Cancelled' if cancelled else 'Paid',
+                source='qr_scan' if qr else 'manual',
+                payment_method='midtrans' if qr and rng.random() < 0.7 else 'cash',
+                phone_number=phone,
+                customer_name=name,
+                date_ordered=next(times),
+                summary={'items': [
+                    {'name': p.name, 'qty': qty, 'price': str(p.price)} for p, qty in cart.items()
+                ]},
+            ))
+            carts.append(cart)
+        with explicit_timestamps(*fields), transaction.atomic():
+            orders = Order.objects.bulk_create(orders, batch_size=batch_size)
+            OrderDetail.objects.bulk_create([
+                OrderDetail(order_id=order.id, product_id=product.id, quantity=qty, price=product.price)
+                for order, cart in zip(orders, carts)
+                for product, qty in cart.items()
+            ], batch_size=batch_size)
+            Payment.objects.bulk_create([
+                Payment(
+                    order_id=order.id,
+                    payment_method='Midtrans' if order.payment_method == 'midtrans' else 'Cash',
+                    payment_status='Paid',
+                    amount=order.total_price,
+                    payment_date=order.date_ordered + timedelta(minutes=rng.randint(1, 45)),
+                )
+                for order in orders if order.status == 'Completed'
+            ], batch_size=batch_size)
+        created += size
+        if progress:
+            progress(created)
+    return created
+
+
+def seed(orders=1000, products=40, tables=15, customers=500, days=90, batch_size=5000, seed=None, progress=None):
+    """Isi database dengan produk, meja, kasir, pelanggan dan order historis; lalu bangun ulang rollup."""
+    rng = random.Random(seed)
+    kasir, _ = get_user_model().objects.get_or_create(username='kasir_load', defaults={'role': 'kasir'})
+    product_list = seed_products(products, rng)
+    seed_tables(tables)
+    table_list = list(Table.objects.all())
+    catalog.bump_version()  # bulk_create tidak memicu signal post_save Product/Table
+    customer_list = seed_customers(customers, rng)
+    count = seed_orders(orders, product_list, table_list, kasir, rng, days=days, batch_size=batch_size,
+                        customers=customer_list, progress=progress)
+    rollups.rebuild()
+    return {'products': len(product_list), 'tables': len(table_list), 'customers': len(customer_list), 'orders': count}
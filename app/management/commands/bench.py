@@ -0,0 +1,85 @@
+import json
+import logging
+import os
+import tempfile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from app import bench, loadgen, midtrans
+from app.midtrans_stub import MidtransStubServer
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark alur kasir dan pelanggan QR (create_order, checkout Midtrans, order list, '
+        'dashboard, laporan, webhook) di database sementara yang diisi data dummy.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=20000, help='Jumlah order historis yang di-seed')
+        parser.add_argument('--products', type=int, default=40)
+        parser.add_argument('--requests', type=int, default=200, help='Request per skenario')
+        parser.add_argument('--concurrency', type=int, default=4, help='Jumlah thread klien')
+        parser.add_argument('--scenarios', default=','.join(bench.SCENARIOS),
+                            help='Daftar skenario dipisah koma')
+        parser.add_argument('--seed', type=int, default=None, help='Seed random supaya data bisa diulang')
+        parser.add_argument('--midtrans-delay', type=float, default=0.0, help='Delay stub Midtrans (detik)')
+        parser.add_argument('--save-baseline', metavar='PATH', help='Simpan hasil sebagai baseline JSON')
+        parser.add_argument('--baseline', metavar='PATH', help='Bandingkan hasil dengan baseline JSON')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Toleransi regresi p95/rps (0.2 = 20%%)')
+        parser.add_argument('--fail-on-regression', action='store_true',
+                            help='Exit dengan error kalau ada regresi terhadap baseline')
+
+    def handle(self, *args, **options):
+        scenarios = [s.strip() for s in options['scenarios'].split(',') if s.strip()]
+        unknown = set(scenarios) - set(bench.SCENARIOS)
+        if unknown:
+            raise CommandError(f'Skenario tidak dikenal: {", ".join(sorted(unknown))}')
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+
+        results = self.run_isolated(scenarios, options)
+        self.stdout.write(bench.format_report(results))
+
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f'Baseline disimpan ke {options["save_baseline"]}')
+        if baseline is not None:
+            rows = bench.compare(results, baseline, options['tolerance'])
+            regressions = [row for row in rows if row['regression']]
+            for row in rows:
+                flag = 'REGRESI' if row['regression'] else 'ok'
+                self.stdout.write(
+                    f"{row['scenario']:<26}{row['metric']:<22}{row['baseline']:>10} -> {row['current']:<10} {flag}"
+                )
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f'{len(regressions)} metrik regresi terhadap baseline')
+
+    def run_isolated(self, scenarios, options):
+        """Buat database test sementara (tidak menyentuh data asli), seed, jalankan, lalu hapus."""
+        setup_test_environment()
+        # Log JSON per request terlalu ramai untuk ribuan request; statistik diambil dari metrics.store
+        logging.getLogger('app.metrics').setLevel(logging.WARNING)
+        tmp = tempfile.TemporaryDirectory()
+        if connection.vendor == 'sqlite':
+            # File, bukan :memory:, supaya thread klien berbagi database yang sama
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(tmp.name, 'bench.sqlite3')
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        stub = MidtransStubServer(delay=options['midtrans_delay']).start()
+        try:
+            with override_settings(MIDTRANS_SNAP_URL=stub.url):
+                midtrans.reset_session()
+                counts = loadgen.seed(orders=options['orders'], products=options['products'], seed=options['seed'])
+                self.stdout.write(f'Seed: {counts}')
+                return bench.run(scenarios, options['requests'], options['concurrency'], options['seed'])
+        finally:
+            stub.stop()
+            midtrans.reset_session()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            tmp.cleanup()
+            teardown_test_environment()
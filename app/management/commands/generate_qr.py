@@ -1,20 +1,37 @@
-from django.core.management.base import BaseCommand
+import time
+from django.core.management.base import BaseCommand, CommandError
+from app import qr
 from app.models import Table
-import qrcode
-import os
-from django.conf import settings
 
 class Command(BaseCommand):
-    help = 'Generate QR code for each table'
+    help = (
+        'Generate QR code untuk meja yang URL/gayanya berubah (inkremental, paralel), '
+        'opsional lembar cetak PDF atau zip'
+    )
 
-    def handle(self, *args, **kwargs):
-        qr_dir = os.path.join(settings.MEDIA_ROOT, 'qr_codes')
-        os.makedirs(qr_dir, exist_ok=True)
-        for table in Table.objects.all():
-            url = f'https://pos-wk/order/meja-{table.table_number}/'
-            img = qrcode.make(url)
-            img_path = os.path.join(qr_dir, f'meja-{table.table_number}.png')
-            img.save(img_path)
-            table.qr_code = f'qr_codes/meja-{table.table_number}.png'
-            table.save()
-        self.stdout.write(self.style.SUCCESS('QR codes generated for all tables.'))
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Render ulang semua meja')
+        parser.add_argument('--workers', type=int, default=None, help='Jumlah proses (default: jumlah CPU, 1 = serial)')
+        parser.add_argument('--url', default=None, help='Template URL, {table} diganti nomor meja (default: settings.QR_TABLE_URL)')
+        parser.add_argument('--tables', default='', help='Nomor meja dipisah koma (default: semua)')
+        parser.add_argument('--sheet', metavar='PATH', help='Tulis semua QR ke satu file .pdf atau .zip')
+
+    def handle(self, *args, **options):
+        if options['url'] and '{table}' not in options['url']:
+            raise CommandError('--url harus mengandung {table}')
+        if options['sheet'] and not options['sheet'].lower().endswith(('.pdf', '.zip')):
+            raise CommandError('--sheet harus berakhiran .pdf atau .zip')
+        tables = Table.objects.all()
+        numbers = [n.strip() for n in options['tables'].split(',') if n.strip()]
+        if numbers:
+            tables = tables.filter(table_number__in=numbers)
+
+        started = time.perf_counter()
+        result = qr.generate(tables, force=options['force'], workers=options['workers'], url_template=options['url'])
+        self.stdout.write(self.style.SUCCESS(
+            f"QR dibuat: {len(result['generated'])}, dilewati (tidak berubah): {result['skipped']} "
+            f"({time.perf_counter() - started:.2f}s)"
+        ))
+        if options['sheet']:
+            count = qr.build_sheet(options['sheet'], tables)
+            self.stdout.write(self.style.SUCCESS(f"{count} QR ditulis ke {options['sheet']}"))
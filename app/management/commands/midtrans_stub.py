@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from app.midtrans_stub import MidtransStubServer
+
+class Command(BaseCommand):
+    help = 'Run a local stub of the Midtrans Snap API for offline testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--delay', type=float, default=0, help='Delay respon (detik)')
+
+    def handle(self, *args, **options):
+        server = MidtransStubServer(options['host'], options['port'], delay=options['delay'], verbose=True)
+        self.stdout.write(self.style.SUCCESS(f'Midtrans stub listening on {server.url}'))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
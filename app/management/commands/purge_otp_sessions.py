@@ -0,0 +1,31 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from app.models import CustomerOTPSession
+
+
+class Command(BaseCommand):
+    help = 'Hapus sesi OTP yang sudah kedaluwarsa, per batch supaya tidak mengunci tabel lama'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--grace-minutes', type=int, default=60,
+                            help='Hanya hapus sesi yang kedaluwarsa lebih dari N menit lalu (default 60)')
+        parser.add_argument('--sleep', type=float, default=0.05,
+                            help='Jeda antar batch (detik) supaya request lain bisa menulis')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(minutes=options['grace_minutes'])
+        expired = CustomerOTPSession.objects.filter(expires_at__lt=cutoff).order_by('id')
+        total = 0
+        while True:
+            ids = list(expired.values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            deleted, _ = CustomerOTPSession.objects.filter(id__in=ids).delete()
+            total += deleted
+            if len(ids) < options['batch_size']:
+                break
+            time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(f'{total} sesi OTP dihapus.'))
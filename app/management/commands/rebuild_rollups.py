@@ -0,0 +1,19 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from app import rollups
+
+class Command(BaseCommand):
+    help = 'Rebuild (backfill/repair) the daily sales rollup tables from orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='Tanggal awal (YYYY-MM-DD), default: semua data')
+        parser.add_argument('--end', help='Tanggal akhir (YYYY-MM-DD), default: semua data')
+
+    def handle(self, *args, **options):
+        try:
+            start = datetime.strptime(options['start'], '%Y-%m-%d').date() if options['start'] else None
+            end = datetime.strptime(options['end'], '%Y-%m-%d').date() if options['end'] else None
+        except ValueError:
+            raise CommandError('Format tanggal harus YYYY-MM-DD.')
+        days = rollups.rebuild(start, end)
+        self.stdout.write(self.style.SUCCESS(f'Rollup rebuilt for {days} day(s).'))
@@ -0,0 +1,40 @@
+import time
+from django.core.management.base import BaseCommand
+from app import loadgen
+
+
+class Command(BaseCommand):
+    help = (
+        'Isi database dengan data dummy skala production: produk, meja, pelanggan, '
+        'order berbulan-bulan (pola jam sibuk), OrderDetail dan Payment, memakai bulk_create per batch'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=100000, help='Jumlah order')
+        parser.add_argument('--products', type=int, default=50)
+        parser.add_argument('--tables', type=int, default=20)
+        parser.add_argument('--customers', type=int, default=2000, help='Jumlah pelanggan QR (nomor HP)')
+        parser.add_argument('--days', type=int, default=180, help='Rentang hari ke belakang')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Order per batch/transaksi')
+        parser.add_argument('--seed', type=int, default=None, help='Seed random supaya data bisa diulang')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        def progress(created):
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'{created}/{options["orders"]} order ({created / elapsed:.0f} order/s)')
+
+        counts = loadgen.seed(
+            orders=options['orders'],
+            products=options['products'],
+            tables=options['tables'],
+            customers=options['customers'],
+            days=options['days'],
+            batch_size=options['batch_size'],
+            seed=options['seed'],
+            progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Selesai dalam {time.perf_counter() - started:.1f}s: {counts} (rollup dibangun ulang)'
+        ))
@@ -1,5 +1,6 @@
 import random
 from django.core.management.base import BaseCommand
+from app import catalog
 from app.models import Product
 from faker import Faker
 
@@ -22,6 +23,7 @@ class Command(BaseCommand):
             'snack': ['Kerupuk', 'Kacang Goreng', 'Singkong Goreng', 'Martabak Mini', 'Cilok', 'Tahu Crispy']
         }
 
+        products = []
         for _ in range(num_products):
             # Pilih kategori produk secara acak
             category = random.choice(list(warkop_menu.keys()))
@@ -38,14 +40,18 @@ class Command(BaseCommand):
                 price = random.uniform(3000, 15000)
 
             # Generate data dummy untuk setiap produk
-            product = Product(
+            products.append(Product(
                 name=name,
                 description=fake.text(),
                 price=round(price, 2),  # Harga dalam format dua desimal
                 stock=random.randint(5, 50),  # Stok acak antara 5 hingga 50
                 category=category,  # Kategori yang sudah dipilih
                 image='products/default.jpg'  # Gunakan gambar default jika belum ada
-            )
-            product.save()
+            ))
+
+        # Satu INSERT untuk semua produk (untuk data order skala besar pakai `seed_load`).
+        # bulk_create tidak memicu post_save, jadi versi katalog dinaikkan manual
+        Product.objects.bulk_create(products)
+        catalog.bump_version()
 
         self.stdout.write(self.style.SUCCESS(f'{num_products} products created successfully with relevant warkop menu!'))
\ No newline at end of file
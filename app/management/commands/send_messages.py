@@ -0,0 +1,37 @@
+import signal
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from app import messaging
+
+
+class Command(BaseCommand):
+    help = 'Worker antrian pesan keluar (OTP WhatsApp): kirim paralel dengan retry dan dead letter'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Jumlah thread pengirim')
+        parser.add_argument('--batch-size', type=int, default=50, help='Pesan yang diklaim per putaran')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Jeda saat antrian kosong (detik)')
+        parser.add_argument('--once', action='store_true', help='Kirim yang sudah jatuh tempo lalu berhenti')
+
+    def handle(self, *args, **options):
+        transport = messaging.get_transport()
+        if options['once']:
+            totals = messaging.drain(transport, options['workers'], options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Selesai: {totals or "antrian kosong"}'))
+            return
+
+        stopping = []
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *args: stopping.append(True))
+        worker_id = uuid.uuid4().hex
+        self.stdout.write(f'Worker {worker_id[:8]} jalan dengan {options["workers"]} thread ({transport.__class__.__name__}).')
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            while not stopping:
+                results = messaging.process_batch(transport, executor, options['batch_size'], worker_id)
+                if results:
+                    self.stdout.write(f'{results}')
+                else:
+                    time.sleep(options['poll_interval'])
+        self.stdout.write('Worker berhenti.')
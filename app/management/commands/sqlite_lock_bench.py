@@ -0,0 +1,97 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from app.db import pragma_statements
+
+# Setelan bawaan Django: rollback journal, transaksi DEFERRED, timeout 5 detik
+DEFAULT_PROFILE = {'pragmas': {}, 'begin': 'BEGIN', 'timeout': 5.0}
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark penulis bersamaan di SQLite: bandingkan jumlah error "database is locked" '
+        'antara setelan bawaan dan profil production (settings.SQLITE_PRAGMAS).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Jumlah thread penulis')
+        parser.add_argument('--orders', type=int, default=100, help='Order per worker')
+        parser.add_argument('--timeout', type=float, default=None,
+                            help='Timeout koneksi (detik) untuk kedua profil, default: setelan masing-masing')
+
+    def handle(self, *args, **options):
+        tuned = {
+            'pragmas': settings.SQLITE_PRAGMAS or {'journal_mode': 'WAL', 'synchronous': 'NORMAL'},
+            'begin': 'BEGIN IMMEDIATE',
+            # Sama dengan profil production: waktu tunggu lock hanya dari timeout koneksi
+            'timeout': float(settings.DATABASES['default'].get('OPTIONS', {}).get('timeout', 20.0)),
+        }
+        for name, profile in (('default', DEFAULT_PROFILE), ('production', tuned)):
+            if options['timeout'] is not None:
+                profile = {**profile, 'timeout': options['timeout']}
+            result = self.run_profile(profile, options['workers'], options['orders'])
+            total = result['ok'] + result['locked']
+            self.stdout.write(
+                f"{name:<11} ok={result['ok']:<6} locked={result['locked']:<6} "
+                f"error_rate={result['locked'] / total:.1%}  "
+                f"{result['ok'] / result['elapsed']:.0f} order/s  ({result['elapsed']:.2f}s)"
+            )
+
+    def run_profile(self, profile, workers, orders):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.sqlite3')
+            setup = sqlite3.connect(path, isolation_level=None)
+            for statement in pragma_statements(profile['pragmas']):
+                setup.execute(statement)
+            setup.executescript('''
+                CREATE TABLE product (id INTEGER PRIMARY KEY, stock INTEGER NOT NULL);
+                CREATE TABLE orders (id INTEGER PRIMARY KEY, product_id INTEGER, qty INTEGER, status TEXT);
+                INSERT INTO product (id, stock) VALUES (1, 1000000), (2, 1000000), (3, 1000000);
+            ''')
+            setup.close()
+
+            counts = {'ok': 0, 'locked': 0}
+            lock = threading.Lock()
+            start_barrier = threading.Barrier(workers)
+
+            def worker(n):
+                conn = sqlite3.connect(path, timeout=profile['timeout'], isolation_level=None,
+                                       check_same_thread=False)
+                for statement in pragma_statements(profile['pragmas']):
+                    conn.execute(statement)
+                start_barrier.wait()
+                ok = locked = 0
+                for i in range(orders):
+                    product_id = (n + i) % 3 + 1
+                    try:
+                        # Pola yang sama dengan create_order / webhook: baca dulu, lalu tulis
+                        conn.execute(profile['begin'])
+                        conn.execute('SELECT stock FROM product WHERE id = ?', (product_id,)).fetchone()
+                        conn.execute('UPDATE product SET stock = stock - 1 WHERE id = ? AND stock >= 1', (product_id,))
+                        conn.execute("INSERT INTO orders (product_id, qty, status) VALUES (?, 1, 'Processing')",
+                                     (product_id,))
+                        conn.execute('COMMIT')
+                        ok += 1
+                    except sqlite3.OperationalError as e:
+                        if conn.in_transaction:
+                            conn.execute('ROLLBACK')
+                        if 'locked' not in str(e) and 'busy' not in str(e):
+                            raise
+                        locked += 1
+                conn.close()
+                with lock:
+                    counts['ok'] += ok
+                    counts['locked'] += locked
+
+            threads = [threading.Thread(target=worker, args=(n,)) for n in range(workers)]
+            started = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            counts['elapsed'] = time.perf_counter() - started
+            return counts
@@ -0,0 +1,187 @@
+# app/messaging.py
+# Antrian pesan keluar (WhatsApp via Twilio).
+# View cukup memanggil enqueue_whatsapp() (1 INSERT); pengiriman dilakukan worker
+# `python manage.py send_messages` dengan thread pool terbatas, retry dengan backoff,
+# dan pesan yang terus gagal ditandai 'dead' (dead letter) supaya bisa dicek di admin.
+# Pesan dengan expires_at (OTP) yang belum terkirim sampai waktunya juga jadi 'dead'.
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import OutboundMessage
+
+logger = logging.getLogger(__name__)
+
+
+class MessageError(Exception):
+    """Gagal kirim. permanent=True: tidak perlu dicoba lagi (misal nomor tidak valid)."""
+
+    def __init__(self, message, permanent=False):
+        super().__init__(message)
+        self.permanent = permanent
+
+
+def _config():
+    return {
+        'max_attempts': getattr(settings, 'MESSAGE_MAX_ATTEMPTS', 5),
+        'backoff': getattr(settings, 'MESSAGE_RETRY_BACKOFF', 5),  # detik, dikali 2^(attempts-1)
+        'max_backoff': getattr(settings, 'MESSAGE_RETRY_MAX_BACKOFF', 15 * 60),
+        'lock_timeout': getattr(settings, 'MESSAGE_LOCK_TIMEOUT', 5 * 60),
+    }
+
+
+def to_e164(phone):
+    """08xxx / 628xxx / +628xxx -> +628xxx"""
+    phone = ''.join(c for c in phone if c.isdigit() or c == '+')
+    if phone.startswith('0'):
+        return '+62' + phone[1:]
+    if not phone.startswith('+'):
+        return '+' + phone
+    return phone
+
+
+class TwilioTransport:
+    def __init__(self):
+        from twilio.rest import Client
+        self.client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+
+    def send(self, message):
+        from twilio.base.exceptions import TwilioRestException
+        try:
+            result = self.client.messages.create(
+                from_=f'whatsapp:{settings.TWILIO_WHATSAPP_FROM}',
+                to=f'whatsapp:{to_e164(message.to)}',
+                body=message.body,
+            )
+        except TwilioRestException as e:
+            # 4xx (nomor salah, dll) tidak akan berhasil walau diulang, kecuali 429
+            raise MessageError(str(e), permanent=400 <= e.status < 500 and e.status != 429)
+        return result.sid
+
+
+class FakeTwilioTransport:
+    """
+    Transport palsu untuk development dan test: pesan dicatat di FakeTwilioTransport.sent
+    dan di log. fail_times: jumlah kiriman pertama yang dibuat gagal (uji retry).
+    """
+    sent = []
+    fail_times = 0
+    permanent = False
+
+    def send(self, message):
+        if FakeTwilioTransport.fail_times > 0:
+            FakeTwilioTransport.fail_times -= 1
+            raise MessageError('fake failure', permanent=FakeTwilioTransport.permanent)
+        FakeTwilioTransport.sent.append({'to': to_e164(message.to), 'body': message.body})
+        logger.info(f"[fake whatsapp] ke {message.to}: {message.body}")
+        return f'FAKE{uuid.uuid4().hex[:30]}'
+
+
+def get_transport():
+    return import_string(getattr(settings, 'MESSAGE_TRANSPORT', 'app.messaging.FakeTwilioTransport'))()
+
+
+def enqueue_whatsapp(to, body, expires_at=None):
+    """expires_at: pesan tidak dikirim lagi setelah waktu ini (misal OTP yang sudah tidak berlaku)."""
+    return OutboundMessage.objects.create(channel='whatsapp', to=to, body=body, expires_at=expires_at)
+
+
+def _expire(queryset, now):
+    return queryset.update(
+        status='dead', next_attempt_at=now, last_error='Kedaluwarsa sebelum terkirim', locked_by='', locked_at=None,
+    )
+
+
+def claim_batch(limit, worker_id):
+    """
+    Ambil sampai `limit` pesan yang siap dikirim dan tandai 'sending' milik worker ini.
+    Klaim memakai UPDATE bersyarat, jadi dua worker tidak pernah mengirim pesan yang sama.
+    Pesan 'sending' yang macet (worker mati) diambil lagi setelah MESSAGE_LOCK_TIMEOUT.
+    Pesan yang sudah lewat expires_at ditandai 'dead' dan tidak diklaim.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=_config()['lock_timeout'])
+    _expire(OutboundMessage.objects.filter(status='pending', expires_at__lte=now), now)
+    due = OutboundMessage.objects.filter(status='pending', next_attempt_at__lte=now)
+    stuck = OutboundMessage.objects.filter(status='sending', locked_at__lt=stale)
+    ids = list(due.order_by('next_attempt_at').values_list('id', flat=True)[:limit])
+    ids += list(stuck.values_list('id', flat=True)[:max(limit - len(ids), 0)])
+    if not ids:
+        return []
+    OutboundMessage.objects.filter(id__in=ids).filter(
+        status='pending', next_attempt_at__lte=now
+    ).update(status='sending', locked_by=worker_id, locked_at=now)
+    OutboundMessage.objects.filter(id__in=ids).filter(
+        status='sending', locked_at__lt=stale
+    ).update(locked_by=worker_id, locked_at=now)
+    return list(OutboundMessage.objects.filter(id__in=ids, status='sending', locked_by=worker_id))
+
+
+def deliver(message, transport):
+    """Kirim satu pesan dan simpan hasilnya. Return status akhir pesan."""
+    config = _config()
+    if message.expires_at and message.expires_at <= timezone.now():
+        # Kedaluwarsa setelah diklaim (antri retry / worker lambat): jangan kirim OTP basi
+        _expire(OutboundMessage.objects.filter(id=message.id, locked_by=message.locked_by), timezone.now())
+        logger.warning(f"Pesan {message.id} ke {message.to} kedaluwarsa sebelum terkirim")
+        return 'dead'
+    attempts = message.attempts + 1
+    try:
+        provider_id = transport.send(message)
+    except Exception as e:
+        permanent = getattr(e, 'permanent', False)
+        if permanent or attempts >= config['max_attempts']:
+            status, next_attempt_at = 'dead', timezone.now()
+            logger.error(f"Pesan {message.id} ke {message.to} gagal permanen: {e}")
+        else:
+            delay = min(config['backoff'] * 2 ** (attempts - 1), config['max_backoff'])
+            status, next_attempt_at = 'pending', timezone.now() + timedelta(seconds=delay)
+            logger.warning(f"Pesan {message.id} ke {message.to} gagal (percobaan {attempts}), retry {delay}s: {e}")
+        OutboundMessage.objects.filter(id=message.id, locked_by=message.locked_by).update(
+            status=status, attempts=attempts, next_attempt_at=next_attempt_at,
+            last_error=str(e)[:1000], locked_by='', locked_at=None,
+        )
+        return status
+    OutboundMessage.objects.filter(id=message.id, locked_by=message.locked_by).update(
+        status='sent', attempts=attempts, provider_id=provider_id or '', sent_at=timezone.now(),
+        last_error='', locked_by='', locked_at=None,
+    )
+    return 'sent'
+
+
+def _deliver_in_thread(message, transport):
+    try:
+        return deliver(message, transport)
+    finally:
+        # Setiap thread punya koneksi DB sendiri; tutup supaya tidak bocor
+        connection.close()
+
+
+def process_batch(transport, executor, limit=50, worker_id=None):
+    """
+    Klaim satu batch dan kirim paralel di executor (ThreadPoolExecutor).
+    Return: dict {status: jumlah} untuk batch ini.
+    """
+    messages = claim_batch(limit, worker_id or uuid.uuid4().hex)
+    results = {}
+    for status in executor.map(lambda m: _deliver_in_thread(m, transport), messages):
+        results[status] = results.get(status, 0) + 1
+    return results
+
+
+def drain(transport=None, workers=4, limit=50):
+    """Kirim semua pesan yang sudah jatuh tempo sampai antrian kosong (dipakai test / --once)."""
+    transport = transport or get_transport()
+    worker_id = uuid.uuid4().hex
+    totals = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            results = process_batch(transport, executor, limit, worker_id)
+            if not results:
+                return totals
+            for status, count in results.items():
+                totals[status] = totals.get(status, 0) + count
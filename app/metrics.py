@@ -0,0 +1,169 @@
+# app/metrics.py
+# Statistik per view: jumlah query SQL, waktu DB, waktu HTTP keluar (Midtrans) dan
+# wall time. Dicatat oleh app.middleware.InstrumentationMiddleware, disimpan di memori
+# proses (rolling window) dan bisa dilihat owner lewat /owner/metrics/.
+import contextvars
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from django.conf import settings
+
+# Batas atas bucket histogram wall time (ms); bucket terakhir = lebih dari itu
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_current = contextvars.ContextVar('request_stats', default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_time', 'http_time', 'http_calls')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.http_time = 0.0
+        self.http_calls = 0
+
+
+def start_request():
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def count_query(execute, sql, params, many, context):
+    """
+    execute_wrapper permanen di setiap koneksi (lihat install_query_counter): hitung query
+    ke stats request yang sedang jalan. Stats dibaca dari contextvar, jadi ikut terbawa ke
+    thread sync_to_async yang menjalankan view sync di bawah ASGI.
+    """
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - started
+
+
+def install_query_counter(connection, **kwargs):
+    """Handler signal connection_created. Dipasang di depan daftar wrapper supaya
+    connection.execute_wrapper() lain (yang pop() dari belakang) tidak melepasnya."""
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, count_query)
+
+
+def counting(stats, parts):
+    """Iterasi body StreamingHttpResponse dengan stats request aktif, supaya query di dalam generator ikut terhitung."""
+    iterator = iter(parts)
+    while True:
+        token = _current.set(stats)
+        try:
+            part = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _current.reset(token)
+        yield part
+
+
+@contextmanager
+def track_http(name='http'):
+    """Bungkus panggilan HTTP keluar (misal Midtrans) supaya waktunya tercatat di request yang sedang jalan."""
+    stats = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if stats is not None:
+            stats.http_time += time.perf_counter() - started
+            stats.http_calls += 1
+
+
+class MetricsStore:
+    """Sampel per view dalam rolling window (detik), dibatasi max_samples per view."""
+
+    def __init__(self, window=300, max_samples=2000):
+        self.window = window
+        self.max_samples = max_samples
+        self._samples = defaultdict(lambda: deque(maxlen=self.max_samples))
+        self._lock = threading.Lock()
+
+    def record(self, view, wall, stats, status):
+        sample = (time.time(), wall, stats.queries, stats.db_time, stats.http_time, status)
+        with self._lock:
+            self._samples[view].append(sample)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    @staticmethod
+    def _percentile(sorted_values, pct):
+        if not sorted_values:
+            return 0.0
+        index = min(int(round(pct / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+        return sorted_values[index]
+
+    def snapshot(self):
+        """
+        Return: dict {view: {count, errors, wall_ms: {p50, p95, p99, max}, avg_queries,
+        max_queries, avg_db_ms, avg_http_ms, histogram: {bucket: count}}}
+        """
+        cutoff = time.time() - self.window
+        with self._lock:
+            samples = {view: [s for s in rows if s[0] >= cutoff] for view, rows in self._samples.items()}
+        result = {}
+        for view, rows in samples.items():
+            if not rows:
+                continue
+            walls = sorted(s[1] * 1000 for s in rows)
+            histogram = {f'<={b}ms': 0 for b in BUCKETS_MS}
+            histogram[f'>{BUCKETS_MS[-1]}ms'] = 0
+            for wall in walls:
+                bucket = next((f'<={b}ms' for b in BUCKETS_MS if wall <= b), f'>{BUCKETS_MS[-1]}ms')
+                histogram[bucket] += 1
+            count = len(rows)
+            result[view] = {
+                'count': count,
+                'errors': sum(1 for s in rows if s[5] >= 500),
+                'wall_ms': {
+                    'p50': round(self._percentile(walls, 50), 2),
+                    'p95': round(self._percentile(walls, 95), 2),
+                    'p99': round(self._percentile(walls, 99), 2),
+                    'max': round(walls[-1], 2),
+                },
+                'avg_queries': round(sum(s[2] for s in rows) / count, 2),
+                'max_queries': max(s[2] for s in rows),
+                'avg_db_ms': round(sum(s[3] for s in rows) / count * 1000, 2),
+                'avg_http_ms': round(sum(s[4] for s in rows) / count * 1000, 2),
+                'histogram': histogram,
+            }
+        return result
+
+
+store = MetricsStore(window=getattr(settings, 'METRICS_WINDOW_SECONDS', 300))
+
+
+def check_budget(view, stats):
+    """
+    Bandingkan jumlah query dengan settings.QUERY_BUDGETS[view].
+    Return pesan pelanggaran (str) atau None. Kalau QUERY_BUDGET_RAISE aktif (saat test),
+    raise QueryBudgetExceeded supaya regresi N+1 langsung gagal.
+    """
+    budget = getattr(settings, 'QUERY_BUDGETS', {}).get(view)
+    if budget is None or stats.queries <= budget:
+        return None
+    message = f'{view} menjalankan {stats.queries} query, budget {budget}'
+    if getattr(settings, 'QUERY_BUDGET_RAISE', False):
+        raise QueryBudgetExceeded(message)
+    return message
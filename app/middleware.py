@@ -0,0 +1,93 @@
+# app/middleware.py
+import json
+import logging
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from . import metrics
+
+logger = logging.getLogger('app.metrics')
+
+
+class InstrumentationMiddleware:
+    """
+    Catat per request: jumlah query, waktu DB, waktu HTTP keluar dan wall time,
+    dikelompokkan per nama view (url name). Hasilnya masuk ke metrics.store,
+    satu baris log JSON (logger 'app.metrics') dan dicek terhadap QUERY_BUDGETS.
+    Query dihitung oleh metrics.count_query lewat contextvar, jadi berlaku sama di WSGI dan
+    ASGI (view sync di bawah ASGI jalan di thread sync_to_async yang mewarisi context request).
+    Untuk StreamingHttpResponse sync (export CSV) query dihitung sampai body selesai dikirim /
+    response ditutup. Body async (SSE) tidak dihitung: koneksinya hidup selama browser terbuka.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token = metrics.start_request()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        return self.finish(request, response, stats, started)
+
+    async def __acall__(self, request):
+        stats, token = metrics.start_request()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        return self.finish(request, response, stats, started)
+
+    def finish(self, request, response, stats, started):
+        if response.streaming and not response.is_async:
+            self.record_when_closed(request, response, stats, started)
+        else:
+            self.record(request, response, stats, time.perf_counter() - started)
+        return response
+
+    def record_when_closed(self, request, response, stats, started):
+        """Hitung query selama body diiterasi; catat setelah selesai atau saat response ditutup."""
+        finished = []
+
+        def finish():
+            if finished:
+                return
+            finished.append(True)
+            self.record(request, response, stats, time.perf_counter() - started)
+
+        def content(parts):
+            try:
+                yield from metrics.counting(stats, parts)
+            finally:
+                finish()
+
+        response.streaming_content = content(response.streaming_content)
+        # Generator yang belum sempat diiterasi tidak menjalankan finally saat di-close,
+        # jadi finish() juga didaftarkan langsung ke response.close()
+        response._resource_closers.append(finish)
+
+    def record(self, request, response, stats, wall):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        metrics.store.record(view, wall, stats, response.status_code)
+        violation = metrics.check_budget(view, stats)
+        logger.info(json.dumps({
+            'view': view,
+            'method': request.method,
+            'status': response.status_code,
+            'wall_ms': round(wall * 1000, 2),
+            'db_ms': round(stats.db_time * 1000, 2),
+            'queries': stats.queries,
+            'http_ms': round(stats.http_time * 1000, 2),
+            'http_calls': stats.http_calls,
+        }))
+        if violation:
+            logger.warning(violation)
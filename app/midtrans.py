@@ -0,0 +1,312 @@
+# app/midtrans.py
+# Client Midtrans Snap: satu session HTTP keep-alive yang dipakai ulang,
+# timeout ketat dan retry dengan backoff untuk gagal koneksi dan 429 / 503.
+# Pembuatan transaksi Snap tidak idempoten: read timeout dan 500/502/504 (request mungkin
+# sudah diproses Midtrans) TIDAK di-retry, supaya tidak terbentuk transaksi ganda.
+# Header Retry-After dihormati; kalau lebih lama dari MIDTRANS_RETRY_AFTER_MAX, tidak di-retry.
+# Versi async (aiohttp + aiohttp-retry) untuk view async.
+import asyncio
+import email.utils
+import threading
+import time
+import weakref
+from datetime import timedelta
+from decimal import Decimal
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from .metrics import track_http
+from .models import Order
+
+ENABLED_PAYMENTS = [
+    'gopay', 'qris', 'bank_transfer', 'echannel', 'bca_klikbca',
+    'bca_klikpay', 'bri_epay', 'cimb_clicks', 'danamon_online',
+    'indomaret', 'alfamart', 'akulaku',
+]
+# Hanya status yang berarti request ditolak sebelum diproses
+RETRY_STATUSES = (429, 503)
+# Masa berlaku Snap token kalau payload tidak menentukan 'expiry'
+SNAP_TOKEN_LIFETIME = 24 * 60 * 60
+EXPIRY_UNITS = {'second': 1, 'minute': 60, 'hour': 60 * 60, 'day': 24 * 60 * 60}
+
+_session = None
+_session_lock = threading.Lock()
+_async_sessions = weakref.WeakKeyDictionary()
+
+
+class MidtransError(Exception):
+    pass
+
+
+def _config():
+    timeout = getattr(settings, 'MIDTRANS_TIMEOUT', (3.05, 10))
+    return {
+        'url': getattr(settings, 'MIDTRANS_SNAP_URL', 'https://app.sandbox.midtrans.com/snap/v1/transactions'),
+        'server_key': getattr(settings, 'MIDTRANS_SERVER_KEY', ''),
+        'connect_timeout': timeout[0],
+        'read_timeout': timeout[1],
+        'retries': getattr(settings, 'MIDTRANS_RETRIES', 2),
+        'backoff': getattr(settings, 'MIDTRANS_BACKOFF', 0.3),
+    }
+
+
+def build_snap_payload(order_id, items, customer_details):
+    """
+    order_id: id Order
+    items: list of dict [{'id':..., 'price': int, 'quantity': int, 'name':...}]
+    customer_details: dict {'first_name': ..., 'phone': ..., ...}
+    """
+    return {
+        'transaction_details': {
+            'order_id': str(order_id),
+            'gross_amount': sum(item['price'] * item['quantity'] for item in items),
+        },
+        'item_details': items,
+        'customer_details': customer_details,
+        'enabled_payments': ENABLED_PAYMENTS,
+    }
+
+
+def retry_after_seconds(value):
+    """Nilai header Retry-After (detik atau HTTP-date) dalam detik; None kalau tidak ada / tidak valid."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    parsed = email.utils.parsedate_tz(value)
+    if parsed is None:
+        return None
+    return max(email.utils.mktime_tz(parsed) - time.time(), 0)
+
+
+def _retry_after_max():
+    return getattr(settings, 'MIDTRANS_RETRY_AFTER_MAX', 5)
+
+
+class SnapRetry(Retry):
+    """Retry urllib3 yang berhenti (respon dikembalikan apa adanya) kalau Retry-After terlalu lama untuk request checkout."""
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if response is not None:
+            retry_after = retry_after_seconds(response.headers.get('Retry-After'))
+            if retry_after is not None and retry_after > _retry_after_max():
+                raise MaxRetryError(_pool, url, ResponseError(f'Retry-After {retry_after:.0f}s'))
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+def get_session():
+    """Session requests bersama (connection pool keep-alive) untuk semua request ke Midtrans."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                config = _config()
+                retry = SnapRetry(
+                    total=config['retries'],
+                    read=0,  # respon lambat bisa berarti transaksi sudah dibuat; jangan kirim ulang
+                    backoff_factor=config['backoff'],
+                    status_forcelist=RETRY_STATUSES,
+                    allowed_methods=frozenset(['POST']),
+                    respect_retry_after_header=True,
+                    raise_on_status=False,
+                )
+                session = requests.Session()
+                session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry))
+                session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry))
+                session.auth = (config['server_key'], '')
+                session.headers.update({'Accept': 'application/json', 'Content-Type': 'application/json'})
+                _session = session
+    return _session
+
+
+def reset_session():
+    """Tutup session (misal setelah settings Midtrans diganti di test)."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def _token_from(status, body, text):
+    token = body.get('token') if isinstance(body, dict) else None
+    if status >= 400 or not token:
+        raise MidtransError(text or f'Midtrans HTTP {status}')
+    return token
+
+
+def create_snap_token(payload):
+    """
+    Buat transaksi Snap dan kembalikan token-nya.
+    Raise MidtransError kalau gagal (timeout, error jaringan, atau respon tanpa token).
+    """
+    config = _config()
+    try:
+        with track_http('midtrans'):
+            response = get_session().post(
+                config['url'], json=payload, timeout=(config['connect_timeout'], config['read_timeout'])
+            )
+    except requests.RequestException as e:
+        raise MidtransError(str(e))
+    try:
+        body = response.json()
+    except ValueError:
+        body = None
+    return _token_from(response.status_code, body, response.text)
+
+
+def _token_cache_key(order_id):
+    return f'midtrans:snap:{order_id}'
+
+
+def _cached_token(order_id, amount):
+    cached = cache.get(_token_cache_key(order_id))
+    if cached and cached['amount'] == amount:
+        return cached['token']
+    return None
+
+
+def token_expires_at(payload, created):
+    """Waktu token Snap kedaluwarsa: 'expiry' di payload (duration + unit), default 24 jam."""
+    expiry = payload.get('expiry') or {}
+    try:
+        lifetime = int(expiry['duration']) * EXPIRY_UNITS[expiry['unit'].rstrip('s')]
+    except (KeyError, TypeError, ValueError, AttributeError):
+        lifetime = SNAP_TOKEN_LIFETIME
+    return created + timedelta(seconds=lifetime)
+
+
+def _usable_for(expires_at):
+    """Sisa detik token masih boleh dipakai (sudah dikurangi margin); <= 0 berarti buat ulang."""
+    if expires_at is None:
+        return 0
+    margin = getattr(settings, 'MIDTRANS_SNAP_TOKEN_MARGIN', 10 * 60)
+    return int((expires_at - timezone.now()).total_seconds() - margin)
+
+
+def _remember_token(order_id, amount, token, expires_at):
+    ttl = _usable_for(expires_at)
+    if ttl > 0:
+        cache.set(_token_cache_key(order_id), {'amount': amount, 'token': token}, ttl)
+
+
+def get_snap_token(order, build_payload):
+    """
+    Snap token untuk order, dari cache / Order.snap_token kalau sudah pernah dibuat dengan total yang sama.
+    Tombol "Bayar" ditekan dua kali / checkout dibuka ulang tidak membuat transaksi Midtrans baru.
+    Token juga disimpan di Order supaya worker lain (cache locmem per proses) memakai token yang sama;
+    token yang (hampir) kedaluwarsa di Midtrans tidak dipakai lagi.
+    order: instance Order (yang dipakai id, total_price, snap_token, snap_amount, snap_token_expires_at)
+    build_payload: fungsi tanpa argumen yang mengembalikan payload Snap; hanya dipanggil kalau belum ada token
+    Raise MidtransError kalau gagal atau request lain masih membuat token untuk order yang sama.
+    """
+    amount = str(Decimal(order.total_price).quantize(Decimal('0.01')))
+    token = _cached_token(order.id, amount)
+    if token:
+        return token
+    if (order.snap_token and order.snap_amount is not None
+            and str(order.snap_amount.quantize(Decimal('0.01'))) == amount
+            and _usable_for(order.snap_token_expires_at) > 0):
+        _remember_token(order.id, amount, order.snap_token, order.snap_token_expires_at)
+        return order.snap_token
+    lock_key = f'{_token_cache_key(order.id)}:lock'
+    config = _config()
+    lock_timeout = (config['connect_timeout'] + config['read_timeout']) * (config['retries'] + 1)
+    if not cache.add(lock_key, 1, lock_timeout):
+        # Request lain untuk order yang sama sedang membuat token: tunggu hasilnya sebentar,
+        # jangan membuat transaksi sendiri (dan jangan menghapus lock milik request lain)
+        deadline = time.monotonic() + getattr(settings, 'MIDTRANS_SNAP_LOCK_WAIT', 5)
+        while time.monotonic() < deadline:
+            time.sleep(0.1)
+            token = _cached_token(order.id, amount)
+            if token:
+                return token
+            if cache.get(lock_key) is None:
+                break
+        raise MidtransError('Token pembayaran sedang dibuat, silakan coba lagi.')
+    try:
+        payload = build_payload()
+        expires_at = token_expires_at(payload, timezone.now())
+        token = create_snap_token(payload)
+        Order.objects.filter(id=order.id).update(snap_token=token, snap_amount=amount, snap_token_expires_at=expires_at)
+        order.snap_token, order.snap_amount, order.snap_token_expires_at = token, Decimal(amount), expires_at
+        _remember_token(order.id, amount, token, expires_at)
+        return token
+    finally:
+        cache.delete(lock_key)
+
+
+def invalidate_snap_token(order_id):
+    cache.delete(_token_cache_key(order_id))
+
+
+async def _get_async_session():
+    # Session aiohttp terikat ke event loop, jadi disimpan per loop
+    from aiohttp import BasicAuth, ClientConnectorError, ClientSession, ClientTimeout, TCPConnector
+    from aiohttp_retry import ExponentialRetry, RetryClient
+
+    loop = asyncio.get_running_loop()
+    client = _async_sessions.get(loop)
+    if client is None or client._client.closed:
+        config = _config()
+        session = ClientSession(
+            connector=TCPConnector(limit=16, keepalive_timeout=30),
+            timeout=ClientTimeout(sock_connect=config['connect_timeout'], sock_read=config['read_timeout']),
+            auth=BasicAuth(config['server_key'], ''),
+            headers={'Accept': 'application/json', 'Content-Type': 'application/json'},
+        )
+        class SnapRetry(ExponentialRetry):
+            def get_timeout(self, attempt, response=None):
+                retry_after = retry_after_seconds(response.headers.get('Retry-After')) if response is not None else None
+                return retry_after if retry_after is not None else super().get_timeout(attempt, response)
+
+        async def should_stop(response):
+            # Dipanggil untuk setiap respon; True = kembalikan respon apa adanya tanpa retry
+            if response.status not in RETRY_STATUSES:
+                return True
+            retry_after = retry_after_seconds(response.headers.get('Retry-After'))
+            return retry_after is not None and retry_after > _retry_after_max()
+
+        retry_options = SnapRetry(
+            attempts=config['retries'] + 1,
+            start_timeout=config['backoff'],
+            # Hanya gagal koneksi; timeout baca tidak di-retry (lihat read=0 di get_session)
+            exceptions={ClientConnectorError},
+            methods={'POST'},
+            retry_all_server_errors=False,
+            evaluate_response_callback=should_stop,
+        )
+        client = RetryClient(client_session=session, retry_options=retry_options, raise_for_status=False)
+        _async_sessions[loop] = client
+    return client
+
+
+async def create_snap_token_async(payload):
+    """Versi async create_snap_token untuk dipakai di view async (await)."""
+    config = _config()
+    client = await _get_async_session()
+    try:
+        with track_http('midtrans'):
+            async with client.post(config['url'], json=payload) as response:
+                text = await response.text()
+                try:
+                    body = await response.json(content_type=None)
+                except ValueError:
+                    body = None
+        return _token_from(response.status, body, text)
+    except MidtransError:
+        raise
+    except Exception as e:
+        raise MidtransError(str(e) or e.__class__.__name__)
+
+
+async def close_async_session():
+    """Tutup session aiohttp milik event loop yang sedang berjalan (saat shutdown)."""
+    client = _async_sessions.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
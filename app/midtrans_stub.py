@@ -0,0 +1,75 @@
+# app/midtrans_stub.py
+# Server HTTP lokal yang meniru endpoint Snap Midtrans, untuk test dan benchmark offline.
+# Jalankan: python manage.py midtrans_stub, lalu set MIDTRANS_SNAP_URL=http://127.0.0.1:8765/snap/v1/transactions
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MidtransStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        server.requests.append(json.loads(body or b'{}'))
+        if server.delay:
+            time.sleep(server.delay)
+        if server.failures > 0:
+            server.failures -= 1
+            headers = {'Retry-After': str(server.retry_after)} if server.retry_after is not None else {}
+            self._send(server.failure_status, {'error_messages': ['stub: service unavailable']}, headers)
+            return
+        token = uuid.uuid4().hex
+        self._send(201, {
+            'token': token,
+            'redirect_url': f'http://{self.headers.get("Host")}/snap/v2/vtweb/{token}',
+        })
+
+    def _send(self, status, data, headers=None):
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # Client sudah menyerah (timeout)
+            pass
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class MidtransStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, delay=0, failures=0, verbose=False):
+        super().__init__((host, port), MidtransStubHandler)
+        self.delay = delay  # detik, untuk mensimulasikan sandbox yang lambat
+        self.failures = failures  # jumlah respon gagal (failure_status) sebelum sukses
+        self.failure_status = 503
+        self.retry_after = None  # nilai header Retry-After pada respon gagal (detik)
+        self.verbose = verbose
+        self.requests = []
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/snap/v1/transactions'
+
+    def start(self):
+        """Jalankan di background thread (untuk test). Return: self."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
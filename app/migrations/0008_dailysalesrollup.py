@@ -0,0 +1,83 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import Coalesce, TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    # Dashboard dan laporan hanya membaca rollup; isi dari order yang sudah ada.
+    # Salinan beku dari app.rollups.rebuild() saat migration ini dibuat, hanya memakai
+    # model historis, supaya migration tetap jalan walau modul app berubah.
+    Order = apps.get_model('app', 'Order')
+    OrderDetail = apps.get_model('app', 'OrderDetail')
+    DailySalesRollup = apps.get_model('app', 'DailySalesRollup')
+    DailyProductSales = apps.get_model('app', 'DailyProductSales')
+    DailyPaymentSales = apps.get_model('app', 'DailyPaymentSales')
+    orders = Order.objects.filter(status='Completed')
+    daily = orders.annotate(day=TruncDate('date_ordered')).values('day').annotate(
+        count=Count('id'), total=Sum('total_price')).order_by()
+    products = OrderDetail.objects.filter(order__in=orders).annotate(day=TruncDate('order__date_ordered')).values(
+        'day', 'product_id').annotate(qty=Sum('quantity'), total=Sum(F('quantity') * F('price'), output_field=DecimalField())).order_by()
+    payments = orders.filter(payment_status='Paid').annotate(
+        day=TruncDate('date_ordered'), method=Coalesce('payment__payment_method', 'payment_method')).values(
+        'day', 'method').annotate(count=Count('id'), total=Sum('total_price')).order_by()
+    DailySalesRollup.objects.bulk_create(
+        [DailySalesRollup(date=row['day'], order_count=row['count'], total_income=row['total']) for row in daily],
+        batch_size=500,
+    )
+    DailyProductSales.objects.bulk_create(
+        [DailyProductSales(date=row['day'], product_id=row['product_id'], quantity=row['qty'], total=row['total']) for row in products],
+        batch_size=500,
+    )
+    DailyPaymentSales.objects.bulk_create(
+        [DailyPaymentSales(date=row['day'], payment_method=row['method'], order_count=row['count'], total=row['total']) for row in payments],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_rename_total_price_payment_amount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('order_count', models.IntegerField(default=0)),
+                ('total_income', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyPaymentSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('payment_method', models.CharField(max_length=50)),
+                ('order_count', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'unique_together': {('date', 'payment_method')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.product')),
+            ],
+            options={
+                'unique_together': {('date', 'product')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
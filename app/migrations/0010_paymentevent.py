@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_stockreservation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.CharField(max_length=50)),
+                ('transaction_id', models.CharField(blank=True, default='', max_length=100)),
+                ('status', models.CharField(max_length=30)),
+                ('payload', models.JSONField()),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('order_id', 'transaction_id', 'status'), name='unique_payment_event')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_paymentevent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customerotpsession',
+            index=models.Index(fields=['phone_number', 'created_at'], name='otp_phone_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'date_ordered'], name='order_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['payment_status', 'status'], name='order_payment_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['phone_number', 'source', 'date_ordered'], name='order_phone_source_date_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:07
+
+from django.db import migrations, models
+
+
+def backfill_summary(apps, schema_editor):
+    Order = apps.get_model('app', 'Order')
+    OrderDetail = apps.get_model('app', 'OrderDetail')
+    last_id = 0
+    while True:
+        orders = list(Order.objects.filter(id__gt=last_id).order_by('id')[:500])
+        if not orders:
+            break
+        items = {}
+        details = OrderDetail.objects.filter(order__in=orders).order_by('id').values_list(
+            'order_id', 'product__name', 'quantity', 'price',
+        )
+        for order_id, name, quantity, price in details:
+            items.setdefault(order_id, []).append({'name': name, 'qty': quantity, 'price': str(price)})
+        for order in orders:
+            order.summary = {'items': items.get(order.id, [])}
+        Order.objects.bulk_update(orders, ['summary'])
+        last_id = orders[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_outboundmessage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='summary',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(backfill_summary, migrations.RunPython.noop),
+    ]
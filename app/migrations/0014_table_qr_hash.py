@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_order_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='table',
+            name='qr_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0014_table_qr_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='snap_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='snap_token',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
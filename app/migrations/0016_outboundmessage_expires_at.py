@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0015_order_snap_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboundmessage',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:45
+
+import time
+
+from django.db import migrations, models
+
+
+def create_version_row(apps, schema_editor):
+    # Timestamp supaya key cache tidak bentrok dengan versi dari database lain
+    apps.get_model('app', 'CatalogVersion').objects.create(pk=1, version=int(time.time() * 1000))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0016_outboundmessage_expires_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_version_row, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0017_catalogversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='snap_token_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
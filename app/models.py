@@ -42,11 +42,21 @@ class Product(models.Model):
 class Table(models.Model):
     table_number = models.CharField(max_length=10, unique=True)  # Nomor meja
     qr_code = models.ImageField(upload_to='qr_codes/', blank=True, null=True)  # QR code untuk meja
+    qr_hash = models.CharField(max_length=64, blank=True, default='')  # hash URL + gaya QR terakhir (lihat app/qr.py)
 
     def __str__(self):
         return f"Table {self.table_number}"
 
 
+class CatalogVersion(models.Model):
+    # Satu baris (pk=1): versi katalog untuk key cache menu di app/catalog.py.
+    # Disimpan di DB, bukan di cache, supaya semua worker (cache locmem per proses) melihat versi yang sama.
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Catalog v{self.version}"
+
+
 class Order(models.Model):
     STATUS_CHOICES = [
         ('Pending', 'Pending'),
@@ -79,6 +89,20 @@ class Order(models.Model):
     phone_number = models.CharField(max_length=15, blank=True, null=True)  # Untuk customer yang pesan via WhatsApp
     customer_name = models.CharField(max_length=100, blank=True, null=True)  # Nama pelanggan dari sesi WhatsApp
     date_ordered = models.DateTimeField(auto_now_add=True)
+    summary = models.JSONField(default=dict, blank=True)  # Ringkasan item untuk riwayat pelanggan (lihat app/orders.py)
+    snap_token = models.CharField(max_length=64, blank=True, default='')  # Token Snap Midtrans terakhir (lihat app/midtrans.py)
+    snap_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)  # total saat snap_token dibuat
+    snap_token_expires_at = models.DateTimeField(null=True, blank=True)  # snap_token kedaluwarsa di Midtrans
+
+    class Meta:
+        indexes = [
+            # order_list, kasir_order_report, rollup rebuild
+            models.Index(fields=['status', 'date_ordered'], name='order_status_date_idx'),
+            # dashboard / pembayaran per status
+            models.Index(fields=['payment_status', 'status'], name='order_payment_status_idx'),
+            # customer_order_history
+            models.Index(fields=['phone_number', 'source', 'date_ordered'], name='order_phone_source_date_idx'),
+        ]
 
     def __str__(self):
         if self.source == "qr_scan":
@@ -115,8 +139,111 @@ class CustomerOTPSession(models.Model):
     is_verified = models.BooleanField(default=False)
     session_token = models.CharField(max_length=64, default=uuid.uuid4, unique=True)
 
+    class Meta:
+        indexes = [
+            # Batas jumlah OTP per nomor dalam beberapa menit terakhir
+            models.Index(fields=['phone_number', 'created_at'], name='otp_phone_created_idx'),
+        ]
+
     def is_expired(self):
         return timezone.now() > self.expires_at
 
     def __str__(self):
-        return f"{self.phone_number} - {self.otp_code} ({'verified' if self.is_verified else 'pending'})"
\ No newline at end of file
+        return f"{self.phone_number} - {self.otp_code} ({'verified' if self.is_verified else 'pending'})"
+
+class DailySalesRollup(models.Model):
+    # Ringkasan pendapatan harian (hanya order Completed), diisi oleh app/rollups.py
+    date = models.DateField(unique=True)
+    order_count = models.IntegerField(default=0)
+    total_income = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"Rollup {self.date}: {self.order_count} order"
+
+class DailyProductSales(models.Model):
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    quantity = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('date', 'product')
+
+    def __str__(self):
+        return f"{self.date} - {self.product.name}: {self.quantity}"
+
+class DailyPaymentSales(models.Model):
+    date = models.DateField()
+    payment_method = models.CharField(max_length=50)
+    order_count = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('date', 'payment_method')
+
+    def __str__(self):
+        return f"{self.date} - {self.payment_method}: {self.order_count}"
+
+class StockReservation(models.Model):
+    # Stok yang ditahan untuk order Midtrans yang belum dibayar
+    STATUS_CHOICES = [
+        ('held', 'Held'),
+        ('committed', 'Committed'),
+        ('released', 'Released'),
+    ]
+
+    order = models.ForeignKey(Order, related_name='stock_reservations', on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='held')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Order #{self.order_id} - {self.quantity} x product {self.product_id} ({self.status})"
+
+class PaymentEvent(models.Model):
+    # Log notifikasi Midtrans; satu baris per (order, transaksi, status) supaya retry tidak diproses ulang
+    order_id = models.CharField(max_length=50)  # order_id mentah dari Midtrans
+    transaction_id = models.CharField(max_length=100, blank=True, default='')
+    status = models.CharField(max_length=30)  # transaction_status
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['order_id', 'transaction_id', 'status'], name='unique_payment_event'),
+        ]
+
+    def __str__(self):
+        return f"Order #{self.order_id} - {self.status}"
+
+class OutboundMessage(models.Model):
+    # Antrian pesan keluar (OTP WhatsApp, dll). Dikirim oleh: python manage.py send_messages
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead'),  # gagal permanen / melebihi batas retry
+    ]
+
+    channel = models.CharField(max_length=20, default='whatsapp')
+    to = models.CharField(max_length=20)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=36, blank=True, default='')
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    provider_id = models.CharField(max_length=64, blank=True, default='')  # SID dari Twilio
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)  # lewat dari ini tidak dikirim lagi (misal OTP kedaluwarsa)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_status_next_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.channel} ke {self.to} ({self.status})"
@@ -0,0 +1,99 @@
+# app/orders.py
+from collections import Counter
+from django.db import transaction
+from .models import Order, OrderDetail
+from . import pricing, stock
+
+
+class OrderError(Exception):
+    def __init__(self, message, shortages=None):
+        super().__init__(message)
+        self.shortages = shortages or []
+
+
+def parse_cart(cart):
+    """
+    Validasi isi cart dari frontend. Harga dari browser (item['price']) diabaikan;
+    harga diambil dari tabel harga katalog (lihat app/pricing.py).
+    cart: list of dict [{'id':..., 'qty':...}]
+    Return: dict {product_id: qty}, baris produk yang sama digabung
+    """
+    if not cart:
+        raise OrderError('Cart is empty')
+    quantities = Counter()
+    for item in cart:
+        try:
+            product_id, qty = int(item['id']), int(item['qty'])
+        except (KeyError, TypeError, ValueError):
+            raise OrderError('Invalid cart item')
+        if qty <= 0:
+            raise OrderError('Invalid cart item')
+        quantities[product_id] += qty
+    return dict(quantities)
+
+
+def build_summary(lines):
+    """
+    Ringkasan item yang disimpan di Order.summary saat order dibuat, supaya riwayat
+    pelanggan tidak perlu join OrderDetail + Product lagi. Item order tidak berubah
+    setelah dibuat; status dan total dibaca dari kolom Order di baris yang sama.
+    lines: hasil pricing.price_cart
+    """
+    return {'items': [{'name': line['name'], 'qty': line['qty'], 'price': str(line['price'])} for line in lines]}
+
+
+def summary_items(order):
+    """Item dari Order.summary; order lama/manual tanpa ringkasan diisi sekali dari OrderDetail."""
+    if 'items' not in order.summary:
+        order.summary = {'items': [
+            {'name': name, 'qty': quantity, 'price': str(price)}
+            for name, quantity, price in order.order_details.order_by('id').values_list(
+                'product__name', 'quantity', 'price',
+            )
+        ]}
+        Order.objects.filter(id=order.id).update(summary=order.summary)
+    return order.summary['items']
+
+
+def place_order(cart, hold=False, **order_fields):
+    """
+    Buat Order + OrderDetail dari cart dalam satu transaksi.
+    - harga dan total dihitung di server dari tabel harga katalog (tanpa query produk)
+    - 1 bulk_create untuk semua OrderDetail (harga satuan dikunci di OrderDetail.price)
+    - ringkasan item langsung ditulis ke Order.summary (lihat build_summary)
+    - 1 UPDATE stok bersyarat per produk (lihat stock.take), tidak pernah oversell
+    hold: True untuk order yang belum dibayar (Midtrans), stoknya dicatat sebagai
+          reservasi dan dikembalikan kalau pembayaran batal/kedaluwarsa.
+    order_fields: field lain untuk Order (table, customer_name, source, ...)
+    Return: instance Order. Raise OrderError kalau cart tidak valid atau stok kurang
+    (OrderError.shortages berisi rincian per produk).
+    """
+    quantities = parse_cart(cart)
+    try:
+        lines, total = pricing.price_cart(quantities)
+    except pricing.UnknownProduct as e:
+        raise OrderError(str(e))
+
+    try:
+        with transaction.atomic():
+            stock.take(quantities)
+            order = Order.objects.create(total_price=total, summary=build_summary(lines), **order_fields)
+            OrderDetail.objects.bulk_create([
+                OrderDetail(order=order, product_id=line['product_id'], quantity=line['qty'], price=line['price'])
+                for line in lines
+            ])
+            if hold:
+                stock.hold(order, quantities)
+    except stock.InsufficientStock as e:
+        raise OrderError(str(e), shortages=e.shortages)
+    return order
+
+
+def lock_order(order_id):
+    """
+    Ambil order dengan SELECT ... FOR UPDATE supaya perubahan status untuk order yang
+    sama (bayar cash, konfirmasi, webhook, selesai) diproses satu per satu.
+    Di SQLite tidak ada row lock; transaksi IMMEDIATE sudah mengunci seluruh database.
+    Harus dipanggil di dalam transaction.atomic. Raise Order.DoesNotExist.
+    """
+    return Order.objects.select_for_update().get(id=order_id)
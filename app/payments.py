@@ -0,0 +1,84 @@
+# app/payments.py
+import logging
+from django.db import transaction, IntegrityError
+from .models import Payment, PaymentEvent
+from .events import order_event
+from .orders import lock_order
+from . import rollups
+from . import stock as stock_service
+
+logger = logging.getLogger(__name__)
+
+PAID_STATUSES = ['settlement', 'capture']
+CANCELLED_STATUSES = ['cancel', 'expire']
+
+
+def _apply_transition(order, transaction_status):
+    """
+    Ubah status order sesuai notifikasi. order harus sudah di-lock (lock_order).
+    Notifikasi yang datang terlambat / diulang tidak boleh membalik status final:
+    cancel/expire diabaikan untuk order yang sudah dibayar (termasuk cash) atau selesai,
+    settlement diabaikan untuk order yang sudah dibatalkan (stoknya sudah dilepas).
+    """
+    if transaction_status in CANCELLED_STATUSES and (order.payment_status == 'Paid' or order.status == 'Completed'):
+        logger.warning(f"Order {order.id} sudah {order.status}/{order.payment_status}; {transaction_status} diabaikan.")
+        return
+    if transaction_status in PAID_STATUSES and order.status == 'Cancelled':
+        logger.error(f"Order {order.id} sudah Cancelled tapi menerima {transaction_status}; perlu dicek/refund manual.")
+        return
+    before = rollups.order_state(order)
+    if transaction_status in PAID_STATUSES:
+        order.payment_status = 'Paid'
+        order.save(update_fields=['payment_status'])
+        Payment.objects.update_or_create(order=order, defaults={
+            'payment_method': 'Midtrans',
+            'payment_status': 'Paid',
+            'amount': order.total_price,
+        })
+        stock_service.commit(order)
+        order_event('order_paid', order)
+        logger.info(f"Order {order.id} updated to Paid (Processing).")
+    elif transaction_status in CANCELLED_STATUSES:
+        order.payment_status = 'Cancelled'
+        order.status = 'Cancelled'
+        order.save(update_fields=['payment_status', 'status'])
+        Payment.objects.update_or_create(order=order, defaults={
+            'payment_method': 'Midtrans',
+            'payment_status': 'Cancelled',
+            'amount': 0,
+        })
+        stock_service.release(order)
+        order_event('order_cancelled', order)
+        logger.info(f"Order {order.id} updated to Cancelled.")
+    else:
+        logger.info(f"Order {order.id} received transaction_status: {transaction_status}")
+    rollups.apply_order_change(order, before)
+
+
+def handle_midtrans_notification(data):
+    """
+    Proses satu notifikasi Midtrans secara idempotent.
+    - Notifikasi yang sama (order_id, transaction_id, status) hanya diproses sekali;
+      duplikat dikenali dengan satu lookup ke unique index PaymentEvent.
+    - Simpan event + ubah status order/payment dalam satu transaksi.
+    Return: 'applied' atau 'duplicate'. Raise Order.DoesNotExist kalau order tidak ada
+    (event tidak disimpan, jadi retry Midtrans berikutnya tetap diproses).
+    """
+    key = {
+        'order_id': str(data['order_id']),
+        'transaction_id': data.get('transaction_id') or '',
+        'status': data.get('transaction_status') or '',
+    }
+    if PaymentEvent.objects.filter(**key).exists():
+        return 'duplicate'
+    try:
+        with transaction.atomic():
+            PaymentEvent.objects.create(payload=data, **key)
+            order = lock_order(key['order_id'])
+            _apply_transition(order, key['status'])
+    except IntegrityError:
+        # Notifikasi yang sama masuk bersamaan; yang lain sudah menyimpannya
+        if PaymentEvent.objects.filter(**key).exists():
+            return 'duplicate'
+        raise
+    return 'applied'
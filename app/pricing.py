@@ -0,0 +1,75 @@
+# app/pricing.py
+# Harga order dihitung di server dari tabel harga katalog (catalog.get_prices),
+# bukan dari harga yang dikirim browser. Semua perhitungan memakai Decimal.
+# Tabel harga di-cache per versi katalog (naik setiap Product disimpan/dihapus),
+# jadi menghitung satu cart tidak perlu query produk sama sekali.
+from decimal import Decimal, ROUND_HALF_UP
+from . import catalog
+from .models import OrderDetail
+
+_price_table = (None, None)
+
+
+def price_table():
+    """Tabel harga versi sekarang, disimpan juga di memori proses supaya tidak di-unpickle tiap request."""
+    global _price_table
+    version = catalog.get_version()
+    if _price_table[0] != version:
+        _price_table = (version, catalog.get_prices())
+    return _price_table[1]
+
+
+class UnknownProduct(Exception):
+    def __init__(self, product_id):
+        super().__init__(f"Product with ID {product_id} not found")
+        self.product_id = product_id
+
+
+def price_cart(quantities):
+    """
+    Hitung harga satu cart sekaligus.
+    quantities: dict {product_id: qty} (baris produk yang sama sudah digabung)
+    Return: (lines, total) dengan lines = [{'product_id', 'name', 'qty', 'price', 'subtotal'}]
+    dan semua angka uang berupa Decimal. Raise UnknownProduct.
+    """
+    prices = price_table()
+    lines = []
+    total = Decimal('0')
+    for product_id, qty in quantities.items():
+        entry = prices.get(product_id)
+        if entry is None:
+            raise UnknownProduct(product_id)
+        subtotal = entry['price'] * qty
+        lines.append({
+            'product_id': product_id,
+            'name': entry['name'],
+            'qty': qty,
+            'price': entry['price'],
+            'subtotal': subtotal,
+        })
+        total += subtotal
+    return lines, total
+
+
+def to_rupiah(amount):
+    """Midtrans hanya menerima nominal bulat (IDR)."""
+    return int(Decimal(amount).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def snap_items(order):
+    """
+    item_details Midtrans untuk order yang sudah tersimpan, dari harga yang dikunci di
+    OrderDetail (1 query, nama produk dari tabel harga tanpa join).
+    """
+    prices = price_table()
+    return [
+        {
+            'id': product_id,
+            'price': to_rupiah(price),
+            'quantity': quantity,
+            'name': prices.get(product_id, {}).get('name', 'Produk')[:50],
+        }
+        for product_id, quantity, price in OrderDetail.objects.filter(order=order).order_by('id').values_list(
+            'product_id', 'quantity', 'price'
+        )
+    ]
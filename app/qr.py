@@ -0,0 +1,155 @@
+# app/qr.py
+# QR code meja untuk pemesanan pelanggan.
+# - Inkremental: hash (URL tujuan + gaya QR) disimpan di Table.qr_hash; meja yang hash-nya
+#   sama dan file PNG-nya masih ada dilewati.
+# - Render paralel di process pool (render PNG murni CPU, tidak butuh Django/DB).
+# - File ditulis atomik (tulis ke file sementara lalu os.replace), jadi pelanggan/kasir
+#   tidak pernah melihat PNG setengah jadi.
+# - Table.qr_code/qr_hash diperbarui dengan satu bulk_update.
+import hashlib
+import io
+import json
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+import qrcode
+from qrcode.constants import ERROR_CORRECT_H, ERROR_CORRECT_L, ERROR_CORRECT_M, ERROR_CORRECT_Q
+from django.conf import settings
+from .models import Table
+
+QR_DIR = 'qr_codes'
+ERROR_CORRECTION = {'L': ERROR_CORRECT_L, 'M': ERROR_CORRECT_M, 'Q': ERROR_CORRECT_Q, 'H': ERROR_CORRECT_H}
+DEFAULT_STYLE = {'box_size': 10, 'border': 4, 'error_correction': 'M', 'fill_color': 'black', 'back_color': 'white'}
+# Di bawah jumlah ini render serial lebih cepat daripada menyalakan process pool
+POOL_THRESHOLD = 16
+# Lembar cetak: A4 pada 150 dpi, 3 x 4 QR per halaman
+SHEET_PAGE = (1240, 1754)
+SHEET_GRID = (3, 4)
+
+
+def get_style(style=None):
+    return {**DEFAULT_STYLE, **getattr(settings, 'QR_STYLE', {}), **(style or {})}
+
+
+def table_url(table_number, template=None):
+    template = template or getattr(settings, 'QR_TABLE_URL', 'https://pos-wk/order/meja-{table}/')
+    return template.format(table=table_number)
+
+
+def content_hash(url, style):
+    payload = json.dumps({'url': url, 'style': style}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def file_name(table_number):
+    return f'{QR_DIR}/meja-{table_number}.png'
+
+
+def render_png(url, style):
+    """Return: bytes PNG QR untuk url."""
+    qr = qrcode.QRCode(
+        box_size=style['box_size'],
+        border=style['border'],
+        error_correction=ERROR_CORRECTION[style['error_correction']],
+    )
+    qr.add_data(url)
+    qr.make(fit=True)
+    buffer = io.BytesIO()
+    qr.make_image(fill_color=style['fill_color'], back_color=style['back_color']).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def atomic_write(path, data):
+    """Tulis ke file sementara di folder yang sama lalu os.replace (atomik di filesystem yang sama)."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o644)  # mkstemp membuat file 0600; media harus bisa dibaca web server
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _render_job(job):
+    # Dijalankan di process pool: argumen dan hasil harus bisa di-pickle
+    url, style, path = job
+    atomic_write(path, render_png(url, style))
+    return path
+
+
+def generate(tables=None, force=False, workers=None, url_template=None, style=None):
+    """
+    Buat QR untuk meja yang URL/gayanya berubah, belum punya QR, atau file-nya hilang.
+    tables: queryset/list Table (default semua); force: render ulang semua.
+    workers: jumlah proses (None = jumlah CPU, 1 = serial).
+    Return: dict {'generated': [nomor meja], 'skipped': jumlah}
+    """
+    style = get_style(style)
+    tables = list(Table.objects.all() if tables is None else tables)
+    jobs, changed = [], []
+    for table in tables:
+        url = table_url(table.table_number, url_template)
+        digest = content_hash(url, style)
+        name = file_name(table.table_number)
+        path = os.path.join(settings.MEDIA_ROOT, name)
+        if not force and table.qr_hash == digest and str(table.qr_code) == name and os.path.exists(path):
+            continue
+        jobs.append((url, style, path))
+        table.qr_code, table.qr_hash = name, digest
+        changed.append(table)
+
+    if len(jobs) >= POOL_THRESHOLD and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(_render_job, jobs, chunksize=max(1, len(jobs) // 32)))
+    else:
+        for job in jobs:
+            _render_job(job)
+
+    if changed:
+        Table.objects.bulk_update(changed, ['qr_code', 'qr_hash'], batch_size=500)
+    return {'generated': [t.table_number for t in changed], 'skipped': len(tables) - len(changed)}
+
+
+def build_sheet(path, tables=None):
+    """
+    Gabungkan QR semua meja ke satu file untuk dicetak: .pdf (A4, 3x4 per halaman, dengan label)
+    atau .zip (semua PNG). Jalankan generate() dulu supaya PNG-nya ada.
+    Return: jumlah QR di lembar.
+    """
+    tables = [t for t in (Table.objects.all() if tables is None else tables) if t.qr_code]
+    tables.sort(key=lambda t: (len(t.table_number), t.table_number))
+    if path.lower().endswith('.zip'):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for table in tables:
+                archive.write(os.path.join(settings.MEDIA_ROOT, str(table.qr_code)), f'meja-{table.table_number}.png')
+        atomic_write(path, buffer.getvalue())
+        return len(tables)
+
+    from PIL import Image, ImageDraw, ImageFont
+    columns, rows = SHEET_GRID
+    cell_w, cell_h = SHEET_PAGE[0] // columns, SHEET_PAGE[1] // rows
+    font = ImageFont.load_default(size=36)
+    pages = []
+    for i, table in enumerate(tables):
+        if i % (columns * rows) == 0:
+            pages.append(Image.new('1', SHEET_PAGE, 1))
+        page, slot = pages[-1], i % (columns * rows)
+        x, y = (slot % columns) * cell_w, (slot // columns) * cell_h
+        with Image.open(os.path.join(settings.MEDIA_ROOT, str(table.qr_code))) as img:
+            size = min(cell_w, cell_h - 60) - 20
+            page.paste(img.convert('1').resize((size, size), Image.NEAREST), (x + (cell_w - size) // 2, y + 10))
+        label = f'Meja {table.table_number}'
+        draw = ImageDraw.Draw(page)
+        draw.text((x + cell_w // 2, y + cell_h - 35), label, fill=0, font=font, anchor='mm')
+    if not pages:
+        pages.append(Image.new('1', SHEET_PAGE, 1))
+    buffer = io.BytesIO()
+    pages[0].save(buffer, format='PDF', resolution=150, save_all=True, append_images=pages[1:])
+    atomic_write(path, buffer.getvalue())
+    return len(tables)
@@ -0,0 +1,109 @@
+# app/ratelimit.py
+# Rate limiter sliding window di atas cache framework Django.
+# Setiap limit menyimpan dua counter (window sekarang dan sebelumnya); perkiraan
+# jumlah hit = sebelumnya * sisa porsi window + sekarang. Tidak ada query DB,
+# jadi aman dipanggil di setiap request login/OTP.
+# Cache default locmem per proses, jadi limit berbasis cache berlaku per worker.
+# Limit OTP per nomor (yang mencegah spam WhatsApp ke satu orang) karena itu dihitung
+# dari CustomerOTPSession di database (index phone_number + created_at), lihat hit_phone_otp().
+# Limit diatur di settings.RATE_LIMITS = {nama: (jumlah, detik)}.
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from .models import CustomerOTPSession
+
+DEFAULT_LIMITS = {
+    'otp_send_phone': (3, 10 * 60),  # OTP yang dikirim ke satu nomor
+    'otp_send_ip': (10, 10 * 60),  # OTP yang diminta dari satu IP
+    'otp_verify_ip': (20, 10 * 60),  # percobaan verifikasi dari satu IP
+    'otp_wrong': (5, 5 * 60),  # OTP salah per sesi OTP (masa berlaku OTP)
+}
+
+
+def get_limit(name):
+    return getattr(settings, 'RATE_LIMITS', {}).get(name, DEFAULT_LIMITS[name])
+
+
+def _keys(name, key, window, now):
+    current = int(now // window)
+    base = f'ratelimit:{name}:{key}'
+    return f'{base}:{current}', f'{base}:{current - 1}', now % window / window
+
+
+def _estimate(current_count, previous_count, elapsed):
+    return previous_count * (1 - elapsed) + current_count
+
+
+def hit(name, key):
+    """
+    Catat satu hit untuk (name, key) dan cek limitnya.
+    Return: (allowed, retry_after_detik). Hit yang ditolak tetap dihitung,
+    jadi client yang terus mencoba tidak bisa langsung lolos saat window bergeser.
+    """
+    limit, window = get_limit(name)
+    now = time.time()
+    current_key, previous_key, elapsed = _keys(name, key, window, now)
+    # Counter disimpan 2 window supaya masih terbaca sebagai "window sebelumnya"
+    cache.add(current_key, 0, window * 2)
+    try:
+        current_count = cache.incr(current_key)
+    except ValueError:
+        # Key hilang di antara add dan incr (cache dibersihkan)
+        cache.set(current_key, 1, window * 2)
+        current_count = 1
+    previous_count = cache.get(previous_key, 0)
+    if _estimate(current_count, previous_count, elapsed) <= limit:
+        return True, 0
+    # Waktu sampai porsi window sebelumnya cukup berkurang (paling lama sampai window berikutnya)
+    if previous_count:
+        needed = 1 - (limit - current_count) / previous_count
+        retry_after = max(needed - elapsed, 0) * window if needed <= 1 else (1 - elapsed) * window
+    else:
+        retry_after = (1 - elapsed) * window
+    return False, int(retry_after) + 1
+
+
+def recent_otp_sessions(phone, since):
+    """OTP yang dikirim ke phone sejak `since`, terlama dulu."""
+    return CustomerOTPSession.objects.filter(phone_number=phone, created_at__gte=since).order_by('created_at')
+
+
+def hit_phone_otp(phone):
+    """
+    Limit 'otp_send_phone' dari database, jadi berlaku sama di semua worker.
+    Hit dicatat oleh CustomerOTPSession yang dibuat setelah lolos; return (allowed, retry_after_detik).
+    """
+    limit, window = get_limit('otp_send_phone')
+    now = timezone.now()
+    sent = list(recent_otp_sessions(phone, now - timedelta(seconds=window)).values_list('created_at', flat=True)[:limit])
+    if len(sent) < limit:
+        return True, 0
+    # Slot kosong lagi saat OTP tertua di window keluar dari window
+    return False, int(max(window - (now - sent[0]).total_seconds(), 0)) + 1
+
+
+def is_limited(name, key):
+    """Cek tanpa mencatat hit."""
+    limit, window = get_limit(name)
+    current_key, previous_key, elapsed = _keys(name, key, window, time.time())
+    return _estimate(cache.get(current_key, 0), cache.get(previous_key, 0), elapsed) >= limit
+
+
+def reset(name, key):
+    limit, window = get_limit(name)
+    current_key, previous_key, _ = _keys(name, key, window, time.time())
+    cache.delete_many([current_key, previous_key])
+
+
+def client_ip(request):
+    """
+    IP client. X-Forwarded-For hanya dipercaya kalau RATE_LIMIT_TRUST_FORWARDED aktif
+    (di belakang reverse proxy / ngrok), karena header ini bisa dipalsukan.
+    """
+    if getattr(settings, 'RATE_LIMIT_TRUST_FORWARDED', False):
+        forwarded = request.headers.get('X-Forwarded-For', '')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
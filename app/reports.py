@@ -0,0 +1,201 @@
+# app/reports.py
+# Semua angka di sini dibaca dari tabel rollup harian (lihat app/rollups.py),
+# jadi biayanya O(jumlah hari), bukan O(jumlah order).
+from datetime import date, datetime, timedelta
+from django.db.models import Sum, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from .search import search_orders
+from .models import Order, DailySalesRollup, DailyProductSales, DailyPaymentSales
+
+REPORT_PAGE_SIZE = 50
+
+
+def resolve_period(period, date_str):
+    """
+    Ubah filter laporan (period + date_str) jadi rentang waktu setengah terbuka [start, end)
+    dalam timezone aktif, supaya query bisa pakai index date_ordered
+    (date_ordered >= start AND date_ordered < end, bukan __date/__year).
+    period: 'day' (YYYY-MM-DD), 'month' (YYYY-MM) atau 'year' (YYYY)
+    Return: (start, end) datetime aware, atau None kalau date_str kosong / period tidak dikenal.
+    Raise ValueError kalau format tanggal salah.
+    """
+    if not date_str:
+        return None
+    if period == 'day':
+        start = datetime.strptime(date_str, '%Y-%m-%d')
+        end = start + timedelta(days=1)
+    elif period == 'month':
+        start = datetime.strptime(date_str, '%Y-%m')
+        end = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    elif period == 'year':
+        start = datetime.strptime(date_str, '%Y')
+        end = start.replace(year=start.year + 1)
+    else:
+        return None
+    tz = timezone.get_current_timezone()
+    return timezone.make_aware(start, tz), timezone.make_aware(end, tz)
+
+
+def day_range(start, end):
+    """Tanggal start..end (inklusif) -> rentang datetime [start 00:00, end+1 00:00) di timezone aktif."""
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(start, datetime.min.time()), tz),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), datetime.min.time()), tz),
+    )
+
+
+def report_orders(status, date_range=None, search=''):
+    """
+    Queryset order untuk laporan kasir (dipakai halaman laporan dan export),
+    tanpa select_related/prefetch supaya pemanggil bisa memilih cara baca sendiri.
+    date_range: hasil resolve_period (atau None)
+    """
+    orders = Order.objects.filter(status=status)
+    if date_range:
+        orders = orders.filter(date_ordered__gte=date_range[0], date_ordered__lt=date_range[1])
+    if search:
+        orders = search_orders(orders, search)
+    return orders
+
+
+def encode_cursor(order):
+    return f"{order.date_ordered.isoformat()}_{order.id}"
+
+
+def decode_cursor(cursor):
+    """Kebalikan encode_cursor. Raise ValueError kalau cursor rusak."""
+    date_ordered, order_id = cursor.rsplit('_', 1)
+    date_ordered = datetime.fromisoformat(date_ordered)
+    if timezone.is_naive(date_ordered):
+        raise ValueError('cursor tanpa timezone')
+    return date_ordered, int(order_id)
+
+
+def keyset_page(orders, cursor=None, size=REPORT_PAGE_SIZE):
+    """
+    Satu halaman order urut terbaru dengan keyset pagination di (date_ordered, id):
+    halaman berikutnya dimulai dari WHERE (date_ordered, id) < cursor, bukan OFFSET,
+    jadi halaman ke-100 sama cepatnya dengan halaman pertama.
+    Return: (list order, cursor halaman berikutnya atau None)
+    """
+    orders = orders.order_by('-date_ordered', '-id')
+    if cursor:
+        date_ordered, order_id = decode_cursor(cursor)
+        orders = orders.filter(
+            Q(date_ordered__lt=date_ordered) | Q(date_ordered=date_ordered, id__lt=order_id)
+        )
+    page = list(orders[:size + 1])
+    next_cursor = encode_cursor(page[size - 1]) if len(page) > size else None
+    return page[:size], next_cursor
+
+
+def _bucket_totals(queryset, trunc, value='total_income'):
+    """
+    Jalankan satu query GROUP BY untuk bucket waktu tertentu.
+    queryset: queryset yang sudah difilter
+    trunc: ekspresi Trunc* (TruncMonth, ...) atau nama field tanggal
+    Return: dict {bucket (date): total (Decimal)}
+    """
+    rows = (
+        queryset.annotate(bucket=trunc)
+        .values('bucket')
+        .annotate(total=Sum(value))
+        .order_by()
+    )
+    return {row['bucket']: row['total'] or 0 for row in rows}
+
+
+def income_by_day(start, end):
+    """
+    Pendapatan per hari dari start sampai end (inklusif).
+    Hari tanpa order tetap muncul dengan total 0.
+    Return: list of dict [{'date': date, 'total': float}]
+    """
+    totals = dict(
+        DailySalesRollup.objects.filter(date__gte=start, date__lte=end).values_list('date', 'total_income')
+    )
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    return [{'date': d, 'total': float(totals.get(d, 0))} for d in days]
+
+
+def income_by_month(start_year, end_year):
+    """
+    Pendapatan per bulan untuk semua bulan di rentang tahun start_year..end_year.
+    Return: list of dict [{'year': int, 'month': int, 'total': float}]
+    """
+    totals = _bucket_totals(
+        DailySalesRollup.objects.filter(date__gte=date(start_year, 1, 1), date__lte=date(end_year, 12, 31)),
+        TruncMonth('date'),
+    )
+    return [
+        {'year': y, 'month': m, 'total': float(totals.get(date(y, m, 1), 0))}
+        for y in range(start_year, end_year + 1)
+        for m in range(1, 13)
+    ]
+
+
+def income_by_year(monthly):
+    """
+    Jumlahkan hasil income_by_month per tahun (tanpa query tambahan).
+    Return: list of dict [{'year': int, 'total': float}]
+    """
+    yearly = {}
+    for row in monthly:
+        yearly[row['year']] = yearly.get(row['year'], 0) + row['total']
+    return [{'year': y, 'total': total} for y, total in yearly.items()]
+
+
+def income_total(start, end):
+    """
+    Total pendapatan order Completed untuk rentang [start, end) hasil resolve_period.
+    Dibaca dari rollup harian (tanggal lokal).
+    """
+    start, end = timezone.localtime(start), timezone.localtime(end)
+    return DailySalesRollup.objects.filter(date__gte=start.date(), date__lt=end.date()).aggregate(
+        total=Sum('total_income'))['total'] or 0
+
+
+def payment_counts():
+    """
+    Hitung transaksi lunas per metode pembayaran dalam satu query.
+    Return: dict {'cash': int, 'midtrans': int}
+    """
+    counts = DailyPaymentSales.objects.aggregate(
+        cash=Sum('order_count'),
+        midtrans=Sum('order_count', filter=Q(payment_method='Midtrans')),
+    )
+    return {key: value or 0 for key, value in counts.items()}
+
+
+def product_ranking(limit=10):
+    return (
+        DailyProductSales.objects.values('product__name')
+        .annotate(total=Sum('quantity'))
+        .filter(total__gt=0)
+        .order_by('-total')[:limit]
+    )
+
+
+def dashboard_summary(today=None):
+    """
+    Semua angka untuk kasir_dashboard:
+    - 7 hari terakhir (1 query)
+    - 12 bulan tahun ini + 5 tahun terakhir (1 query, tahunan dihitung dari bulanan)
+    - jumlah transaksi cash/midtrans (1 query)
+    - ranking produk terlaris (1 query)
+    """
+    today = today or timezone.localdate()
+    year = today.year
+    daily = income_by_day(today - timedelta(days=6), today)
+    monthly = income_by_month(year - 4, year)
+    counts = payment_counts()
+    return {
+        'daily_income': [{'date': d['date'].strftime('%d-%m'), 'total': d['total']} for d in daily],
+        'monthly_income': [{'month': m['month'], 'total': m['total']} for m in monthly if m['year'] == year],
+        'yearly_income': income_by_year(monthly),
+        'cash_count': counts['cash'],
+        'midtrans_count': counts['midtrans'],
+        'product_ranking': product_ranking(),
+    }
@@ -0,0 +1,207 @@
+# app/search.py
+# Pencarian teks.
+# - Order (laporan kasir): di SQLite yang punya FTS5, nama pelanggan dan catatan
+#   order diindeks di tabel virtual app_order_fts (external content) yang dijaga
+#   trigger, jadi ikut terupdate walau order diubah lewat UPDATE biasa (tanpa signal).
+#   Database lain / SQLite tanpa FTS5 memakai pencarian prefix biasa.
+# - Produk (order_menu): indeks trigram di memori yang dibangun dari cache katalog
+#   dan dibangun ulang otomatis saat versi katalog berubah. Produk warung cukup
+#   sedikit, jadi indeks di memori lebih cepat dari query DB dan tahan salah ketik.
+import re
+import threading
+import unicodedata
+from django.db import connection, connections, OperationalError
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+ORDER_FTS_TABLE = 'app_order_fts'
+ORDER_FTS_TRIGGERS = {
+    'app_order_fts_ai': """
+        CREATE TRIGGER IF NOT EXISTS app_order_fts_ai AFTER INSERT ON app_order BEGIN
+            INSERT INTO app_order_fts(rowid, customer_name, notes) VALUES (new.id, new.customer_name, new.notes);
+        END""",
+    'app_order_fts_ad': """
+        CREATE TRIGGER IF NOT EXISTS app_order_fts_ad AFTER DELETE ON app_order BEGIN
+            INSERT INTO app_order_fts(app_order_fts, rowid, customer_name, notes)
+            VALUES ('delete', old.id, old.customer_name, old.notes);
+        END""",
+    'app_order_fts_au': """
+        CREATE TRIGGER IF NOT EXISTS app_order_fts_au AFTER UPDATE OF customer_name, notes ON app_order BEGIN
+            INSERT INTO app_order_fts(app_order_fts, rowid, customer_name, notes)
+            VALUES ('delete', old.id, old.customer_name, old.notes);
+            INSERT INTO app_order_fts(rowid, customer_name, notes) VALUES (new.id, new.customer_name, new.notes);
+        END""",
+}
+
+_fts_tables = {}
+
+
+def _existing(cursor, kind, names):
+    placeholders = ','.join(['%s'] * len(names))
+    cursor.execute(
+        f"SELECT name FROM sqlite_master WHERE type = %s AND name IN ({placeholders})", [kind, *names]
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+
+def ensure_order_fts(using=None, **kwargs):
+    """
+    Buat tabel FTS5 + trigger untuk order kalau belum ada, lalu isi ulang indeksnya.
+    Dipanggil dari post_migrate: di SQLite, migrasi yang mengubah app_order membuat
+    ulang tabelnya dan trigger ikut hilang, jadi dicek ulang setiap selesai migrate.
+    """
+    conn = connections[using or 'default']
+    if conn.vendor != 'sqlite':
+        return False
+    with conn.cursor() as cursor:
+        try:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {ORDER_FTS_TABLE} USING fts5("
+                "customer_name, notes, content='app_order', content_rowid='id', "
+                "tokenize='unicode61 remove_diacritics 2')"
+            )
+        except OperationalError:
+            # SQLite tanpa FTS5
+            return False
+        missing = set(ORDER_FTS_TRIGGERS) - _existing(cursor, 'trigger', list(ORDER_FTS_TRIGGERS))
+        for name in missing:
+            cursor.execute(ORDER_FTS_TRIGGERS[name])
+        if missing:
+            cursor.execute(f"INSERT INTO {ORDER_FTS_TABLE}({ORDER_FTS_TABLE}) VALUES ('rebuild')")
+    _fts_tables.pop((conn.alias, ORDER_FTS_TABLE), None)
+    return True
+
+
+def has_fts(table):
+    key = (connection.alias, table)
+    if key not in _fts_tables:
+        if connection.vendor != 'sqlite':
+            _fts_tables[key] = False
+        else:
+            with connection.cursor() as cursor:
+                _fts_tables[key] = bool(_existing(cursor, 'table', [table]))
+    return _fts_tables[key]
+
+
+def fts_query(term):
+    """
+    Ubah input bebas jadi query FTS5 yang aman: setiap kata jadi prefix ("kata"*),
+    semua kata harus cocok. Return '' kalau tidak ada kata yang bisa dicari.
+    """
+    words = re.findall(r'\w+', term.lower())
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_orders(orders, term):
+    """
+    Filter queryset order berdasarkan kata kunci laporan kasir.
+    - angka saja (boleh diawali #): cocokkan id persis (lookup primary key)
+    - selain itu: FTS5 prefix di nama pelanggan + catatan, atau istartswith kalau FTS tidak ada
+    """
+    term = term.strip()
+    if re.fullmatch(r'#?\d+', term):
+        return orders.filter(id=int(term.lstrip('#')))
+    query = fts_query(term)
+    if not query:
+        return orders.none()
+    if has_fts(ORDER_FTS_TABLE):
+        return orders.filter(id__in=RawSQL(
+            f"SELECT rowid FROM {ORDER_FTS_TABLE} WHERE {ORDER_FTS_TABLE} MATCH %s", [query]
+        ))
+    return orders.filter(Q(customer_name__istartswith=term) | Q(notes__istartswith=term))
+
+
+PRODUCT_FIELDS = (('name', 3.0), ('category', 1.5), ('description', 1.0))
+MIN_SIMILARITY = 0.3
+
+
+def normalize(text):
+    """Huruf kecil, tanpa aksen, selain huruf/angka jadi spasi."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    return re.sub(r'[^\w]+', ' ', text).strip()
+
+
+def trigrams(word):
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ProductSearchIndex:
+    """
+    Indeks trigram untuk list produk (dict dari catalog.get_products).
+    Skor per kata query: 1.0 kalau ada kata di field yang diawali kata query,
+    selain itu kemiripan trigram (Jaccard) dengan kata terdekat, minimal MIN_SIMILARITY.
+    Semua kata query harus cocok di salah satu field.
+    """
+
+    def __init__(self, products):
+        self.products = {p['id']: p for p in products}
+        self.words = {}  # product_id -> {field: [kata]}
+        self.postings = {}  # trigram -> set(product_id)
+        for p in products:
+            fields = {}
+            for field, _ in PRODUCT_FIELDS:
+                fields[field] = normalize(p.get(field)).split()
+                for word in fields[field]:
+                    for gram in trigrams(word):
+                        self.postings.setdefault(gram, set()).add(p['id'])
+            self.words[p['id']] = fields
+
+    @staticmethod
+    def _word_score(term, term_grams, words):
+        best = 0.0
+        for word in words:
+            if word.startswith(term):
+                return 1.0
+            grams = trigrams(word)
+            best = max(best, len(term_grams & grams) / len(term_grams | grams))
+        return best if best >= MIN_SIMILARITY else 0.0
+
+    def search(self, query, limit=20):
+        """Return list produk urut dari skor tertinggi."""
+        terms = normalize(query).split()
+        if not terms:
+            return []
+        scores = None
+        for term in terms:
+            term_grams = trigrams(term)
+            candidates = set()
+            for gram in term_grams:
+                candidates |= self.postings.get(gram, set())
+            term_scores = {}
+            for product_id in candidates if scores is None else candidates & scores.keys():
+                fields = self.words[product_id]
+                score = max(
+                    weight * self._word_score(term, term_grams, fields[field])
+                    for field, weight in PRODUCT_FIELDS
+                )
+                if score:
+                    term_scores[product_id] = score
+            scores = term_scores if scores is None else {
+                pid: scores[pid] + score for pid, score in term_scores.items()
+            }
+            if not scores:
+                return []
+        ranked = sorted(scores, key=lambda pid: (-scores[pid], self.products[pid]['name']))
+        return [self.products[pid] for pid in ranked[:limit]]
+
+
+_product_index = (None, None)
+_product_index_lock = threading.Lock()
+
+
+def product_index():
+    """Indeks produk untuk versi katalog saat ini (dibangun sekali per versi per proses)."""
+    global _product_index
+    from . import catalog
+    version = catalog.get_version()
+    if _product_index[0] != version:
+        with _product_index_lock:
+            if _product_index[0] != version:
+                _product_index = (version, ProductSearchIndex(catalog.get_products(with_stock=False)))
+    return _product_index[1]
+
+
+def search_products(query, limit=20):
+    return product_index().search(query, limit)
@@ -0,0 +1,29 @@
+from django.core.signals import request_finished, request_started
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Product, Table, Order
+from . import catalog, midtrans
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Table)
+def invalidate_catalog(sender, **kwargs):
+    catalog.bump_version()
+
+
+@receiver(post_save, sender=Order)
+def invalidate_snap_token(sender, instance, **kwargs):
+    # Token Snap hanya berlaku selama order masih menunggu pembayaran
+    if instance.payment_status != 'Pending' or instance.status in ['Completed', 'Cancelled']:
+        midtrans.invalidate_snap_token(instance.id)
+
+
+@receiver(request_started)
+def start_catalog_request(**kwargs):
+    # Versi katalog dibaca dari DB sekali per request
+    catalog.start_request()
+
+
+@receiver(request_finished)
+def end_catalog_request(**kwargs):
+    catalog.end_request()
@@ -0,0 +1,67 @@
+# app/stock.py
+from django.db import transaction
+from django.db.models import F
+from .models import Product, StockReservation
+
+
+class InsufficientStock(Exception):
+    def __init__(self, shortages):
+        self.shortages = shortages
+        names = ', '.join(f"{s['name']} (sisa {s['available']})" for s in shortages)
+        super().__init__(f"Stok tidak cukup: {names}")
+
+
+def take(quantities):
+    """
+    Kurangi stok secara atomik: UPDATE ... SET stock = stock - qty WHERE stock >= qty.
+    Dua kasir/customer yang pesan barang terakhir bersamaan tidak bisa sama-sama berhasil.
+    quantities: dict {product_id: qty}
+    Harus dipanggil di dalam transaction.atomic supaya semua baris di-rollback kalau ada yang kurang.
+    Raise InsufficientStock berisi daftar kekurangan per produk.
+    """
+    failed = []
+    # Urutkan id supaya urutan lock konsisten antar transaksi
+    for product_id in sorted(quantities):
+        qty = quantities[product_id]
+        if not Product.objects.filter(id=product_id, stock__gte=qty).update(stock=F('stock') - qty):
+            failed.append(product_id)
+    if failed:
+        products = Product.objects.in_bulk(failed)
+        raise InsufficientStock([
+            {
+                'id': product_id,
+                'name': products[product_id].name if product_id in products else f'Produk #{product_id}',
+                'requested': quantities[product_id],
+                'available': products[product_id].stock if product_id in products else 0,
+            }
+            for product_id in failed
+        ])
+
+
+def hold(order, quantities):
+    """Catat stok yang sudah diambil lewat take() sebagai reservasi milik order (status held)."""
+    StockReservation.objects.bulk_create([
+        StockReservation(order=order, product_id=product_id, quantity=qty)
+        for product_id, qty in quantities.items()
+    ])
+
+
+def commit(order):
+    """Pembayaran berhasil: reservasi jadi permanen."""
+    StockReservation.objects.filter(order=order, status='held').update(status='committed')
+
+
+def release(order):
+    """
+    Pembayaran batal/kedaluwarsa: kembalikan stok yang ditahan.
+    Aman dipanggil berkali-kali (webhook Midtrans bisa dikirim ulang):
+    tiap reservasi hanya bisa berpindah held -> released satu kali.
+    Return: jumlah reservasi yang dilepas.
+    """
+    released = 0
+    with transaction.atomic():
+        for reservation in StockReservation.objects.filter(order=order, status='held'):
+            if StockReservation.objects.filter(id=reservation.id, status='held').update(status='released'):
+                Product.objects.filter(id=reservation.product_id).update(stock=F('stock') + reservation.quantity)
+                released += 1
+    return released
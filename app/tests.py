@@ -1,3 +1,1138 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import threading
+import re
+import tempfile
+import time
+import zipfile
+from decimal import Decimal
+from datetime import date, datetime, time as dt_time, timedelta
+from unittest import mock, skipUnless
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, IntegrityError, OperationalError
+from django.utils import timezone
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from .models import CustomUser, Product, Table, Order, OrderDetail, Payment, PaymentEvent, StockReservation, OutboundMessage, CustomerOTPSession, DailySalesRollup, DailyProductSales, DailyPaymentSales
+from .orders import place_order, OrderError
+from .search import search_products
+from .reports import dashboard_summary, keyset_page, report_orders, resolve_period
+from .midtrans_stub import MidtransStubServer
+from . import bench, catalog, loadgen, messaging, metrics, midtrans, pricing, qr, ratelimit, rollups, stock
+from .messaging import FakeTwilioTransport
+from .events import OrderEventHub
 
-# Create your tests here.
+
+class StockReservationTests(TestCase):
+    def setUp(self):
+        self.kopi = Product.objects.create(name='Kopi Hitam', description='', price=5000, category='minuman', stock=3)
+        self.teh = Product.objects.create(name='Es Teh Manis', description='', price=4000, category='minuman', stock=1)
+
+    def test_shortage_rejects_whole_order(self):
+        cart = [
+            {'id': self.kopi.id, 'qty': 2, 'price': 5000},
+            {'id': self.teh.id, 'qty': 2, 'price': 4000},
+        ]
+        with self.assertRaises(OrderError) as ctx:
+            place_order(cart)
+        self.assertEqual(ctx.exception.shortages, [
+            {'id': self.teh.id, 'name': 'Es Teh Manis', 'requested': 2, 'available': 1},
+        ])
+        self.kopi.refresh_from_db()
+        self.assertEqual(self.kopi.stock, 3)
+        self.assertFalse(Order.objects.exists())
+
+    def test_release_returns_held_stock_once(self):
+        order = place_order([{'id': self.kopi.id, 'qty': 2, 'price': 5000}], hold=True)
+        self.kopi.refresh_from_db()
+        self.assertEqual(self.kopi.stock, 1)
+        self.assertEqual(stock.release(order), 1)
+        self.assertEqual(stock.release(order), 0)
+        self.kopi.refresh_from_db()
+        self.assertEqual(self.kopi.stock, 3)
+
+    def test_commit_keeps_stock_taken(self):
+        order = place_order([{'id': self.kopi.id, 'qty': 2, 'price': 5000}], hold=True)
+        stock.commit(order)
+        self.assertEqual(stock.release(order), 0)
+        self.assertEqual(StockReservation.objects.get(order=order).status, 'committed')
+        self.kopi.refresh_from_db()
+        self.assertEqual(self.kopi.stock, 1)
+
+
+class PlaceOrderTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.kopi = Product.objects.create(name='Kopi Hitam', description='', price=5000, category='minuman', stock=10)
+        self.roti = Product.objects.create(name='Roti Bakar', description='', price=12000, category='makanan', stock=10)
+
+    def test_order_and_details_use_server_prices(self):
+        order = place_order([
+            {'id': self.kopi.id, 'qty': 2, 'price': 1},
+            {'id': self.roti.id, 'qty': 1, 'price': 1},
+        ], customer_name='Budi')
+        self.assertEqual(order.total_price, Decimal('22000'))
+        self.assertEqual(
+            sorted(OrderDetail.objects.filter(order=order).values_list('product_id', 'quantity', 'price')),
+            sorted([(self.kopi.id, 2, Decimal('5000')), (self.roti.id, 1, Decimal('12000'))]),
+        )
+
+    def test_failure_after_insert_rolls_back_everything(self):
+        cart = [{'id': self.kopi.id, 'qty': 2}, {'id': self.roti.id, 'qty': 1}]
+        with mock.patch.object(OrderDetail.objects, 'bulk_create', side_effect=IntegrityError('detail gagal')):
+            with self.assertRaises(IntegrityError):
+                place_order(cart)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(list(Product.objects.order_by('id').values_list('stock', flat=True)), [10, 10])
+
+    def test_shortage_on_last_item_rolls_back_earlier_items(self):
+        with self.assertRaises(OrderError):
+            place_order([{'id': self.kopi.id, 'qty': 3}, {'id': self.roti.id, 'qty': 11}])
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderDetail.objects.exists())
+        self.kopi.refresh_from_db()
+        self.assertEqual(self.kopi.stock, 10)
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.kopi = Product.objects.create(name='Kopi Hitam', description='', price=5000, category='minuman', stock=50)
+        self.roti = Product.objects.create(name='Roti Bakar', description='', price=12000, category='makanan', stock=50)
+
+    def change(self, order, method=None, **fields):
+        before = rollups.order_state(order)
+        for name, value in fields.items():
+            setattr(order, name, value)
+        order.save()
+        if method:
+            Payment.objects.update_or_create(order=order, defaults={
+                'payment_method': method, 'payment_status': 'Paid', 'amount': order.total_price})
+        rollups.apply_order_change(order, before)
+
+    def snapshot(self):
+        return (
+            sorted(DailySalesRollup.objects.exclude(order_count=0).values_list('date', 'order_count', 'total_income')),
+            sorted(DailyProductSales.objects.exclude(quantity=0).values_list('date', 'product_id', 'quantity', 'total')),
+            sorted(DailyPaymentSales.objects.exclude(order_count=0).values_list('date', 'payment_method', 'order_count', 'total')),
+        )
+
+    def test_replayed_state_writes_nothing(self):
+        order = place_order([{'id': self.kopi.id, 'qty': 2}])
+        self.change(order, 'Cash', status='Completed', payment_status='Paid')
+        before = self.snapshot()
+        state = rollups.order_state(order)
+        with self.assertNumQueries(1):  # hanya baca metode pembayaran di order_state
+            rollups.apply_order_change(order, state)
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(before[0][0][1:], (1, Decimal('10000')))
+
+    def test_incremental_matches_rebuild(self):
+        cash = place_order([{'id': self.kopi.id, 'qty': 2}, {'id': self.roti.id, 'qty': 1}])
+        qr = place_order([{'id': self.roti.id, 'qty': 2}], source='qr_scan', payment_method='midtrans')
+        refunded = place_order([{'id': self.kopi.id, 'qty': 1}])
+        place_order([{'id': self.kopi.id, 'qty': 4}])  # masih Processing, tidak masuk rollup
+        self.change(cash, 'Cash', status='Completed', payment_status='Paid')
+        self.change(qr, payment_status='Paid')
+        self.change(qr, 'Midtrans', status='Completed')
+        self.change(refunded, 'Cash', status='Completed', payment_status='Paid')
+        self.change(refunded, status='Cancelled', payment_status='Cancelled')
+        incremental = self.snapshot()
+        self.assertEqual(incremental[0][0][1:], (2, Decimal('46000')))
+        rollups.rebuild()
+        self.assertEqual(self.snapshot(), incremental)
+
+
+class DashboardSummaryTests(TestCase):
+    today = date(2026, 3, 10)
+
+    def completed(self, day, total, method='Cash'):
+        order = Order.objects.create(total_price=total, status='Completed', payment_status='Paid',
+                                     payment_method='midtrans' if method == 'Midtrans' else 'cash')
+        when = timezone.make_aware(datetime.combine(day, dt_time(12)))
+        Order.objects.filter(id=order.id).update(date_ordered=when)
+        Payment.objects.create(order=order, payment_method=method, payment_status='Paid', amount=total)
+
+    def setUp(self):
+        self.completed(date(2026, 3, 10), 10000)
+        self.completed(date(2026, 3, 8), 5000, 'Midtrans')
+        self.completed(date(2026, 1, 5), 7000)
+        self.completed(date(2024, 7, 1), 3000)
+        Order.objects.create(total_price=99000, status='Processing')  # belum selesai, tidak dihitung
+        rollups.rebuild()
+
+    def test_buckets(self):
+        summary = dashboard_summary(self.today)
+        self.assertEqual([d['date'] for d in summary['daily_income']],
+                         ['04-03', '05-03', '06-03', '07-03', '08-03', '09-03', '10-03'])
+        self.assertEqual([d['total'] for d in summary['daily_income']], [0, 0, 0, 0, 5000, 0, 10000])
+        monthly = {m['month']: m['total'] for m in summary['monthly_income']}
+        self.assertEqual(len(monthly), 12)
+        self.assertEqual((monthly[1], monthly[2], monthly[3]), (7000, 0, 15000))
+        yearly = {y['year']: y['total'] for y in summary['yearly_income']}
+        self.assertEqual(yearly, {2022: 0, 2023: 0, 2024: 3000, 2025: 0, 2026: 22000})
+        self.assertEqual((summary['cash_count'], summary['midtrans_count']), (4, 1))
+
+    def test_query_count_is_constant(self):
+        for _ in range(5):
+            self.completed(date(2026, 2, 1), 1000)
+        rollups.rebuild()
+        with self.assertNumQueries(4):
+            summary = dashboard_summary(self.today)
+            list(summary['product_ranking'])
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.kopi = Product.objects.create(name='Kopi Hitam', description='', price=5000, category='minuman', stock=5)
+
+    def test_product_and_table_changes_bump_version(self):
+        for change in (
+            lambda: Product.objects.filter(id=self.kopi.id).first().save(),
+            lambda: Table.objects.create(table_number='7'),
+            lambda: Table.objects.get(table_number='7').save(),
+            lambda: Table.objects.get(table_number='7').delete(),
+            lambda: Product.objects.get(id=self.kopi.id).delete(),
+        ):
+            version = catalog.get_version()
+            change()
+            self.assertNotEqual(catalog.get_version(), version)
+
+    def test_cached_menu_follows_edits(self):
+        self.assertEqual([p['name'] for p in catalog.get_products()], ['Kopi Hitam'])
+        with self.assertNumQueries(2):  # versi katalog + stok terbaru, daftar produk dari cache
+            catalog.get_products()
+        self.kopi.name = 'Kopi Tubruk'
+        self.kopi.save()
+        self.assertEqual([p['name'] for p in catalog.get_products()], ['Kopi Tubruk'])
+        self.assertEqual(catalog.get_prices()[self.kopi.id]['name'], 'Kopi Tubruk')
+
+    def test_version_is_shared_through_database(self):
+        version = catalog.get_version()
+        cache.clear()  # worker lain: cache locmem-nya sendiri
+        self.assertEqual(catalog.get_version(), version)
+        self.assertEqual(pricing.price_table()[self.kopi.id]['price'], Decimal('5000'))
+        # Worker lain mengubah harga dan menaikkan versi; proses ini ikut memakai harga baru
+        Product.objects.filter(id=self.kopi.id).update(price=7000)
+        catalog.bump_version()
+        self.assertEqual(pricing.price_table()[self.kopi.id]['price'], Decimal('7000'))
+
+    def test_version_is_read_once_per_request(self):
+        self.client.get('/api/menu/')
+        with self.assertNumQueries(2):  # versi katalog + stok terbaru
+            self.client.get('/api/menu/')
+
+
+class MenuApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.kopi = Product.objects.create(name='Kopi Hitam', description='', price=5000, category='minuman', stock=5)
+
+    def test_etag_and_not_modified(self):
+        response = self.client.get('/api/menu/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        tag = response['ETag']
+        self.assertRegex(tag, r'^"[^"]+"$')
+        self.assertEqual(response.json()['products'][0]['name'], 'Kopi Hitam')
+        cached = self.client.get('/api/menu/', HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.content, b'')
+        self.assertEqual(cached['ETag'], tag)
+
+    def test_gzip_variant_has_its_own_tag(self):
+        plain = self.client.get('/api/menu/')
+        zipped = self.client.get('/api/menu/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(zipped['Content-Encoding'], 'gzip')
+        self.assertNotEqual(zipped['ETag'], plain['ETag'])
+        self.assertEqual(json.loads(gzip.decompress(zipped.content)), plain.json())
+        # Tag versi tanpa gzip tidak berlaku untuk versi gzip (dan sebaliknya)
+        self.assertEqual(self.client.get('/api/menu/', HTTP_ACCEPT_ENCODING='gzip',
+                                         HTTP_IF_NONE_MATCH=plain['ETag']).status_code, 200)
+        self.assertEqual(self.client.get('/api/menu/', HTTP_ACCEPT_ENCODING='gzip',
+                                         HTTP_IF_NONE_MATCH=zipped['ETag']).status_code, 304)
+
+    def test_tag_changes_on_edit_and_sold_out(self):
+        tag = self.client.get('/api/menu/')['ETag']
+        Product.objects.filter(id=self.kopi.id).update(stock=4)
+        self.assertEqual(self.client.get('/api/menu/', HTTP_IF_NONE_MATCH=tag).status_code, 304)
+        Product.objects.filter(id=self.kopi.id).update(stock=0)
+        sold_out = self.client.get('/api/menu/', HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(sold_out.status_code, 200)
+        self.assertFalse(sold_out.json()['products'][0]['available'])
+        self.kopi.refresh_from_db()
+        self.kopi.price = 6000
+        self.kopi.save()
+        edited = self.client.get('/api/menu/', HTTP_IF_NONE_MATCH=sold_out['ETag'])
+        self.assertEqual(edited.json()['products'][0]['price'], 6000)
+
+
+class OrderEventHubTests(SimpleTestCase):
+    def test_publish_from_thread_reaches_subscriber_until_unsubscribed(self):
+        async def scenario():
+            hub = OrderEventHub()
+            subscriber = hub.subscribe()
+            worker = threading.Thread(target=hub.publish, args=('order_created', {'id': 7}))
+            worker.start()
+            worker.join()
+            message = await asyncio.wait_for(subscriber[1].get(), timeout=1)
+            hub.unsubscribe(subscriber)
+            hub.publish('order_paid', {'id': 7})
+            await asyncio.sleep(0)
+            return message, subscriber[1].qsize()
+
+        message, pending = asyncio.run(scenario())
+        self.assertEqual(message, 'event: order_created\ndata: {"id": 7}\n\n')
+        self.assertEqual(pending, 0)
+
+    def test_stream_unsubscribes_when_closed_and_drops_overflow(self):
+        async def scenario():
+            hub = OrderEventHub(queue_size=1)
+            stream = hub.stream(keepalive=0.01)
+            first = await stream.__anext__()
+            hub.publish('order_created', {'id': 1})
+            hub.publish('order_created', {'id': 2})  # antrian penuh: dibuang, tidak error
+            await asyncio.sleep(0)
+            event = await stream.__anext__()
+            keepalive = await stream.__anext__()
+            await stream.aclose()
+            return first, event, keepalive, len(hub._subscribers)
+
+        first, event, keepalive, subscribers = asyncio.run(scenario())
+        self.assertEqual(first, 'retry: 3000\n\n')
+        self.assertIn('"id": 1', event)
+        self.assertEqual(keepalive, ': keepalive\n\n')
+        self.assertEqual(subscribers, 0)
+
+
+class OrderListEventsTests(TestCase):
+    def setUp(self):
+        self.kasir = CustomUser.objects.create_user('kasir', password='rahasia', role='kasir')
+
+    def test_forbidden_without_kasir_role(self):
+        self.assertEqual(self.client.get('/order-list/events/').status_code, 403)
+        self.client.force_login(CustomUser.objects.create_user('pelanggan', password='rahasia', role='customer'))
+        self.assertEqual(self.client.get('/order-list/events/').status_code, 403)
+
+    def test_wsgi_falls_back_to_reload(self):
+        self.client.force_login(self.kasir)
+        self.assertEqual(self.client.get('/order-list/events/').status_code, 204)
+        self.assertContains(self.client.get('/order-list/'), 'const LIVE_UPDATES = false;')
+
+    async def test_asgi_streams_event_stream(self):
+        await self.async_client.aforce_login(self.kasir)
+        response = await self.async_client.get('/order-list/events/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response.streaming_content
+        self.assertEqual(await stream.__anext__(), b'retry: 3000\n\n')
+        await stream.aclose()
+        page = await self.async_client.get('/order-list/')
+        self.assertContains(page, 'const LIVE_UPDATES = true;')
+
+
+class StockConcurrencyTests(TransactionTestCase):
+    initial_stock = 10
+    workers = 25
+
+    def test_concurrent_orders_never_oversell(self):
+        product = Product.objects.create(name='Nasi Goreng', description='', price=15000, category='makanan', stock=self.initial_stock)
+        cart = [{'id': product.id, 'qty': 1, 'price': 15000}]
+        results = []
+        start = threading.Barrier(self.workers)
+
+        def worker():
+            start.wait()
+            try:
+                for attempt in range(100):
+                    try:
+                        place_order(cart)
+                        results.append('ok')
+                        return
+                    except OperationalError:
+                        # SQLite: database terkunci oleh writer lain, coba lagi
+                        time.sleep(0.005 * (attempt % 10 + 1))
+                    except OrderError:
+                        results.append('shortage')
+                        return
+                results.append('locked')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        product.refresh_from_db()
+        sold = results.count('ok')
+        self.assertNotIn('locked', results)
+        self.assertEqual(sold, self.initial_stock)
+        self.assertEqual(results.count('shortage'), self.workers - self.initial_stock)
+        self.assertEqual(product.stock, 0)
+        self.assertEqual(Order.objects.count(), sold)
+
+
+class MidtransClientTests(SimpleTestCase):
+    payload = midtrans.build_snap_payload(1, [{'id': 1, 'price': 5000, 'quantity': 2, 'name': 'Kopi'}], {'first_name': 'Budi'})
+
+    def setUp(self):
+        self.stub = MidtransStubServer().start()
+        self.settings_override = override_settings(MIDTRANS_SNAP_URL=self.stub.url, MIDTRANS_TIMEOUT=(1, 0.3), MIDTRANS_BACKOFF=0)
+        self.settings_override.enable()
+        midtrans.reset_session()
+
+    def tearDown(self):
+        midtrans.reset_session()
+        self.settings_override.disable()
+        self.stub.stop()
+
+    def test_token_and_payload(self):
+        self.assertTrue(midtrans.create_snap_token(self.payload))
+        self.assertEqual(self.stub.requests[0]['transaction_details'], {'order_id': '1', 'gross_amount': 10000})
+
+    def test_retries_server_errors(self):
+        self.stub.failures = 2
+        self.assertTrue(midtrans.create_snap_token(self.payload))
+        self.assertEqual(len(self.stub.requests), 3)
+
+    def test_non_idempotent_server_errors_are_not_retried(self):
+        for status in (500, 502, 504):
+            with self.subTest(status):
+                self.stub.requests.clear()
+                self.stub.failures, self.stub.failure_status = 1, status
+                with self.assertRaises(midtrans.MidtransError):
+                    midtrans.create_snap_token(self.payload)
+                self.assertEqual(len(self.stub.requests), 1)
+
+    def test_retry_after_is_honoured(self):
+        self.stub.failures, self.stub.failure_status, self.stub.retry_after = 1, 429, 1
+        started = time.monotonic()
+        self.assertTrue(midtrans.create_snap_token(self.payload))
+        self.assertGreaterEqual(time.monotonic() - started, 0.9)
+        self.assertEqual(len(self.stub.requests), 2)
+
+    @override_settings(MIDTRANS_RETRY_AFTER_MAX=5)
+    def test_long_retry_after_is_not_waited_for(self):
+        self.stub.failures, self.stub.retry_after = 1, 60
+        with self.assertRaises(midtrans.MidtransError):
+            midtrans.create_snap_token(self.payload)
+        self.assertEqual(len(self.stub.requests), 1)
+
+    def test_async_retry_rules(self):
+        async def run():
+            try:
+                return await midtrans.create_snap_token_async(self.payload)
+            finally:
+                await midtrans.close_async_session()
+
+        self.stub.failures, self.stub.failure_status = 1, 500
+        with self.assertRaises(midtrans.MidtransError):
+            asyncio.run(run())
+        self.assertEqual(len(self.stub.requests), 1)
+        self.stub.failures, self.stub.failure_status, self.stub.retry_after = 1, 429, 1
+        started = time.monotonic()
+        self.assertTrue(asyncio.run(run()))
+        self.assertGreaterEqual(time.monotonic() - started, 0.9)
+        self.assertEqual(len(self.stub.requests), 3)
+
+    def test_slow_response_times_out(self):
+        self.stub.delay = 0.6
+        with self.assertRaises(midtrans.MidtransError):
+            midtrans.create_snap_token(self.payload)
+
+    def test_read_timeout_is_not_retried(self):
+        # Snap create tidak idempoten: request yang lambat mungkin sudah membuat transaksi
+        self.stub.delay = 0.6
+        with self.assertRaises(midtrans.MidtransError):
+            midtrans.create_snap_token(self.payload)
+        time.sleep(0.5)
+        self.assertEqual(len(self.stub.requests), 1)
+
+    def test_async_read_timeout_is_not_retried(self):
+        async def run():
+            try:
+                return await midtrans.create_snap_token_async(self.payload)
+            finally:
+                await midtrans.close_async_session()
+
+        self.stub.delay = 0.6
+        with self.assertRaises(midtrans.MidtransError):
+            asyncio.run(run())
+        time.sleep(0.5)
+        self.assertEqual(len(self.stub.requests), 1)
+
+    def test_async_variant(self):
+        async def run():
+            try:
+                return await midtrans.create_snap_token_async(self.payload)
+            finally:
+                await midtrans.close_async_session()
+
+        self.stub.failures = 1
+        self.assertTrue(asyncio.run(run()))
+        self.assertEqual(len(self.stub.requests), 2)
+
+
+class SnapTokenCacheTests(TestCase):
+    def setUp(self):
+        self.stub = MidtransStubServer().start()
+        self.settings_override = override_settings(MIDTRANS_SNAP_URL=self.stub.url, MIDTRANS_BACKOFF=0)
+        self.settings_override.enable()
+        midtrans.reset_session()
+        self.order = Order.objects.create(total_price=10000)
+        self.payload = lambda: midtrans.build_snap_payload(self.order.id, [{'id': 1, 'price': int(self.order.total_price), 'quantity': 1, 'name': 'Kopi'}], {})
+
+    def tearDown(self):
+        midtrans.invalidate_snap_token(self.order.id)
+        midtrans.reset_session()
+        self.settings_override.disable()
+        self.stub.stop()
+
+    def test_repeat_calls_reuse_token(self):
+        token = midtrans.get_snap_token(self.order, self.payload)
+        self.order.refresh_from_db()
+        self.assertEqual(midtrans.get_snap_token(self.order, self.payload), token)
+        self.assertEqual(len(self.stub.requests), 1)
+
+    def test_total_change_requests_new_token(self):
+        token = midtrans.get_snap_token(self.order, self.payload)
+        self.order.total_price = 12000
+        self.order.save()
+        self.assertNotEqual(midtrans.get_snap_token(self.order, self.payload), token)
+        self.assertEqual(len(self.stub.requests), 2)
+
+    def test_token_is_stored_on_order_for_other_workers(self):
+        token = midtrans.get_snap_token(self.order, self.payload)
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.snap_token, self.order.snap_amount), (token, Decimal('10000.00')))
+        # Worker lain: cache locmem-nya kosong, token diambil dari Order
+        midtrans.invalidate_snap_token(self.order.id)
+        order = Order.objects.get(id=self.order.id)
+        self.assertEqual(midtrans.get_snap_token(order, self.payload), token)
+        self.assertEqual(len(self.stub.requests), 1)
+
+    def test_stored_token_near_expiry_is_regenerated(self):
+        token = midtrans.get_snap_token(self.order, self.payload)
+        self.order.refresh_from_db()
+        self.assertAlmostEqual(
+            (self.order.snap_token_expires_at - timezone.now()).total_seconds(), 24 * 60 * 60, delta=60,
+        )
+        midtrans.invalidate_snap_token(self.order.id)
+        Order.objects.filter(id=self.order.id).update(snap_token_expires_at=timezone.now() + timedelta(minutes=5))
+        order = Order.objects.get(id=self.order.id)
+        fresh = midtrans.get_snap_token(order, self.payload)
+        self.assertNotEqual(fresh, token)
+        self.assertEqual(len(self.stub.requests), 2)
+        order.refresh_from_db()
+        self.assertEqual(order.snap_token, fresh)
+        self.assertGreater(order.snap_token_expires_at, timezone.now() + timedelta(hours=23))
+
+    def test_expiry_follows_payload(self):
+        created = timezone.now()
+        self.assertEqual(midtrans.token_expires_at({}, created), created + timedelta(days=1))
+        payload = {'expiry': {'unit': 'minutes', 'duration': 30}}
+        self.assertEqual(midtrans.token_expires_at(payload, created), created + timedelta(minutes=30))
+
+    @override_settings(MIDTRANS_SNAP_LOCK_WAIT=0.3)
+    def test_waiter_does_not_create_or_release_foreign_lock(self):
+        lock_key = f'{midtrans._token_cache_key(self.order.id)}:lock'
+        cache.add(lock_key, 1, 30)
+        try:
+            started = time.monotonic()
+            with self.assertRaises(midtrans.MidtransError):
+                midtrans.get_snap_token(self.order, self.payload)
+            self.assertLess(time.monotonic() - started, 2)
+            self.assertEqual(self.stub.requests, [])
+            self.assertIsNotNone(cache.get(lock_key))
+        finally:
+            cache.delete(lock_key)
+
+    def test_waiter_gets_token_from_lock_holder(self):
+        lock_key = f'{midtrans._token_cache_key(self.order.id)}:lock'
+        cache.add(lock_key, 1, 30)
+        timer = threading.Timer(0.2, midtrans._remember_token, (self.order.id, '10000.00', 'token-lain', timezone.now() + timedelta(hours=24)))
+        timer.start()
+        try:
+            self.assertEqual(midtrans.get_snap_token(self.order, self.payload), 'token-lain')
+            self.assertEqual(self.stub.requests, [])
+        finally:
+            timer.join()
+            cache.delete(lock_key)
+
+    def test_status_change_invalidates_token(self):
+        midtrans.get_snap_token(self.order, self.payload)
+        self.order.payment_status = 'Paid'
+        self.order.save()
+        self.assertIsNone(midtrans._cached_token(self.order.id, '10000.00'))
+
+
+class MidtransWebhookTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name='Kopi Susu', description='', price=8000, category='minuman', stock=5)
+        self.order = place_order([{'id': self.product.id, 'qty': 2, 'price': 8000}], hold=True, source='qr_scan')
+
+    def notify(self, status, transaction_id='trx-1'):
+        return self.client.post('/midtrans-webhook/', json.dumps({
+            'order_id': str(self.order.id),
+            'transaction_id': transaction_id,
+            'transaction_status': status,
+        }), content_type='application/json')
+
+    def test_settlement_is_processed_once(self):
+        self.assertEqual(self.notify('settlement').json()['result'], 'applied')
+        self.assertEqual(self.notify('settlement').json()['result'], 'duplicate')
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, 'Paid')
+        self.assertEqual(Payment.objects.get(order=self.order).amount, self.order.total_price)
+        self.assertEqual(PaymentEvent.objects.count(), 1)
+
+    def test_repeated_expire_releases_stock_once(self):
+        self.notify('expire')
+        self.notify('expire')
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 5)
+        self.assertEqual(PaymentEvent.objects.count(), 1)
+
+    def test_expire_after_settlement_is_ignored(self):
+        self.notify('settlement')
+        self.assertEqual(self.notify('expire', transaction_id='trx-2').json()['result'], 'applied')
+        self.order.refresh_from_db()
+        self.product.refresh_from_db()
+        self.assertEqual((self.order.status, self.order.payment_status), ('Processing', 'Paid'))
+        self.assertEqual(Payment.objects.get(order=self.order).amount, self.order.total_price)
+        self.assertEqual(self.product.stock, 3)
+        self.assertEqual(PaymentEvent.objects.count(), 2)
+
+    def test_expire_after_cash_payment_keeps_revenue(self):
+        self.client.force_login(CustomUser.objects.create_user('kasir', password='rahasia', role='kasir'))
+        self.assertTrue(self.client.post(f'/order/{self.order.id}/confirm-cash/').json()['success'])
+        self.client.post('/order/complete/', json.dumps({'order_id': self.order.id}), content_type='application/json')
+        day = timezone.localdate(self.order.date_ordered)
+        self.assertEqual(DailySalesRollup.objects.get(date=day).total_income, Decimal('16000'))
+        self.notify('expire')
+        self.order.refresh_from_db()
+        self.product.refresh_from_db()
+        self.assertEqual((self.order.status, self.order.payment_status), ('Completed', 'Paid'))
+        self.assertEqual(self.product.stock, 3)
+        self.assertEqual(DailySalesRollup.objects.get(date=day).total_income, Decimal('16000'))
+
+    def test_settlement_after_cancel_does_not_reopen_order(self):
+        self.notify('expire')
+        self.notify('settlement', transaction_id='trx-2')
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.status, self.order.payment_status), ('Cancelled', 'Cancelled'))
+        self.assertEqual(PaymentEvent.objects.count(), 2)
+
+    def test_unknown_order_is_not_logged(self):
+        response = self.client.post('/midtrans-webhook/', json.dumps({
+            'order_id': '999999', 'transaction_status': 'settlement',
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(PaymentEvent.objects.exists())
+
+
+class CashPaymentTests(TestCase):
+    def setUp(self):
+        product = Product.objects.create(name='Roti Bakar', description='', price=12000, category='makanan', stock=10)
+        self.order = place_order([{'id': product.id, 'qty': 1, 'price': 12000}])
+        self.client.force_login(CustomUser.objects.create_user('kasir', password='rahasia', role='kasir'))
+
+    def test_second_pay_cash_is_rejected(self):
+        first = self.client.post(f'/checkout/{self.order.id}/pay-cash/').json()
+        second = self.client.post(f'/checkout/{self.order.id}/pay-cash/').json()
+        self.assertTrue(first['success'])
+        self.assertFalse(second['success'])
+        self.assertEqual(Payment.objects.filter(order=self.order).count(), 1)
+
+    def test_cash_payment_commits_held_stock(self):
+        product = Product.objects.create(name='Es Jeruk', description='', price=7000, category='minuman', stock=5)
+        for url in ('/checkout/{}/pay-cash/', '/order/{}/confirm-cash/'):
+            with self.subTest(url):
+                order = place_order([{'id': product.id, 'qty': 1}], hold=True, source='qr_scan')
+                self.assertTrue(self.client.post(url.format(order.id)).json()['success'])
+                self.assertEqual(list(StockReservation.objects.filter(order=order).values_list('status', flat=True)), ['committed'])
+                self.assertEqual(stock.release(order), 0)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 3)
+
+
+class CustomerOTPTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def login(self, phone='081234567890'):
+        return self.client.post('/customer/login/', {'name': 'Budi', 'phone': phone})
+
+    def test_otp_requests_are_limited_per_phone(self):
+        for _ in range(3):
+            self.assertEqual(self.login().status_code, 302)
+        self.assertEqual(OutboundMessage.objects.filter(to='081234567890').count(), 3)
+        session = CustomerOTPSession.objects.latest('id')
+        self.assertEqual(OutboundMessage.objects.latest('id').expires_at, session.expires_at)
+        self.assertEqual(self.login().status_code, 429)
+        self.assertEqual(self.login('089999').status_code, 302)
+
+    def test_phone_limit_is_shared_by_all_workers(self):
+        for _ in range(3):
+            self.assertEqual(self.login().status_code, 302)
+            cache.clear()  # worker lain: cache locmem-nya sendiri
+        self.assertEqual(self.login().status_code, 429)
+
+    def test_wrong_otp_attempts_are_capped(self):
+        self.login()
+        session = CustomerOTPSession.objects.get()
+        wrong = '000000' if session.otp_code != '000000' else '111111'
+        for _ in range(5):
+            self.assertEqual(self.client.post('/customer/otp-verify/', {'otp': wrong}).status_code, 200)
+        self.assertEqual(self.client.post('/customer/otp-verify/', {'otp': wrong}).status_code, 429)
+        # OTP yang benar pun tidak berlaku lagi setelah diblokir
+        response = self.client.post('/customer/otp-verify/', {'otp': session.otp_code})
+        self.assertRedirects(response, '/customer/login/', fetch_redirect_response=False)
+
+    def test_purge_deletes_only_expired_sessions(self):
+        now = timezone.now()
+        CustomerOTPSession.objects.bulk_create([
+            CustomerOTPSession(phone_number='08', otp_code='1', expires_at=now - timedelta(days=1), session_token=f'old-{i}')
+            for i in range(25)
+        ] + [CustomerOTPSession(phone_number='08', otp_code='1', expires_at=now + timedelta(minutes=5), session_token='new')])
+        call_command('purge_otp_sessions', batch_size=10, sleep=0, stdout=io.StringIO())
+        self.assertEqual(list(CustomerOTPSession.objects.values_list('session_token', flat=True)), ['new'])
+
+
+@override_settings(MESSAGE_RETRY_BACKOFF=0, MESSAGE_MAX_ATTEMPTS=3)
+class OutboundMessageTests(TransactionTestCase):
+    def setUp(self):
+        FakeTwilioTransport.sent = []
+        FakeTwilioTransport.fail_times = 0
+        FakeTwilioTransport.permanent = False
+
+    def test_drain_sends_every_message_once(self):
+        for i in range(30):
+            messaging.enqueue_whatsapp(f'0812{i:04d}', f'OTP {i}')
+        totals = messaging.drain(FakeTwilioTransport(), workers=4, limit=8)
+        self.assertEqual(totals, {'sent': 30})
+        self.assertEqual(len({m['to'] for m in FakeTwilioTransport.sent}), 30)
+        self.assertFalse(OutboundMessage.objects.exclude(status='sent').exists())
+
+    def test_transient_failures_are_retried(self):
+        FakeTwilioTransport.fail_times = 2
+        message = messaging.enqueue_whatsapp('08123', 'OTP')
+        messaging.drain(FakeTwilioTransport(), workers=1)
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('sent', 3))
+
+    def test_dead_letter_after_max_attempts_or_permanent_error(self):
+        FakeTwilioTransport.fail_times = 10
+        retried = messaging.enqueue_whatsapp('08123', 'OTP')
+        messaging.drain(FakeTwilioTransport(), workers=1)
+        retried.refresh_from_db()
+        self.assertEqual((retried.status, retried.attempts), ('dead', 3))
+
+        FakeTwilioTransport.permanent = True
+        permanent = messaging.enqueue_whatsapp('08124', 'OTP')
+        messaging.drain(FakeTwilioTransport(), workers=1)
+        permanent.refresh_from_db()
+        self.assertEqual((permanent.status, permanent.attempts), ('dead', 1))
+
+    def test_expired_messages_are_dead_instead_of_sent(self):
+        now = timezone.now()
+        expired = messaging.enqueue_whatsapp('08123', 'OTP basi', expires_at=now - timedelta(seconds=1))
+        fresh = messaging.enqueue_whatsapp('08124', 'OTP baru', expires_at=now + timedelta(minutes=5))
+        self.assertEqual(messaging.drain(FakeTwilioTransport(), workers=1), {'sent': 1})
+        self.assertEqual([m['body'] for m in FakeTwilioTransport.sent], ['OTP baru'])
+        expired.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual((expired.status, expired.attempts), ('dead', 0))
+        self.assertEqual(fresh.status, 'sent')
+
+    def test_message_expiring_after_claim_is_not_sent(self):
+        message = messaging.enqueue_whatsapp('08123', 'OTP', expires_at=timezone.now() + timedelta(minutes=5))
+        [claimed] = messaging.claim_batch(10, 'worker-1')
+        claimed.expires_at = timezone.now() - timedelta(seconds=1)
+        self.assertEqual(messaging.deliver(claimed, FakeTwilioTransport()), 'dead')
+        self.assertEqual(FakeTwilioTransport.sent, [])
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.locked_by), ('dead', ''))
+
+
+class PricingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.product = Product.objects.create(name='Kue Lapis', description='', price=Decimal('12500.50'), category='kue', stock=20)
+
+    def test_client_price_is_ignored(self):
+        order = place_order([
+            {'id': self.product.id, 'qty': 2, 'price': 1},
+            {'id': self.product.id, 'qty': 1, 'price': 1},
+        ])
+        self.assertEqual(order.total_price, Decimal('37501.50'))
+        detail = order.order_details.get()
+        self.assertEqual((detail.quantity, detail.price), (3, Decimal('12500.50')))
+
+    def test_price_change_applies_to_new_orders_only(self):
+        first = place_order([{'id': self.product.id, 'qty': 1}])
+        self.product.price = Decimal('15000')
+        self.product.save()
+        second = place_order([{'id': self.product.id, 'qty': 1}])
+        self.assertEqual((first.total_price, second.total_price), (Decimal('12500.50'), Decimal('15000')))
+        self.assertEqual(pricing.snap_items(first), [
+            {'id': self.product.id, 'price': 12501, 'quantity': 1, 'name': 'Kue Lapis'},
+        ])
+
+    def test_pricing_a_cart_needs_no_queries(self):
+        # Dalam satu request versi katalog sudah dibaca; tabel harga dari memori proses
+        catalog.start_request()
+        try:
+            pricing.price_table()
+            with self.assertNumQueries(0):
+                lines, total = pricing.price_cart({self.product.id: 4})
+        finally:
+            catalog.end_request()
+        self.assertEqual(total, Decimal('50002.00'))
+
+    def test_unknown_product(self):
+        with self.assertRaises(OrderError):
+            place_order([{'id': 999999, 'qty': 1}])
+
+
+class CustomerHistoryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.product = Product.objects.create(name='Soto Ayam', description='', price=18000, category='makanan', stock=20)
+        self.order = place_order(
+            [{'id': self.product.id, 'qty': 2}], source='qr_scan', phone_number='08123', customer_name='Ani',
+        )
+        session = self.client.session
+        session.update({'is_customer_verified': True, 'customer_phone': '08123'})
+        session.save()
+
+    def test_detail_is_served_from_summary(self):
+        self.product.name = 'Soto Betawi'
+        self.product.save()
+        with self.assertNumQueries(2):  # session + order
+            data = self.client.get(f'/customer/order/history/{self.order.id}/').json()['order']
+        self.assertEqual(data['items'], [{'name': 'Soto Ayam', 'qty': 2, 'price': 18000}])
+        self.assertEqual(data['total_price'], 36000)
+
+    def test_order_without_summary_is_backfilled(self):
+        Order.objects.filter(id=self.order.id).update(summary={})
+        data = self.client.get(f'/customer/order/history/{self.order.id}/').json()['order']
+        self.assertEqual(data['items'][0]['qty'], 2)
+        self.order.refresh_from_db()
+        self.assertIn('items', self.order.summary)
+
+    def test_history_list(self):
+        orders = self.client.get('/customer/order/history/').json()['orders']
+        self.assertEqual([(o['id'], o['total_price']) for o in orders], [(self.order.id, 36000)])
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.store.clear()
+        Product.objects.create(name='Air Mineral', description='', price=4000, category='minuman', stock=10)
+
+    def test_owner_sees_per_view_stats(self):
+        self.client.get('/api/menu/')
+        self.client.force_login(CustomUser.objects.create_user('owner', password='rahasia', role='owner'))
+        stats = self.client.get('/owner/metrics/').json()['views']['api_menu']
+        self.assertEqual(stats['count'], 1)
+        self.assertGreaterEqual(stats['max_queries'], 1)
+        self.assertEqual(sum(stats['histogram'].values()), 1)
+
+    def test_kasir_cannot_see_metrics(self):
+        self.client.force_login(CustomUser.objects.create_user('kasir', password='rahasia', role='kasir'))
+        self.assertEqual(self.client.get('/owner/metrics/').status_code, 403)
+
+    @override_settings(QUERY_BUDGETS={'api_menu': 0}, QUERY_BUDGET_RAISE=True)
+    def test_query_budget_raises(self):
+        with self.assertRaises(metrics.QueryBudgetExceeded):
+            self.client.get('/api/menu/')
+
+    async def test_queries_are_counted_under_asgi(self):
+        kasir = await sync_to_async(CustomUser.objects.create_user)('kasir', password='rahasia', role='kasir')
+        await self.async_client.aforce_login(kasir)
+        self.assertEqual((await self.async_client.get('/')).status_code, 200)
+        asgi = metrics.store.snapshot()['kasir_dashboard']['max_queries']
+        metrics.store.clear()
+        await sync_to_async(self.client.force_login)(kasir)
+        await sync_to_async(self.client.get)('/')
+        self.assertGreater(asgi, 0)
+        self.assertEqual(asgi, metrics.store.snapshot()['kasir_dashboard']['max_queries'])
+
+    @override_settings(QUERY_BUDGETS={'api_menu': 0}, QUERY_BUDGET_RAISE=True)
+    async def test_query_budget_raises_under_asgi(self):
+        with self.assertRaises(metrics.QueryBudgetExceeded):
+            await self.async_client.get('/api/menu/')
+
+
+class BenchmarkTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.stub = MidtransStubServer().start()
+        self.settings_override = override_settings(MIDTRANS_SNAP_URL=self.stub.url, MIDTRANS_BACKOFF=0)
+        self.settings_override.enable()
+        midtrans.reset_session()
+
+    def tearDown(self):
+        midtrans.reset_session()
+        self.settings_override.disable()
+        self.stub.stop()
+
+    def test_all_scenarios_run_without_errors(self):
+        counts = loadgen.seed(orders=30, products=8, tables=3, customers=5, seed=7)
+        self.assertEqual(counts['orders'], 30)
+        self.assertEqual(Order.objects.count(), 30)
+        results = bench.run(requests=3, concurrency=1, seed=7)
+        self.assertEqual(set(results), set(bench.SCENARIOS))
+        for name, result in results.items():
+            self.assertEqual((result['requests'], result['errors']), (3, 0), name)
+            self.assertGreater(result['queries_per_request'], 0, name)
+
+    def test_seed_keeps_historical_dates(self):
+        loadgen.seed(orders=200, products=5, tables=2, customers=10, days=10, seed=3)
+        today = timezone.localdate()
+        dates = {timezone.localdate(d) for d in Order.objects.values_list('date_ordered', flat=True)}
+        self.assertTrue(all(today - timedelta(days=10) <= d < today for d in dates))
+        self.assertGreater(len(dates), 5)
+        completed = Order.objects.filter(status='Completed')
+        self.assertEqual(Payment.objects.count(), completed.count())
+        self.assertLessEqual(Order.objects.filter(source='qr_scan').values('phone_number').distinct().count(), 10)
+
+    def test_compare_flags_regressions(self):
+        baseline = {'order_list': {'p95_ms': 100, 'rps': 50, 'queries_per_request': 3}}
+        current = {'order_list': {'p95_ms': 130, 'rps': 48, 'queries_per_request': 5}}
+        flagged = {row['metric'] for row in bench.compare(current, baseline, tolerance=0.2) if row['regression']}
+        self.assertEqual(flagged, {'p95_ms', 'queries_per_request'})
+
+
+class QRGenerationTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media.name, QR_TABLE_URL='https://pos.test/meja/{table}/')
+        self.settings_override.enable()
+        Table.objects.bulk_create([Table(table_number=str(n)) for n in range(1, 4)])
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media.cleanup()
+
+    def test_second_run_skips_unchanged_tables(self):
+        self.assertEqual(qr.generate(workers=1), {'generated': ['1', '2', '3'], 'skipped': 0})
+        table = Table.objects.get(table_number='2')
+        self.assertEqual(str(table.qr_code), 'qr_codes/meja-2.png')
+        self.assertTrue(os.path.exists(os.path.join(self.media.name, 'qr_codes', 'meja-2.png')))
+        with self.assertNumQueries(1):
+            self.assertEqual(qr.generate(workers=1), {'generated': [], 'skipped': 3})
+
+    def test_url_change_or_missing_file_regenerates(self):
+        qr.generate(workers=1)
+        os.remove(os.path.join(self.media.name, 'qr_codes', 'meja-1.png'))
+        self.assertEqual(qr.generate(workers=1)['generated'], ['1'])
+        with override_settings(QR_TABLE_URL='https://pos.test/m/{table}/'):
+            self.assertEqual(len(qr.generate(workers=1)['generated']), 3)
+        # Tulis atomik: tidak ada file sementara yang tertinggal
+        self.assertEqual(sorted(os.listdir(os.path.join(self.media.name, 'qr_codes'))), ['meja-1.png', 'meja-2.png', 'meja-3.png'])
+
+    def test_sheet_pdf_and_zip(self):
+        qr.generate(workers=1)
+        pdf, archive = os.path.join(self.media.name, 'meja.pdf'), os.path.join(self.media.name, 'meja.zip')
+        self.assertEqual(qr.build_sheet(pdf), 3)
+        with open(pdf, 'rb') as f:
+            self.assertEqual(f.read(5), b'%PDF-')
+        qr.build_sheet(archive)
+        with zipfile.ZipFile(archive) as z:
+            self.assertEqual(sorted(z.namelist()), ['meja-1.png', 'meja-2.png', 'meja-3.png'])
+
+
+class OrderReportExportTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name='Nasi Goreng', description='', price=15000, category='makanan', stock=50)
+        for qty in (1, 2, 3):
+            order = place_order([{'id': self.product.id, 'qty': qty, 'price': 15000}], customer_name=f'Pelanggan {qty}')
+            Order.objects.filter(id=order.id).update(status='Completed')
+        self.kasir = CustomUser.objects.create_user('kasir', password='rahasia', role='kasir')
+        self.client.force_login(self.kasir)
+
+    def export(self, **params):
+        response = self.client.get('/kasir/order-report/export/', {
+            'status': 'Completed', 'period': 'day', 'date': timezone.localdate().isoformat(), **params,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        body = b''.join(response.streaming_content).decode('utf-8-sig')
+        return list(csv.reader(body.splitlines()))
+
+    def test_export_orders(self):
+        rows = self.export()
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(sorted(row[10] for row in rows[1:]), ['15000.00', '30000.00', '45000.00'])
+
+    def test_export_items(self):
+        rows = self.export(granularity='items')
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[1][5], 'Nasi Goreng')
+
+    def test_streamed_body_queries_are_counted(self):
+        metrics.store.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.export()
+        self.assertEqual(metrics.store.snapshot()['kasir_order_report_export']['max_queries'], len(queries))
+        self.assertEqual(connection.execute_wrappers, [metrics.count_query])
+
+    def test_unread_stream_releases_query_counter(self):
+        metrics.store.clear()
+        response = self.client.get('/kasir/order-report/export/', {'status': 'Completed'})
+        response.close()
+        self.assertEqual(connection.execute_wrappers, [metrics.count_query])
+        self.assertEqual(metrics.store.snapshot()['kasir_order_report_export']['count'], 1)
+
+    def test_formula_cells_are_escaped(self):
+        order = place_order([{'id': self.product.id, 'qty': 1, 'price': 15000}],
+                            customer_name='=HYPERLINK("http://x","klik")', notes='@SUM(A1)')
+        Order.objects.filter(id=order.id).update(status='Completed')
+        row = next(row for row in self.export() if row[0] == str(order.id))
+        self.assertEqual(row[2], '\'=HYPERLINK("http://x","klik")')
+        self.assertEqual(row[11], "'@SUM(A1)")
+        self.assertEqual(row[10], '15000.00')
+
+
+class OrderReportPaginationTests(TestCase):
+    def setUp(self):
+        product = Product.objects.create(name='Es Teh', description='', price=5000, category='minuman', stock=100)
+        self.orders = [
+            place_order([{'id': product.id, 'qty': 1, 'price': 5000}], customer_name=name, notes=notes)
+            for name, notes in [('Budi Santoso', ''), ('Siti', 'tanpa gula'), ('Andi', 'bungkus')] * 5
+        ]
+        # Beberapa order dengan waktu yang sama untuk menguji tie-breaker id
+        Order.objects.filter(id__in=[o.id for o in self.orders[:4]]).update(date_ordered=self.orders[0].date_ordered)
+        Order.objects.update(status='Completed')
+
+    def test_keyset_pages_cover_every_order_once(self):
+        seen, cursor = [], None
+        while True:
+            page, cursor = keyset_page(Order.objects.all(), cursor, size=4)
+            seen.extend(o.id for o in page)
+            if not cursor:
+                break
+        self.assertEqual(len(seen), len(self.orders))
+        self.assertEqual(set(seen), {o.id for o in self.orders})
+
+    def test_numeric_search_is_exact_id(self):
+        target = self.orders[10]
+        self.assertEqual(list(report_orders('Completed', search=f'#{target.id}')), [target])
+
+    def test_text_search_matches_prefix(self):
+        self.assertEqual(report_orders('Completed', search='sant').count(), 5)
+        self.assertEqual(report_orders('Completed', search='tanpa gu').count(), 5)
+        Order.objects.filter(id=self.orders[2].id).update(customer_name='Santi')
+        self.assertEqual(report_orders('Completed', search='sant').count(), 6)
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.nasi = Product.objects.create(name='Nasi Goreng Spesial', description='pedas', price=20000, category='Makanan', stock=5)
+        self.mie = Product.objects.create(name='Mie Ayam', description='pakai nasi? tidak', price=15000, category='Makanan', stock=5)
+        self.teh = Product.objects.create(name='Es Teh Manis', description='segar', price=5000, category='Minuman', stock=0)
+
+    def names(self, query):
+        return [p['name'] for p in search_products(query)]
+
+    def test_ranking_prefers_name_over_description(self):
+        self.assertEqual(self.names('nasi'), ['Nasi Goreng Spesial', 'Mie Ayam'])
+
+    def test_prefix_and_typo(self):
+        self.assertEqual(self.names('gor'), ['Nasi Goreng Spesial'])
+        self.assertEqual(self.names('teh mnis'), ['Es Teh Manis'])
+        self.assertEqual(self.names('xyz'), [])
+
+    def test_index_follows_catalog_changes(self):
+        self.mie.name = 'Mie Goreng'
+        self.mie.save()
+        self.assertEqual(set(self.names('goreng')), {'Nasi Goreng Spesial', 'Mie Goreng'})
+
+    def test_endpoint_filters_category_and_reports_stock(self):
+        self.client.force_login(CustomUser.objects.create_user('kasir', password='rahasia', role='kasir'))
+        data = self.client.get('/api/products/search/', {'q': 'es', 'category': 'Minuman'}).json()
+        self.assertEqual([(p['name'], p['stock']) for p in data['products']], [('Es Teh Manis', 0)])
+
+
+@skipUnless(connection.vendor == 'sqlite', 'PRAGMA khusus SQLite')
+class SQLitePragmaTests(SimpleTestCase):
+    databases = {'default'}
+
+    @override_settings(SQLITE_PRAGMAS={'busy_timeout': 4321, 'synchronous': 'NORMAL'})
+    def test_pragmas_applied_on_new_connection(self):
+        conn = connection.copy()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('PRAGMA busy_timeout')
+                self.assertEqual(cursor.fetchone()[0], 4321)
+                cursor.execute('PRAGMA synchronous')
+                self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+        finally:
+            conn.close()
+
+    def test_lock_wait_comes_from_connection_timeout(self):
+        from django.conf import settings
+        if settings.DATABASES['default'].get('OPTIONS', {}).get('timeout') is None:
+            self.skipTest('profil SQLite tanpa timeout')
+        self.assertNotIn('busy_timeout', settings.SQLITE_PRAGMAS)
+        conn = connection.copy()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('PRAGMA busy_timeout')
+                self.assertEqual(cursor.fetchone()[0], int(settings.DATABASES['default']['OPTIONS']['timeout'] * 1000))
+        finally:
+            conn.close()
+
+
+class ResolvePeriodTests(SimpleTestCase):
+    def test_resolve_period_is_half_open(self):
+        start, end = resolve_period('month', '2024-02')
+        self.assertEqual((start.date(), end.date()), (date(2024, 2, 1), date(2024, 3, 1)))
+        start, end = resolve_period('year', '2024')
+        self.assertEqual((start.date(), end.date()), (date(2024, 1, 1), date(2025, 1, 1)))
+        self.assertIsNone(resolve_period('day', ''))
+        with self.assertRaises(ValueError):
+            resolve_period('day', '2024-13-01')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN khusus SQLite')
+class QueryPlanTests(TestCase):
+    """Query yang sering dipanggil harus memakai index, bukan full table scan."""
+
+    def hot_queries(self):
+        now = timezone.now()
+        day = timezone.localdate()
+        month = resolve_period('month', day.strftime('%Y-%m'))
+        return {
+            'order_list': Order.objects.filter(status='Processing'),
+            'order_report': Order.objects.filter(
+                status='Completed', date_ordered__gte=month[0], date_ordered__lt=month[1],
+            ).order_by('-date_ordered'),
+            'paid_orders': Order.objects.filter(payment_status='Paid', status='Completed'),
+            'customer_history': Order.objects.filter(phone_number='08123', source='qr_scan').order_by('-date_ordered'),
+            'otp_throttle': ratelimit.recent_otp_sessions('08123', now - timedelta(minutes=10)),
+            'rollup_range': DailySalesRollup.objects.filter(date__gte=day - timedelta(days=6), date__lte=day),
+        }
+
+    def test_hot_queries_use_indexes(self):
+        for name, queryset in self.hot_queries().items():
+            with self.subTest(name):
+                plan = queryset.explain()
+                table = queryset.model._meta.db_table
+                self.assertIsNone(
+                    re.search(rf'\bSCAN {table}\b', plan),
+                    f'{name} melakukan full table scan:\n{plan}',
+                )
@@ -1,6 +1,5 @@
 # app/utils.py
-import requests
-from django.conf import settings
+from . import midtrans
 
 def create_midtrans_snap_token(order, customer_info, item_details):
     """
@@ -10,32 +9,9 @@ def create_midtrans_snap_token(order, customer_info, item_details):
     item_details: list of dict [{'id':..., 'price':..., ...}]
     Return: snap_token (str), error (None kalau sukses)
     """
-    # Server Key dari settings
-    server_key = getattr(settings, 'MIDTRANS_SERVER_KEY', 'YOUR_DEFAULT_KEY')
-    url = 'https://app.sandbox.midtrans.com/snap/v1/transactions'
-    
-    payload = {
-        "transaction_details": {
-            "order_id": str(order.id),
-            "gross_amount": int(order.total)
-        },
-        "customer_details": customer_info,
-        "item_details": item_details,
-        "enabled_payments": ["gopay", "bank_transfer", "qris", "shopeepay", "bca_klikbca"],
-    }
-    headers = {
-        "Accept": "application/json",
-        "Content-Type": "application/json"
-    }
+    payload = midtrans.build_snap_payload(order.id, item_details, customer_info)
+    payload['transaction_details']['gross_amount'] = int(order.total_price)
     try:
-        response = requests.post(
-            url,
-            json=payload,
-            headers=headers,
-            auth=(server_key, '')
-        )
-        response.raise_for_status()
-        snap_token = response.json().get("token")
-        return snap_token, None
-    except Exception as e:
+        return midtrans.create_snap_token(payload), None
+    except midtrans.MidtransError as e:
         return None, str(e)
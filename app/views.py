@@ -1,18 +1,29 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.core.paginator import Paginator
-from .models import Product, Order, OrderDetail, Payment
+from .models import Product, Order, Payment
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
 from .forms import CustomLoginForm
 from django.contrib.auth.decorators import login_required
 from .decorators import role_required 
+from .reports import dashboard_summary, income_total, resolve_period, report_orders, keyset_page
+from . import rollups, catalog, midtrans, exports, ratelimit, messaging, pricing, metrics
+from . import stock as stock_service
+from .events import hub as order_events_hub, order_event, streaming_supported
+from .orders import place_order, lock_order, summary_items, OrderError
+from .payments import handle_midtrans_notification
+from .search import search_products
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse, FileResponse
+from django.http import Http404, JsonResponse, FileResponse, HttpResponse, HttpResponseNotModified, HttpResponseForbidden, StreamingHttpResponse
+from django.utils.http import parse_etags
+import hmac
 import json
+import re
+from django.db import transaction
 from django.db.models import Sum, Count, F
 from django.utils import timezone
-from datetime import datetime, timedelta
-import requests
+from datetime import timedelta
+from decimal import Decimal
 import logging
 from .models import Table, CustomerOTPSession
 from django.views.decorators.http import require_POST
@@ -117,21 +128,21 @@ def delete_product(request, product_id):
 @login_required
 @role_required(allowed_roles=['kasir', 'owner'])
 def order_menu(request):
-    # Ambil semua produk dan kategori unik
-    products = Product.objects.all()
-    categories = Product.objects.values_list('category', flat=True).distinct()
-    from .models import Table
-    tables = Table.objects.all()
+    # Ambil semua produk, kategori unik dan meja dari cache menu
+    products = catalog.get_products()
+    categories = catalog.get_categories()
+    tables = catalog.get_tables()
 
     # Filter kategori
     selected_category = request.GET.get('category', 'all')
     if selected_category != 'all':
-        products = products.filter(category=selected_category)
+        products = [p for p in products if p['category'] == selected_category]
 
-    # Search produk
+    # Search produk (indeks trigram, urut relevansi)
     search_query = request.GET.get('search', '').strip()
     if search_query:
-        products = products.filter(name__icontains=search_query)
+        stocks = {p['id']: p['stock'] for p in products}
+        products = [{**p, 'stock': stocks[p['id']]} for p in search_products(search_query, limit=None) if p['id'] in stocks]
 
     # Pagination (9 per page)
     paginator = Paginator(products, 9)
@@ -151,6 +162,26 @@ def order_menu(request):
         'page_range': page_range,
     })
 
+@login_required
+@role_required(allowed_roles=['kasir', 'owner'])
+def api_product_search(request):
+    """Pencarian produk as-you-type untuk order_menu: ?q=...&category=...&limit=..."""
+    query = request.GET.get('q', '').strip()
+    category = request.GET.get('category', 'all')
+    try:
+        limit = min(int(request.GET.get('limit', 20)), 50)
+    except ValueError:
+        limit = 20
+    stocks = {p['id']: p['stock'] for p in catalog.get_products()}
+    results = []
+    for product in search_products(query, limit=None):
+        if category != 'all' and product['category'] != category:
+            continue
+        results.append({**product, 'stock': stocks.get(product['id'], 0)})
+        if len(results) >= limit:
+            break
+    return JsonResponse({'query': query, 'products': results})
+
 @csrf_exempt
 @login_required
 @role_required(allowed_roles=['kasir', 'owner'])
@@ -160,42 +191,26 @@ def create_order(request):
         cart = data.get('cart', [])
         customer_name = data.get('customer_name', '')
         table_id = data.get('table_id')
-        # Pastikan cart tidak kosong
-        if not cart:
-            return JsonResponse({'success': False, 'error': 'Cart is empty'}, status=400)
-        total = 0
-        for item in cart:
-            product = Product.objects.filter(id=item['id']).first()
-            if not product:
-                return JsonResponse({'success': False, 'error': f"Product with ID {item['id']} not found"}, status=400)
-            total += float(item['price']) * int(item['qty'])
         table_obj = None
         if table_id:
-            from .models import Table
             try:
                 table_obj = Table.objects.get(id=table_id)
             except Table.DoesNotExist:
                 return JsonResponse({'success': False, 'error': 'Table not found'}, status=400)
-        order = Order.objects.create(
-            user=request.user,
-            kasir=request.user,
-            total_price=total,
-            status='Processing',
-            table=table_obj,
-            customer_name=customer_name,
-            source='manual',
-            payment_status='Pending',  # Ganti dari 'Unpaid' ke 'Pending'
-        )
-        for item in cart:
-            product = Product.objects.get(id=item['id'])
-            OrderDetail.objects.create(
-                order=order,
-                product=product,
-                quantity=int(item['qty']),
-                price=float(item['price']),
+        try:
+            order = place_order(
+                cart,
+                user=request.user,
+                kasir=request.user,
+                status='Processing',
+                table=table_obj,
+                customer_name=customer_name,
+                source='manual',
+                payment_status='Pending',  # Ganti dari 'Unpaid' ke 'Pending'
             )
-            product.stock = max(0, product.stock - int(item['qty']))
-            product.save()
+        except OrderError as e:
+            return JsonResponse({'success': False, 'error': str(e), 'shortages': e.shortages}, status=409 if e.shortages else 400)
+        order_event('order_created', order)
         return JsonResponse({'success': True, 'order_id': order.id, 'redirect_url': f'/checkout/{order.id}/'})
     return JsonResponse({'success': False, 'error': 'Invalid request'}, status=400)
 
@@ -233,7 +248,24 @@ def order_list(request):
         except Order.DoesNotExist:
             return JsonResponse({'error': 'Order not found'}, status=404)
     orders = Order.objects.filter(status='Processing').select_related('table', 'kasir').prefetch_related('order_details__product')
-    return render(request, 'order_list.html', {'orders': orders})
+    return render(request, 'order_list.html', {'orders': orders, 'live_updates': streaming_supported(request)})
+
+
+async def order_list_events(request):
+    """
+    Server-Sent Events untuk order_list: order_created, order_paid, order_completed, order_cancelled.
+    Async view, hanya bisa streaming kalau dijalankan lewat ASGI (pos_wk/asgi.py).
+    """
+    user = await request.auser()
+    if not user.is_authenticated or user.role not in ['kasir', 'owner']:
+        return HttpResponseForbidden("You do not have permission to access this page.")
+    if not streaming_supported(request):
+        # 204: EventSource berhenti dan tidak reconnect; halaman memakai reload biasa
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(order_events_hub.stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Supaya nginx tidak buffer stream
+    return response
 
 
 @csrf_exempt
@@ -244,84 +276,100 @@ def complete_order(request):
         data = json.loads(request.body)
         order_id = data.get('order_id')
         try:
-            order = Order.objects.get(id=order_id)
-            order.status = 'Completed'
-            order.kasir = request.user
-            order.save()
+            with transaction.atomic():
+                order = lock_order(order_id)
+                before = rollups.order_state(order)
+                order.status = 'Completed'
+                order.kasir = request.user
+                order.save()
+                rollups.apply_order_change(order, before)
+                order_event('order_completed', order)
             return JsonResponse({'success': True})
         except Order.DoesNotExist:
             return JsonResponse({'success': False, 'error': 'Order not found'})
     return JsonResponse({'success': False, 'error': 'Invalid request'})
 
+@login_required
+@role_required(allowed_roles=['owner'])
+def owner_metrics(request):
+    """Statistik per view (rolling window, per proses) dari InstrumentationMiddleware."""
+    return JsonResponse({
+        'window_seconds': metrics.store.window,
+        'budgets': getattr(settings, 'QUERY_BUDGETS', {}),
+        'views': metrics.store.snapshot(),
+    })
+
 @login_required
 @role_required(allowed_roles=['kasir', 'owner'])
 def kasir_dashboard(request):
-    today = timezone.now().date()
-    month = today.month
-    year = today.year
-    # Pendapatan per hari (7 hari terakhir)
-    days = [(today - timedelta(days=i)) for i in range(6, -1, -1)]
-    daily_income = []
-    for d in days:
-        total = Order.objects.filter(status='Completed', date_ordered__date=d).aggregate(total=Sum('total_price'))['total'] or 0
-        daily_income.append({'date': d.strftime('%d-%m'), 'total': float(total)})
-    # Pendapatan per bulan (12 bulan terakhir)
-    monthly_income = []
-    for m in range(1, 13):
-        total = Order.objects.filter(status='Completed', date_ordered__year=year, date_ordered__month=m).aggregate(total=Sum('total_price'))['total'] or 0
-        monthly_income.append({'month': m, 'total': float(total)})
-    # Pendapatan per tahun (5 tahun terakhir)
-    years = [year - i for i in range(4, -1, -1)]
-    yearly_income = []
-    for y in years:
-        total = Order.objects.filter(status='Completed', date_ordered__year=y).aggregate(total=Sum('total_price'))['total'] or 0
-        yearly_income.append({'year': y, 'total': float(total)})
-    # Transaksi per metode pembayaran
-    cash = Order.objects.filter(status='Completed', payment_status='Paid').count()
-    midtrans = Payment.objects.filter(order__status='Completed', payment_method='Midtrans', payment_status='Paid').count()
-    # Ranking produk terlaris
-    product_ranking = OrderDetail.objects.filter(order__status='Completed').values('product__name').annotate(total=Sum('quantity')).order_by('-total')[:10]
-    context = {
-        'daily_income': daily_income,
-        'monthly_income': monthly_income,
-        'yearly_income': yearly_income,
-        'cash_count': cash,
-        'midtrans_count': midtrans,
-        'product_ranking': product_ranking,
-    }
+    context = dashboard_summary()
     return render(request, 'kasir_dashboard.html', context)
 
-@login_required
-@role_required(allowed_roles=['kasir', 'owner'])
-def kasir_order_report(request):
-    # Filter
+def _report_filters(request):
+    # Filter laporan dari query string, dipakai kasir_order_report dan export-nya
     status = request.GET.get('status', 'Completed')
     period = request.GET.get('period', 'day')
     date_str = request.GET.get('date')
     search = request.GET.get('search', '')
-    orders = Order.objects.filter(status=status)
-    if date_str:
-        if period == 'day':
-            orders = orders.filter(date_ordered__date=datetime.strptime(date_str, '%Y-%m-%d').date())
-        elif period == 'month':
-            dt = datetime.strptime(date_str, '%Y-%m')
-            orders = orders.filter(date_ordered__year=dt.year, date_ordered__month=dt.month)
-        elif period == 'year':
-            dt = datetime.strptime(date_str, '%Y')
-            orders = orders.filter(date_ordered__year=dt.year)
-    if search:
-        orders = orders.filter(notes__icontains=search) | orders.filter(id__icontains=search)
-    orders = orders.select_related('table', 'kasir').prefetch_related('order_details__product').order_by('-date_ordered')
-    total_income = orders.aggregate(total=Sum('total_price'))['total'] or 0
+    try:
+        date_range = resolve_period(period, date_str)
+    except ValueError:
+        messages.error(request, "Format tanggal tidak sesuai periode.")
+        date_range = None
+    return status, period, date_str, search, date_range
+
+@login_required
+@role_required(allowed_roles=['kasir', 'owner'])
+def kasir_order_report(request):
+    status, period, date_str, search, date_range = _report_filters(request)
+    orders = report_orders(status, date_range, search)
+    if status == 'Completed' and date_range and not search:
+        # Ambil dari rollup harian, tidak perlu SUM semua order di periode ini
+        total_income = income_total(*date_range)
+    else:
+        total_income = orders.aggregate(total=Sum('total_price'))['total'] or 0
+    cursor = request.GET.get('after')
+    try:
+        page, next_cursor = keyset_page(orders.select_related('table', 'kasir'), cursor)
+    except ValueError:
+        page, next_cursor = keyset_page(orders.select_related('table', 'kasir'))
+        cursor = None
+    first_page_query = request.GET.copy()
+    first_page_query.pop('after', None)
+    next_page_query = first_page_query.copy()
+    if next_cursor:
+        next_page_query['after'] = next_cursor
     return render(request, 'kasir_order_report.html', {
-        'orders': orders,
+        'orders': page,
+        'is_first_page': not cursor,
+        'next_cursor': next_cursor,
+        'first_page_query': first_page_query.urlencode(),
+        'next_page_query': next_page_query.urlencode(),
         'total_income': total_income,
         'status': status,
         'period': period,
         'date_str': date_str or '',
         'search': search,
+        'export_query': first_page_query.urlencode(),
     })
 
+@login_required
+@role_required(allowed_roles=['kasir', 'owner'])
+def kasir_order_report_export(request):
+    """
+    Export laporan ke CSV dengan filter yang sama seperti kasir_order_report.
+    ?granularity=items untuk satu baris per item order.
+    Baris di-stream langsung dari DB, jadi memori tetap kecil walau periodenya setahun.
+    """
+    status, period, date_str, search, date_range = _report_filters(request)
+    orders = report_orders(status, date_range, search)
+    granularity = request.GET.get('granularity', 'orders')
+    rows = exports.order_item_rows(orders) if granularity == 'items' else exports.order_rows(orders)
+    filename = f"laporan-{status.lower()}-{date_str or 'semua'}{'-item' if granularity == 'items' else ''}.csv"
+    response = StreamingHttpResponse(exports.stream_csv(rows), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
 @login_required
 @role_required(allowed_roles=['kasir', 'owner'])
 def checkout(request, order_id):
@@ -330,8 +378,6 @@ def checkout(request, order_id):
 
 @csrf_exempt
 def midtrans_webhook(request):
-    import json
-    from django.http import JsonResponse
     logger = logging.getLogger(__name__)
     if request.method != "POST":
         return JsonResponse({"status": "error", "message": "Invalid request method"}, status=400)
@@ -348,31 +394,11 @@ def midtrans_webhook(request):
         logger.error("No order_id in webhook data")
         return JsonResponse({"status": "error", "message": "No order_id"}, status=400)
     try:
-        order = Order.objects.get(id=order_id)
-        if transaction_status in ["settlement", "capture"]:
-            order.payment_status = "Paid"
-            order.save()
-            # Update Payment record if exists
-            payment, created = Payment.objects.get_or_create(order=order)
-            payment.payment_method = 'Midtrans'
-            payment.payment_status = 'Paid'
-            payment.amount_paid = order.total_price
-            payment.save()
-            logger.info(f"Order {order_id} updated to Paid (Processing).")
-        elif transaction_status in ["cancel", "expire"]:
-            order.payment_status = "Cancelled"
-            order.status = "Cancelled"
-            order.save()
-            payment, created = Payment.objects.get_or_create(order=order)
-            payment.payment_method = 'Midtrans'
-            payment.payment_status = 'Cancelled'
-            payment.amount_paid = 0
-            payment.save()
-            logger.info(f"Order {order_id} updated to Cancelled.")
-        else:
-            logger.info(f"Order {order_id} received transaction_status: {transaction_status}")
-        return JsonResponse({"status": "ok"})
-    except Order.DoesNotExist:
+        result = handle_midtrans_notification(data)
+        if result == 'duplicate':
+            logger.info(f"Duplicate notification for order {order_id} ({transaction_status}) ignored.")
+        return JsonResponse({"status": "ok", "result": result})
+    except (Order.DoesNotExist, ValueError):
         logger.error(f"Order {order_id} not found.")
         return JsonResponse({"status": "not found"}, status=404)
     except Exception as e:
@@ -382,46 +408,22 @@ def midtrans_webhook(request):
 @login_required
 @role_required(allowed_roles=['kasir', 'owner'])
 def get_midtrans_token(request, order_id):
-    order = Order.objects.get(id=order_id)
-    url = 'https://app.sandbox.midtrans.com/snap/v1/transactions'
-    server_key = 'SB-Mid-server-kq9bJK9lOejbQFONtGzpVySZ'
-    import base64, json, requests
-    encoded = base64.b64encode(f"{server_key}:".encode()).decode()
-    headers = {
-        'Accept': 'application/json',
-        'Content-Type': 'application/json',
-        'Authorization': f'Basic {encoded}'
-    }
-    items = [
-        {
-            'id': d.product.id,
-            'price': int(d.price),
-            'quantity': d.quantity,
-            'name': d.product.name
-        } for d in order.order_details.all()
-    ]
-    gross_amount = sum(item['price'] * item['quantity'] for item in items)
-    payload = {
-        'transaction_details': {
-            'order_id': str(order.id),
-            'gross_amount': gross_amount
-        },
-        'item_details': items,
-        'customer_details': {
+    order = Order.objects.select_related('table').get(id=order_id)
+    if order.payment_status != 'Pending' or order.status in ['Completed', 'Cancelled']:
+        return JsonResponse({'token': None, 'error': 'Order sudah dibayar atau dibatalkan.'}, status=400)
+
+    def build_payload():
+        return midtrans.build_snap_payload(order.id, pricing.snap_items(order), {
             'first_name': order.notes or 'Customer',
             'table': order.table.table_number if order.table else 'Takeaway',
-        },
-        'enabled_payments': ['gopay', 'qris', 'bank_transfer', 'echannel', 'bca_klikbca', 'bca_klikpay', 'bri_epay', 'cimb_clicks', 'danamon_online', 'indomaret', 'alfamart', 'akulaku'],
-    }
-    response = requests.post(url, headers=headers, data=json.dumps(payload))
+        })
+
     try:
-        snap_token = response.json().get('token')
-    except Exception:
-        snap_token = None
-    if not snap_token:
-        print('MIDTRANS ERROR:', response.text)
+        snap_token = midtrans.get_snap_token(order, build_payload)
+    except midtrans.MidtransError as e:
+        logging.getLogger(__name__).error(f"Midtrans error for order {order.id}: {e}")
         # Return error message to frontend
-        return JsonResponse({'token': None, 'error': response.text}, status=400)
+        return JsonResponse({'token': None, 'error': str(e)}, status=400)
     return JsonResponse({'token': snap_token})
 
 def kasir_owner_logout(request):
@@ -434,15 +436,22 @@ def kasir_owner_logout(request):
 def pay_cash(request, order_id):
     if request.method == 'POST':
         try:
-            order = Order.objects.get(id=order_id)
-            if order.status not in ['Completed', 'Cancelled']:
+            with transaction.atomic():
+                order = lock_order(order_id)
+                if order.status in ['Completed', 'Cancelled']:
+                    return JsonResponse({'success': False, 'message': 'Order sudah selesai atau dibatalkan.'})
+                if order.payment_status == 'Paid':
+                    # Tombol bayar ditekan dua kali: request kedua menunggu lock lalu berhenti di sini
+                    return JsonResponse({'success': False, 'message': 'Order sudah dibayar.'})
+                before = rollups.order_state(order)
                 order.payment_status = 'Paid'
                 order.status = 'Processing'  # Set to Processing for cash
                 order.save()
                 Payment.objects.create(order=order, payment_method='Cash', payment_status='Paid', amount=order.total_price)
-                return JsonResponse({'success': True, 'message': 'Order telah dibayar.'})
-            else:
-                return JsonResponse({'success': False, 'message': 'Order sudah selesai atau dibatalkan.'})
+                stock_service.commit(order)  # stok yang ditahan (order QR) jadi permanen
+                rollups.apply_order_change(order, before)
+                order_event('order_paid', order)
+            return JsonResponse({'success': True, 'message': 'Order telah dibayar.'})
         except Order.DoesNotExist:
             return JsonResponse({'success': False, 'message': 'Order tidak ditemukan.'})
     return JsonResponse({'success': False, 'message': 'Invalid request.'})
@@ -451,9 +460,15 @@ def pay_cash(request, order_id):
 @login_required
 @role_required(allowed_roles=['kasir', 'owner'])
 def confirm_cash_payment(request, order_id):
-    order = get_object_or_404(Order, id=order_id)
-    # Hanya boleh confirm cash jika order dari customer dan belum paid
-    if not order.kasir and order.payment_status.lower() != 'paid':
+    with transaction.atomic():
+        try:
+            order = lock_order(order_id)
+        except Order.DoesNotExist:
+            raise Http404('Order not found')
+        # Hanya boleh confirm cash jika order dari customer dan belum paid
+        if order.kasir or order.payment_status.lower() == 'paid':
+            return JsonResponse({'success': False}, status=400)
+        before = rollups.order_state(order)
         order.payment_status = 'Paid'
         order.kasir = request.user
         order.save()
@@ -471,9 +486,10 @@ def confirm_cash_payment(request, order_id):
             payment.payment_status = 'Paid'
             payment.amount = order.total_price
             payment.save()
-
-        return JsonResponse({'success': True})
-    return JsonResponse({'success': False}, status=400)
+        stock_service.commit(order)  # stok yang ditahan (order QR) jadi permanen
+        rollups.apply_order_change(order, before)
+        order_event('order_paid', order)
+    return JsonResponse({'success': True})
 
 @login_required
 @role_required(allowed_roles=['owner', 'kasir'])
@@ -496,15 +512,21 @@ def customer_login(request):
         phone = request.POST.get('phone', '').strip()
         if not name or not phone:
             return render(request, 'customer_login.html', {'error': 'Nama dan nomor WhatsApp wajib diisi.'})
-        # Batasi OTP per nomor (misal 3x/10 menit)
-        recent_otp_count = CustomerOTPSession.objects.filter(phone_number=phone, created_at__gte=timezone.now()-timedelta(minutes=10)).count()
-        if recent_otp_count >= 3:
-            return render(request, 'customer_login.html', {'error': 'Terlalu banyak permintaan OTP. Coba lagi nanti.'})
+        # Batasi OTP per IP dan per nomor (lihat RATE_LIMITS di settings)
+        allowed, retry_after = ratelimit.hit('otp_send_ip', ratelimit.client_ip(request))
+        if allowed:
+            allowed, retry_after = ratelimit.hit_phone_otp(phone)
+        if not allowed:
+            return render(request, 'customer_login.html', {
+                'error': f'Terlalu banyak permintaan OTP. Coba lagi dalam {retry_after // 60 + 1} menit.',
+            }, status=429)
         otp = f"{random.randint(100000, 999999)}"
         expires = timezone.now() + timedelta(minutes=5)
         session = CustomerOTPSession.objects.create(phone_number=phone, otp_code=otp, expires_at=expires)
-        # Kirim OTP via WhatsApp (dummy print, ganti dengan Twilio/Meta API)
-        print(f"OTP untuk {phone}: {otp}")
+        # Dikirim worker send_messages (app/messaging.py), request tidak menunggu Twilio
+        messaging.enqueue_whatsapp(
+            phone, f"Kode OTP Anda: {otp}. Berlaku 5 menit. Jangan berikan kode ini ke siapa pun.", expires_at=expires,
+        )
         request.session['otp_session_token'] = str(session.session_token)
         request.session['customer_name'] = name
         request.session['customer_phone'] = phone
@@ -520,34 +542,66 @@ def customer_otp_verify(request):
     if not session or session.is_expired():
         return render(request, 'customer_otp_verify.html', {'error': 'OTP sudah kedaluwarsa. Silakan login ulang.'})
     if request.method == 'POST':
-        otp_input = request.POST.get('otp')
-        if otp_input == session.otp_code:
+        allowed, retry_after = ratelimit.hit('otp_verify_ip', ratelimit.client_ip(request))
+        if not allowed:
+            return render(request, 'customer_otp_verify.html', {
+                'error': f'Terlalu banyak percobaan. Coba lagi dalam {retry_after // 60 + 1} menit.',
+            }, status=429)
+        otp_input = request.POST.get('otp') or ''
+        if not ratelimit.is_limited('otp_wrong', token) and hmac.compare_digest(otp_input, session.otp_code):
             session.is_verified = True
             session.save()
+            ratelimit.reset('otp_wrong', token)
             request.session['is_customer_verified'] = True
             return redirect('customer_order')
-        else:
-            return render(request, 'customer_otp_verify.html', {'error': 'OTP salah. Coba lagi.'})
+        allowed, _ = ratelimit.hit('otp_wrong', token)
+        if not allowed:
+            # Terlalu sering salah: OTP ini tidak bisa dipakai lagi, harus minta OTP baru
+            CustomerOTPSession.objects.filter(id=session.id).update(expires_at=timezone.now())
+            request.session.pop('otp_session_token', None)
+            return render(request, 'customer_otp_verify.html', {
+                'error': 'Terlalu banyak OTP salah. Silakan login ulang.',
+            }, status=429)
+        return render(request, 'customer_otp_verify.html', {'error': 'OTP salah. Coba lagi.'})
     return render(request, 'customer_otp_verify.html')
 
-from django.views.decorators.http import require_GET
 @require_GET
 def customer_order(request):
     # Hanya bisa akses jika sudah login dan OTP
     if not request.session.get('is_customer_verified'):
         return redirect('customer_login')
-    from .models import Table, Product
-    tables = Table.objects.all()
-    products = Product.objects.all()
+    # Daftar produk diambil browser lewat /api/menu/ (lihat api_menu)
+    tables = catalog.get_tables()
     customer_name = request.session.get('customer_name', '')
     customer_phone = request.session.get('customer_phone', '')
     return render(request, 'customer_order.html', {
-        'products': products,
         'tables': tables,
         'customer_name': customer_name,
         'customer_phone': customer_phone,
     })
 
+@require_GET
+def api_menu(request):
+    """
+    Menu dalam JSON ringkas untuk HP pelanggan.
+    ETag kuat (beda untuk versi gzip dan non-gzip); kalau If-None-Match cocok balas 304 tanpa body.
+    """
+    products = catalog.get_products()
+    etag = catalog.menu_etag(products)
+    compressed = bool(re.search(r'\bgzip\b', request.headers.get('Accept-Encoding', '')))
+    tag = f'"{etag}-gzip"' if compressed else f'"{etag}"'
+    if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+    if '*' in if_none_match or any(t.removeprefix('W/') == tag for t in if_none_match):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(catalog.menu_json(products, etag, compressed), content_type='application/json')
+        if compressed:
+            response['Content-Encoding'] = 'gzip'
+    response['ETag'] = tag
+    response['Vary'] = 'Accept-Encoding'
+    response['Cache-Control'] = 'no-cache'
+    return response
+
 @csrf_exempt
 def customer_update_name(request):
     if not request.session.get('is_customer_verified'):
@@ -574,7 +628,7 @@ def customer_order_checkout(request):
         return JsonResponse({'success': False, 'error': 'Belum login.'}, status=403)
     if request.method == 'POST':
         import json
-        from .models import Table, Order, OrderDetail
+        from .models import Table, Order
         data = json.loads(request.body)
         cart = data.get('cart', [])
         customer_name = request.session.get('customer_name', 'Pelanggan QR')
@@ -585,72 +639,45 @@ def customer_order_checkout(request):
         table = None
         if not takeaway and meja_number:
             table = Table.objects.filter(table_number=meja_number).first()
-        # Buat order
-        order = Order.objects.create(
-            table=table,
-            total_price=sum(int(item['price']) * int(item['qty']) for item in cart),
-            status='Processing',
-            payment_status='Pending',
-            source='qr_scan',
-            notes='',
-            phone_number=customer_phone,
-            payment_method=payment_method,
-            customer_name=customer_name,  # Simpan nama customer
-        )
-        for item in cart:
-            OrderDetail.objects.create(
-                order=order,
-                product_id=item['id'],
-                quantity=item['qty'],
-                price=item['price'],
+        # Buat order; untuk Midtrans stok ditahan sampai pembayaran selesai/batal
+        try:
+            order = place_order(
+                cart,
+                hold=payment_method != 'cash',
+                table=table,
+                status='Processing',
+                payment_status='Pending',
+                source='qr_scan',
+                notes='',
+                phone_number=customer_phone,
+                payment_method=payment_method,
+                customer_name=customer_name,  # Simpan nama customer
             )
+        except OrderError as e:
+            return JsonResponse({'success': False, 'error': str(e), 'shortages': e.shortages}, status=409 if e.shortages else 400)
+        order_event('order_created', order)
         # Payment
         if payment_method == 'cash':
             return JsonResponse({'success': True, 'order_id': order.id})
-        # Midtrans Snap: gunakan logika yang sudah ada (copy dari get_midtrans_token)
-        import requests, base64
-        import json as pyjson
-        url = 'https://app.sandbox.midtrans.com/snap/v1/transactions'
-        server_key = 'SB-Mid-server-kq9bJK9lOejbQFONtGzpVySZ'
-        encoded = base64.b64encode(f"{server_key}:".encode()).decode()
-        headers = {
-            'Accept': 'application/json',
-            'Content-Type': 'application/json',
-            'Authorization': f'Basic {encoded}'
-        }
-        items = [
-            {
-                'id': d['id'],
-                'price': int(d['price']),
-                'quantity': int(d['qty']),
-                'name': d['name'] if 'name' in d else 'Produk'
-            } for d in cart
-        ]
-        gross_amount = sum(item['price'] * item['quantity'] for item in items)
-        payload = {
-            'transaction_details': {
-                'order_id': str(order.id),
-                'gross_amount': gross_amount
-            },
-            'item_details': items,
-            'customer_details': {
-                'first_name': customer_name or 'Customer',
-                'phone': customer_phone,
-                'table': table.table_number if table else 'Takeaway',
-            },
-            'enabled_payments': [
-                'gopay', 'qris', 'bank_transfer', 'echannel', 'bca_klikbca',
-                'bca_klikpay', 'bri_epay', 'cimb_clicks', 'danamon_online',
-                'indomaret', 'alfamart', 'akulaku'
-            ],
-        }
-        response = requests.post(url, headers=headers, data=pyjson.dumps(payload))
+        # Midtrans Snap: item_details dari harga server yang tersimpan di OrderDetail
+        payload = midtrans.build_snap_payload(order.id, pricing.snap_items(order), {
+            'first_name': customer_name or 'Customer',
+            'phone': customer_phone,
+            'table': table.table_number if table else 'Takeaway',
+        })
         try:
-            snap_token = response.json().get('token')
-        except Exception:
-            snap_token = None
+            snap_token = midtrans.get_snap_token(order, lambda: payload)
+            error = None
+        except midtrans.MidtransError as e:
+            snap_token, error = None, str(e)
         if not snap_token:
-            return JsonResponse({'success': False, 'error': response.text}, status=400)
+            # Transaksi Midtrans gagal dibuat: batalkan order dan lepas stok yang ditahan
+            stock_service.release(order)
+            order.status = 'Cancelled'
+            order.payment_status = 'Cancelled'
+            order.save()
+            order_event('order_cancelled', order)
+            return JsonResponse({'success': False, 'error': error}, status=400)
         return JsonResponse({'success': True, 'order_id': order.id, 'snap_token': snap_token})
     return JsonResponse({'success': False, 'error': 'Invalid request'}, status=400)
 
@@ -661,34 +688,33 @@ def customer_order_success(request, order_id):
         return render(request, 'customer_order_error.html', {'error': 'Order tidak ditemukan.'})
     return render(request, 'customer_order_success.html', {'order': order})
 
-from django.views.decorators.http import require_GET
 @require_GET
 def customer_checkout(request):
     # Hanya bisa akses jika sudah login dan OTP
     if not request.session.get('is_customer_verified'):
         return redirect('customer_login')
-    from .models import Table
-    tables = Table.objects.all()
+    tables = catalog.get_tables()
     return render(request, 'customer_checkout.html', {'tables': tables})
 
-from django.views.decorators.http import require_GET
 
 @require_GET
 def customer_order_history(request):
     # Hanya bisa akses jika sudah login dan OTP
     if not request.session.get('is_customer_verified'):
         return JsonResponse({'orders': []})
-    from .models import Order
     customer_phone = request.session.get('customer_phone', '')
-    orders = Order.objects.filter(phone_number=customer_phone, source='qr_scan').order_by('-date_ordered')
+    # 1 query lewat index (phone_number, source, date_ordered), tanpa membuat instance model
+    orders = Order.objects.filter(phone_number=customer_phone, source='qr_scan').order_by('-date_ordered').values_list(
+        'id', 'status', 'date_ordered', 'total_price',
+    )
     data = [
         {
-            'id': o.id,
-            'status': o.status,
-            'created_at': o.date_ordered.strftime('%d %b %Y %H:%M'),
-            'total_price': int(o.total_price),
+            'id': order_id,
+            'status': status,
+            'created_at': timezone.localtime(date_ordered).strftime('%d %b %Y %H:%M'),
+            'total_price': int(total_price),
         }
-        for o in orders
+        for order_id, status, date_ordered, total_price in orders
     ]
     return JsonResponse({'orders': data})
 
@@ -697,24 +723,26 @@ def customer_order_history_detail(request, order_id):
     # Hanya bisa akses jika sudah login dan OTP
     if not request.session.get('is_customer_verified'):
         return JsonResponse({'order': None})
-    from .models import Order, OrderDetail
     customer_phone = request.session.get('customer_phone', '')
     try:
-        order = Order.objects.get(id=order_id, phone_number=customer_phone, source='qr_scan')
+        order = Order.objects.only('id', 'status', 'date_ordered', 'total_price', 'summary').get(
+            id=order_id, phone_number=customer_phone, source='qr_scan',
+        )
     except Order.DoesNotExist:
         return JsonResponse({'order': None})
+    # Item dari ringkasan yang disimpan saat order dibuat (tanpa query OrderDetail/Product)
     items = [
         {
-            'name': d.product.name,
-            'qty': d.quantity,
-            'price': int(d.price),
+            'name': item['name'],
+            'qty': item['qty'],
+            'price': int(Decimal(item['price'])),
         }
-        for d in order.order_details.all()
+        for item in summary_items(order)
     ]
     data = {
         'id': order.id,
         'status': order.status,
-        'created_at': order.date_ordered.strftime('%d %b %Y %H:%M'),
+        'created_at': timezone.localtime(order.date_ordered).strftime('%d %b %Y %H:%M'),
         'total_price': int(order.total_price),
         'items': items,
     }
@@ -3,6 +3,10 @@ ASGI config for pos_wk project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Live order queue (/order-list/events/, Server-Sent Events) needs this
+entry point, e.g. `uvicorn pos_wk.asgi:application`. The event hub lives in
+process memory, so run a single worker process (or one per kasir screen group).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -49,6 +50,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'app.middleware.InstrumentationMiddleware',
 ]
 
 ROOT_URLCONF = 'pos_wk.urls'
@@ -74,12 +76,89 @@ WSGI_APPLICATION = 'pos_wk.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE=sqlite (default) atau postgres.
+# PostgreSQL memakai connection pool bawaan Django 5 (butuh: pip install "psycopg[binary,pool]"),
+# cocok untuk beberapa worker gunicorn sekaligus. Konfigurasi lewat env POSTGRES_*/DB_POOL_*.
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+# SQLITE_PROFILE=production (default): WAL, busy_timeout, koneksi dipakai ulang dan
+# transaksi BEGIN IMMEDIATE supaya webhook dan kasir yang menulis bersamaan saling
+# menunggu, bukan gagal "database is locked". SQLITE_PROFILE=default untuk setelan
+# bawaan Django (misal untuk membandingkan dengan manage.py sqlite_lock_bench).
+SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'production')
+SQLITE_PRAGMAS = {}
+
+if DB_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'pos_wk'),
+            'USER': os.environ.get('POSTGRES_USER', 'pos_wk'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            # Pool menggantikan CONN_MAX_AGE (harus 0 kalau pool aktif)
+            'CONN_MAX_AGE': 0,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('DB_POOL_MIN', 2)),
+                    'max_size': int(os.environ.get('DB_POOL_MAX', 10)),
+                    'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+                },
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+    if SQLITE_PROFILE == 'production':
+        DATABASES['default'].update({
+            'CONN_MAX_AGE': int(os.environ.get('CONN_MAX_AGE', 600)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'transaction_mode': 'IMMEDIATE',
+                # Satu-satunya sumber waktu tunggu lock: sqlite3 memasangnya sebagai busy_timeout.
+                # Jangan tambahkan PRAGMA busy_timeout di bawah, karena akan menimpa nilai ini.
+                'timeout': float(os.environ.get('SQLITE_TIMEOUT', 20)),  # detik
+            },
+        })
+        # Dipasang di setiap koneksi baru lewat signal connection_created (app/db.py)
+        SQLITE_PRAGMAS = {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'cache_size': -20000,  # KiB (negatif = ukuran, bukan jumlah halaman)
+            'mmap_size': 128 * 1024 * 1024,
+            'temp_store': 'MEMORY',
+            'foreign_keys': 'ON',
+        }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Default locmem (per proses). Set CACHE_BACKEND=file supaya cache dipakai bersama
+# oleh semua worker (invalidasi menu ikut ke semua proses).
+
+if os.environ.get('CACHE_BACKEND') == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'pos-wk',
+        }
     }
-}
+
+# Lama cache menu (detik); versi cache tetap naik setiap Product/Table berubah
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
 
 
 # Password validation
@@ -136,8 +215,105 @@ CSRF_TRUSTED_ORIGINS = [
     'https://*.ngrok.io',
 ]
 
+# Rate limit login pelanggan (app/ratelimit.py): nama -> (jumlah, detik)
+RATE_LIMITS = {
+    'otp_send_phone': (3, 10 * 60),
+    'otp_send_ip': (10, 10 * 60),
+    'otp_verify_ip': (20, 10 * 60),
+    'otp_wrong': (5, 5 * 60),
+}
+# Aktifkan kalau di belakang reverse proxy/ngrok supaya IP diambil dari X-Forwarded-For
+RATE_LIMIT_TRUST_FORWARDED = os.environ.get('RATE_LIMIT_TRUST_FORWARDED') == '1'
+
+# Instrumentasi per view (app/middleware.py, lihat /owner/metrics/)
+TESTING = sys.argv[1:2] == ['test']
+METRICS_WINDOW_SECONDS = 5 * 60
+# Batas jumlah query per view (url name). Dilanggar: log warning, atau error saat test.
+# Savepoint/transaksi ikut dihitung. create_order/checkout naik sesuai jumlah produk di
+# cart (1 UPDATE stok bersyarat per produk), sisanya harus konstan.
+QUERY_BUDGETS = {
+    'order_menu': 8,
+    'create_order': 30,
+    'order_list': 8,
+    'complete_order': 25,
+    'pay_cash': 15,
+    'confirm_cash_payment': 20,
+    'checkout': 8,
+    'get_midtrans_token': 8,
+    'midtrans_webhook': 25,
+    'kasir_dashboard': 8,
+    'kasir_order_report': 8,
+    'kasir_order_report_export': 4,
+    'customer_login': 5,
+    'customer_otp_verify': 5,
+    'customer_order_checkout': 35,
+    'customer_order_history': 4,
+    'customer_order_history_detail': 5,
+    'api_menu': 3,
+    'api_product_search': 6,
+}
+QUERY_BUDGET_RAISE = TESTING
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'app.metrics': {
+            'handlers': ['console'],
+            'level': os.environ.get('METRICS_LOG_LEVEL', 'WARNING' if TESTING else 'INFO'),
+            'propagate': False,
+        },
+        # FakeTwilioTransport menulis isi pesan (termasuk kode OTP) ke sini; tanpa handler
+        # ini OTP tidak terlihat di mana pun saat development
+        'app.messaging': {
+            'handlers': ['console'],
+            'level': os.environ.get('MESSAGING_LOG_LEVEL', 'WARNING' if TESTING else 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 # Twilio WhatsApp Integration
 TWILIO_ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID', 'YOUR_TWILIO_ACCOUNT_SID')
 TWILIO_AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN', 'YOUR_TWILIO_AUTH_TOKEN')
 TWILIO_WHATSAPP_FROM = os.environ.get('TWILIO_WHATSAPP_FROM', 'YOUR_TWILIO_WHATSAPP_SANDBOX_NUMBER')
 # Contoh: TWILIO_WHATSAPP_FROM = '+14155238886' (Twilio Sandbox)
+
+# Antrian pesan keluar (app/messaging.py, worker: python manage.py send_messages).
+# Tanpa kredensial Twilio di env, pesan (dan kode OTP) dicetak ke console oleh transport palsu
+# (logger 'app.messaging' di LOGGING).
+MESSAGE_TRANSPORT = os.environ.get(
+    'MESSAGE_TRANSPORT',
+    'app.messaging.TwilioTransport' if 'TWILIO_ACCOUNT_SID' in os.environ else 'app.messaging.FakeTwilioTransport',
+)
+MESSAGE_MAX_ATTEMPTS = 5
+MESSAGE_RETRY_BACKOFF = 5  # detik, dikali 2 setiap percobaan gagal
+MESSAGE_RETRY_MAX_BACKOFF = 15 * 60
+MESSAGE_LOCK_TIMEOUT = 5 * 60  # pesan 'sending' lebih lama dari ini dianggap worker-nya mati
+
+# Midtrans Snap
+MIDTRANS_SERVER_KEY = os.environ.get('MIDTRANS_SERVER_KEY', 'SB-Mid-server-kq9bJK9lOejbQFONtGzpVySZ')
+# Ganti ke stub lokal (python manage.py midtrans_stub) untuk test offline
+MIDTRANS_SNAP_URL = os.environ.get('MIDTRANS_SNAP_URL', 'https://app.sandbox.midtrans.com/snap/v1/transactions')
+MIDTRANS_TIMEOUT = (3.05, 10)  # (connect, read) detik
+MIDTRANS_RETRIES = 2
+MIDTRANS_BACKOFF = 0.3
+# Retry-After dari Midtrans (429/503) lebih lama dari ini tidak ditunggu; checkout langsung gagal (detik)
+MIDTRANS_RETRY_AFTER_MAX = 5
+# Snap token berlaku 24 jam (atau sesuai 'expiry' di payload); token yang sisa masa
+# berlakunya kurang dari margin ini dibuat ulang (detik)
+MIDTRANS_SNAP_TOKEN_MARGIN = 10 * 60
+
+# QR meja (python manage.py generate_qr, lihat app/qr.py).
+# {table} diganti nomor meja. Mengubah URL atau gaya membuat QR dibuat ulang.
+QR_TABLE_URL = os.environ.get('QR_TABLE_URL', 'https://pos-wk/order/meja-{table}/')
+QR_STYLE = {
+    'box_size': 10,
+    'border': 4,
+    'error_correction': 'M',  # L, M, Q, H
+    'fill_color': 'black',
+    'back_color': 'white',
+}
@@ -2,7 +2,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path
-from app.views import confirm_cash_payment, product_list, add_product, edit_product, delete_product, kasir_owner_login, kasir_owner_logout, order_menu, create_order, order_list, complete_order, kasir_dashboard, kasir_order_report, checkout, pay_cash, get_midtrans_token, midtrans_webhook, qr_list, download_qr, customer_login, customer_otp_verify, customer_order, customer_order_checkout, customer_order_success, customer_checkout, customer_order_history, customer_order_history_detail, customer_update_name, customer_logout
+from app.views import confirm_cash_payment, product_list, add_product, edit_product, delete_product, kasir_owner_login, kasir_owner_logout, order_menu, create_order, order_list, complete_order, kasir_dashboard, kasir_order_report, kasir_order_report_export, checkout, pay_cash, get_midtrans_token, midtrans_webhook, qr_list, download_qr, customer_login, customer_otp_verify, customer_order, customer_order_checkout, customer_order_success, customer_checkout, customer_order_history, customer_order_history_detail, customer_update_name, customer_logout, api_menu, api_product_search, order_list_events, owner_metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -16,9 +16,12 @@ urlpatterns = [
     path('order/', order_menu, name='order_menu'),
     path('order/create/', create_order, name='create_order'),
     path('order-list/', order_list, name='order_list'),
+    path('order-list/events/', order_list_events, name='order_list_events'),
     path('order/complete/', complete_order, name='complete_order'),
     path('order/<int:order_id>/confirm-cash/', confirm_cash_payment, name='confirm_cash_payment'),
     path('kasir/order-report/', kasir_order_report, name='kasir_order_report'),
+    path('kasir/order-report/export/', kasir_order_report_export, name='kasir_order_report_export'),
+    path('owner/metrics/', owner_metrics, name='owner_metrics'),
     path('checkout/<int:order_id>/', checkout, name='checkout'),
     path('checkout/<int:order_id>/pay-cash/', pay_cash, name='pay_cash'),
     path('checkout/<int:order_id>/midtrans-token/', get_midtrans_token, name='get_midtrans_token'),
@@ -35,6 +38,8 @@ urlpatterns = [
     path('customer/order/history/<int:order_id>/', customer_order_history_detail, name='customer_order_history_detail'),
     path('customer/profile/update-name/', customer_update_name, name='customer_update_name'),
     path('customer/logout/', customer_logout, name='customer_logout'),
+    path('api/menu/', api_menu, name='api_menu'),
+    path('api/products/search/', api_product_search, name='api_product_search'),
 ]
 
 if settings.DEBUG: